@@ -0,0 +1,86 @@
+"""
+Reference copies of the original prompt-preparation and DOCX text functions.
+
+The benchmarks time them next to the current implementation, and
+verify_normalizer.py checks that both produce identical output.
+"""
+
+import io
+import re
+
+from docx import Document
+
+MAX_CHARS = 20000
+
+
+def legacy_prepare_text_for_gemini(text, max_chars=MAX_CHARS):
+    
+    text = ''.join(c for c in text if c.isprintable())  # remove weird chars
+    text = re.sub(r'\s+', ' ', text)                    # normalize whitespace
+    text = re.sub(r'([!?.,])\1+', r'\1', text)         # repeated punctuation
+    text = re.sub(r'Page \d+ of \d+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Confidential', '', text, flags=re.IGNORECASE)
+    
+    # Step 3: Split into pseudo-sentences (at punctuation or line breaks)
+    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
+    
+    # Step 4: Filter out very short sentences
+    filtered_sentences = [s.strip() for s in sentences if len(s.split()) >= 2]
+    
+    # Step 5: Truncate intelligently
+    truncated_text = ""
+    for sentence in filtered_sentences:
+        if len(truncated_text) + len(sentence) + 1 > max_chars:
+            break
+        truncated_text += sentence + " "
+    
+    return truncated_text.strip()
+
+
+def legacy_prepare_job_desc_text_gemini(job_text, max_chars=MAX_CHARS):
+    """
+    Clean and truncate job description text for LLM summarization or matching.
+    
+    Args:
+        job_text (str): raw job description text (from user upload or form)
+        max_chars (int): max number of characters to keep
+        
+    Returns:
+        str: cleaned, truncated, Gemini-ready job description
+    """
+    # Step 1: Basic cleaning
+    text = ''.join(c for c in job_text if c.isprintable())  # remove non-printables
+    text = re.sub(r'\s+', ' ', text)                        # normalize whitespace
+    text = re.sub(r'([!?.,])\1+', r'\1', text)              # repeated punctuation
+    text = re.sub(r'Page \d+ of \d+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Confidential', '', text, flags=re.IGNORECASE)
+
+    # Step 2: Optional — remove repetitive boilerplate phrases (optional)
+    text = re.sub(r'(?i)(about\s+us|who\s+we\s+are|our\s+mission)[:\- ]+', '', text)
+    text = re.sub(r'(?i)(equal\s+opportunity\s+employer|diversity\s+statement).*', '', text)
+
+    # Step 3: Split into pseudo-sentences (no NLTK)
+    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
+
+    # Step 4: Filter out short/unhelpful lines
+    filtered_sentences = [s.strip() for s in sentences if len(s.split()) >= 3]
+
+    # Step 5: Truncate intelligently
+    truncated_text = ""
+    for sentence in filtered_sentences:
+        if len(truncated_text) + len(sentence) + 1 > max_chars:
+            break
+        truncated_text += sentence + " "
+
+    return truncated_text.strip()
+
+
+def legacy_docx_text(content):
+    """DOCX text through the full python-docx object model."""
+    doc = Document(io.BytesIO(content))
+    text_parts = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text_parts.append(cell.text)
+    return "\n".join(text_parts)
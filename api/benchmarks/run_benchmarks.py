@@ -0,0 +1,302 @@
+"""
+Microbenchmarks for the document and text hot paths.
+
+Each case runs on synthetic input of increasing size and reports the median
+time per call, throughput and peak Python memory (tracemalloc). Results can be
+saved as a baseline and later runs compared against it.
+
+    cd api
+    python benchmarks/run_benchmarks.py                       # full suite
+    python benchmarks/run_benchmarks.py --quick -k extract    # subset, smaller sizes
+    python benchmarks/run_benchmarks.py --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.15
+"""
+
+import sys
+import os
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import BytesIO, StringIO
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import make_docx, make_pdf, make_text, make_gemini_output
+from benchmarks.reference import legacy_prepare_text_for_gemini, legacy_prepare_job_desc_text_gemini, legacy_docx_text
+from helper.helper import prepare_text_for_gemini, prepare_job_desc_text_gemini, parse_gemini_json
+from utils.documentUtils import DocumentUtils
+from features.storage import MemoryStorage
+from features.llm_providers import StubProvider
+from features.gemini_api import GeminiTextGenerator
+from features.generation import DocumentGenerator, DOCUMENT_KINDS
+
+
+class Case:
+    """One benchmark: ``setup()`` builds the input and returns the function to time."""
+
+    def __init__(self, group, params, setup):
+        self.group = group
+        self.params = params
+        self.setup = setup
+
+    @property
+    def name(self):
+        args = ",".join(f"{key}={value}" for key, value in self.params.items())
+        return f"{self.group}[{args}]"
+
+
+def build_cases(quick=False):
+    def sizes(values):
+        return values[:2] if quick else values
+
+    cases = []
+
+    def docx_fill(paragraphs, tables, placeholders, mode, images=0):
+        def setup():
+            template, replacements = make_docx(paragraphs, tables, placeholders, images=images)
+            plan = DocumentUtils.compile_placeholder_plan(template) if mode != "general" else None
+            if mode == "streamed":
+                # Consume the stream chunk by chunk, as a response would
+                def fn():
+                    for _ in DocumentUtils.stream_docx_placeholders(template, replacements, plan=plan):
+                        pass
+            else:
+                fn = lambda: DocumentUtils.update_docx_placeholders(BytesIO(template), replacements, plan=plan)
+            return fn, len(template)
+        return setup
+
+    for mode, group in (("general", "docx_fill"), ("planned", "docx_fill_planned"), ("streamed", "docx_fill_streamed")):
+        for paragraphs in sizes([50, 500, 2000]):
+            params = {"paragraphs": paragraphs, "tables": 0, "placeholders": 20}
+            cases.append(Case(group, params, docx_fill(paragraphs, 0, 20, mode)))
+        for tables in sizes([20, 100]):
+            params = {"paragraphs": 50, "tables": tables, "placeholders": 20}
+            cases.append(Case(group, params, docx_fill(50, tables, 20, mode)))
+        for placeholders in sizes([60, 200]):
+            params = {"paragraphs": 200, "tables": 0, "placeholders": placeholders}
+            cases.append(Case(group, params, docx_fill(200, 0, placeholders, mode)))
+        for images in sizes([2, 8]):
+            params = {"paragraphs": 50, "tables": 0, "placeholders": 20, "images": images}
+            cases.append(Case(group, params, docx_fill(50, 0, 20, mode, images)))
+
+    def extract_docx(paragraphs, tables, legacy):
+        def setup():
+            data, _ = make_docx(paragraphs, tables, 20)
+            if legacy:
+                return lambda: legacy_docx_text(data), len(data)
+            return lambda: DocumentUtils.extract_text(BytesIO(data), use_cache=False), len(data)
+        return setup
+
+    # legacy_extract_docx: the original python-docx based extraction, for comparison
+    for group, legacy in (("extract_docx", False), ("legacy_extract_docx", True)):
+        for paragraphs in sizes([50, 500, 2000]):
+            cases.append(Case(group, {"paragraphs": paragraphs, "tables": 0}, extract_docx(paragraphs, 0, legacy)))
+        for tables in sizes([20, 100]):
+            cases.append(Case(group, {"paragraphs": 50, "tables": tables}, extract_docx(50, tables, legacy)))
+
+    def extract_pdf(pages):
+        def setup():
+            data = make_pdf(pages)
+            return lambda: DocumentUtils.extract_text(BytesIO(data), use_cache=False), len(data)
+        return setup
+
+    for pages in sizes([1, 10, 50]):
+        cases.append(Case("extract_pdf", {"pages": pages}, extract_pdf(pages)))
+
+    def text_case(fn, chars):
+        def setup():
+            text = make_text(chars)
+            return lambda: fn(text), len(text.encode("utf-8"))
+        return setup
+
+    for chars in sizes([2_000, 20_000, 200_000]):
+        cases.append(Case("prepare_text_for_gemini", {"chars": chars}, text_case(prepare_text_for_gemini, chars)))
+        cases.append(Case("prepare_job_desc_text_gemini", {"chars": chars}, text_case(prepare_job_desc_text_gemini, chars)))
+        # The original implementations, for comparison
+        cases.append(Case("legacy_prepare_text_for_gemini", {"chars": chars},
+                          text_case(legacy_prepare_text_for_gemini, chars)))
+        cases.append(Case("legacy_prepare_job_desc_text_gemini", {"chars": chars},
+                          text_case(legacy_prepare_job_desc_text_gemini, chars)))
+
+    def generate_offline(kind, paragraphs):
+        def setup():
+            # The whole pipeline against in-memory storage and the stub LLM (no network)
+            template, _ = make_docx(paragraphs, 0, 20)
+            storage = MemoryStorage()
+            storage.upload_file(template, DOCUMENT_KINDS[kind]["template"], folder="templates")
+            storage.upload_file(make_text(3_000).encode("utf-8"), "summary.txt", folder="user")
+            generator = DocumentGenerator(
+                storage,
+                GeminiTextGenerator(provider=StubProvider()),
+                ThreadPoolExecutor(max_workers=4),
+            )
+            job_description = make_text(4_000)
+
+            def fn():
+                # The pipeline logs each prompt and result with print()
+                with redirect_stdout(StringIO()):
+                    document, _ = generator.generate(kind, job_description, use_cache=False)
+                for _ in document:
+                    pass
+            return fn, len(template)
+        return setup
+
+    for kind in DOCUMENT_KINDS:
+        for paragraphs in sizes([50, 500]):
+            cases.append(Case("generate_offline", {"kind": kind, "paragraphs": paragraphs},
+                              generate_offline(kind, paragraphs)))
+
+    def parse_case(keys):
+        def setup():
+            output = make_gemini_output(keys)
+            return lambda: parse_gemini_json(output), len(output.encode("utf-8"))
+        return setup
+
+    for keys in sizes([10, 60, 200]):
+        cases.append(Case("parse_gemini_json", {"keys": keys}, parse_case(keys)))
+
+    return cases
+
+
+def measure(fn, min_time=0.5, min_rounds=3, max_rounds=1000):
+    """Time fn() repeatedly (after one warm-up call) and return per-call durations in seconds."""
+    fn()
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < max_rounds:
+        t0 = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - t0)
+        if len(durations) >= min_rounds and time.perf_counter() - started >= min_time:
+            break
+    return durations
+
+
+def peak_memory(fn):
+    """Peak bytes allocated by Python code during one fn() call."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_case(case, min_time):
+    fn, input_bytes = case.setup()
+    durations = measure(fn, min_time=min_time)
+    median = statistics.median(durations)
+    return {
+        "group": case.group,
+        "params": case.params,
+        "rounds": len(durations),
+        "median": median,
+        "min": min(durations),
+        "ops_per_sec": 1.0 / median if median else None,
+        "mb_per_sec": input_bytes / median / 1e6 if median else None,
+        "input_bytes": input_bytes,
+        "peak_bytes": peak_memory(fn),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Annotate results with their change against a baseline.
+
+    Returns:
+        list[str]: Names of cases whose time or peak memory grew by more than threshold
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        time_ratio = result["median"] / previous["median"] if previous["median"] else None
+        memory_ratio = result["peak_bytes"] / previous["peak_bytes"] if previous["peak_bytes"] else None
+        result["baseline"] = {"time_ratio": time_ratio, "memory_ratio": memory_ratio}
+        if (time_ratio and time_ratio > 1 + threshold) or (memory_ratio and memory_ratio > 1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def print_table(results):
+    header = f"{'benchmark':<72} {'median ms':>10} {'ops/s':>9} {'MB/s':>8} {'peak KiB':>10} {'vs base':>16}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        change = ""
+        if "baseline" in result:
+            time_ratio = result["baseline"]["time_ratio"]
+            memory_ratio = result["baseline"]["memory_ratio"]
+            change = f"{_percent(time_ratio)} / {_percent(memory_ratio)}"
+        print(
+            f"{name:<72} {result['median'] * 1000:>10.3f} {result['ops_per_sec']:>9.1f} "
+            f"{result['mb_per_sec']:>8.2f} {result['peak_bytes'] / 1024:>10.1f} {change:>16}"
+        )
+
+
+def _percent(ratio):
+    return "n/a" if ratio is None else f"{(ratio - 1) * 100:+.0f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the document/text microbenchmarks.")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and shorter timing")
+    parser.add_argument("--min-time", type=float, default=None, help="seconds spent timing each case")
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown/memory growth before a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    min_time = args.min_time if args.min_time is not None else (0.1 if args.quick else 0.5)
+    cases = [case for case in build_cases(quick=args.quick) if args.filter in case.name]
+    if not cases:
+        print(f"No benchmarks match '{args.filter}'.")
+        return 1
+
+    results = {}
+    for case in cases:
+        print(f"running {case.name} ...", file=sys.stderr)
+        results[case.name] = run_case(case, min_time)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nBaseline written to {args.save}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for name in regressions:
+            print(f"  {name}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
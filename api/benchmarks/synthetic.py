@@ -0,0 +1,173 @@
+"""
+Synthetic inputs for the benchmarks: DOCX templates, PDFs, resume/job texts and Gemini output.
+
+Everything is generated deterministically from a seed so runs are comparable.
+"""
+
+import json
+import random
+import struct
+import zlib
+from io import BytesIO
+
+from docx import Document
+
+
+WORDS = (
+    "python sql data pipeline analytics customer platform design scalable team lead "
+    "delivered improved reduced latency cloud aws docker kubernetes api service backend "
+    "frontend react testing automation reporting dashboard stakeholder migration security "
+    "performance reliability monitoring metrics revenue growth product roadmap agile"
+).split()
+
+NOISE = ("!!!", "...", ",,", "Page 3 of 9", "CONFIDENTIAL", "\t\t", "\x0c", "\u200b", "   ")
+
+BOILERPLATE = (
+    "About us: we build tools for teams.",
+    "Who we are - a remote-first company.",
+    "We are an Equal Opportunity Employer and value diversity.",
+)
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def placeholder_names(count):
+    return [f"<%FIELD{i}%>" for i in range(count)]
+
+
+def make_png(width=256, height=256, seed=0):
+    """RGB PNG of random noise, so it does not compress (like a photo in a template)."""
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 1)) + chunk(b"IEND", b"")
+
+
+def make_docx(paragraphs=100, tables=0, placeholders=20, split_runs=True, seed=0, images=0):
+    """
+    Build a DOCX template.
+
+    Placeholders are spread over body paragraphs and table cells; with
+    split_runs=True every placeholder is split across runs, the way Word
+    stores text that was edited or spell-checked. ``images`` adds that many
+    512x512 noise pictures (about 770 KB each).
+
+    Returns:
+        tuple[bytes, dict]: DOCX bytes and a replacement mapping for all placeholders
+    """
+    rng = random.Random(seed)
+    names = placeholder_names(placeholders)
+    slots = paragraphs + tables * 4
+    positions = {}
+    for name in names:
+        positions.setdefault(rng.randrange(max(1, slots)), []).append(name)
+
+    doc = Document()
+    slot = 0
+
+    def add_text(paragraph, names_here):
+        paragraph.add_run(_sentence(rng, 8) + " ")
+        for name in names_here:
+            if split_runs:
+                middle = len(name) // 2
+                paragraph.add_run(name[:middle])
+                paragraph.add_run(name[middle:]).bold = True
+            else:
+                paragraph.add_run(name)
+            paragraph.add_run(" " + _sentence(rng, 4))
+
+    for _ in range(paragraphs):
+        add_text(doc.add_paragraph(), positions.get(slot, ()))
+        slot += 1
+
+    for _ in range(tables):
+        table = doc.add_table(rows=2, cols=2)
+        for cell in table._cells:
+            add_text(cell.paragraphs[0], positions.get(slot, ()))
+            slot += 1
+
+    for index in range(images):
+        doc.add_picture(BytesIO(make_png(512, 512, seed=seed + index)))
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    replacements = {name: f"Value for {name[2:-2].lower()}" for name in names}
+    return buffer.getvalue(), replacements
+
+
+def make_pdf(pages=5, lines_per_page=40, seed=0):
+    """Build a text-only PDF (Helvetica, one content stream per page) without extra dependencies."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        lines = ["BT /F1 10 Tf 12 TL 50 750 Td"]
+        for _ in range(lines_per_page):
+            text = _sentence(rng, 10).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            lines.append(f"({text}) Tj T*")
+        lines.append("ET")
+        stream = zlib.compress("\n".join(lines).encode("latin-1"))
+        objects.append(
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_text(chars=10000, noise=0.1, seed=0):
+    """Resume-like text of roughly ``chars`` characters with OCR/PDF-extraction noise mixed in."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < chars:
+        if rng.random() < noise:
+            piece = rng.choice(NOISE)
+        elif rng.random() < 0.05:
+            piece = rng.choice(BOILERPLATE)
+        else:
+            piece = _sentence(rng, rng.randint(1, 18))
+        piece += rng.choice((" ", " ", "\n", "  "))
+        parts.append(piece)
+        size += len(piece)
+    return "".join(parts)[:chars]
+
+
+def make_gemini_output(keys=20, value_words=30, fenced=True, seed=0):
+    """Gemini-style JSON answer: optional code fence, smart quotes and a trailing comma."""
+    rng = random.Random(seed)
+    values = {name: _sentence(rng, value_words) for name in placeholder_names(keys)}
+    body = json.dumps(values, indent=2)
+    if keys:
+        body = body.replace('"<%FIELD0%>"', "“<%FIELD0%>”", 1)
+    body = body[:-2] + ",\n}"
+    return f"Here you go:\n```json\n{body}\n```" if fenced else body
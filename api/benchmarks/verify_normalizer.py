@@ -0,0 +1,106 @@
+"""
+Randomized equivalence check: the text normalizer must match the original functions exactly.
+
+Generates noisy texts from tokens that exercise every cleaning rule (control and
+Unicode whitespace, repeated punctuation, page numbers, "Confidential" split by
+other matches, boilerplate, non-ASCII digits), then compares:
+
+- prepare_text_for_gemini / prepare_job_desc_text_gemini with the reference copies
+- TextNormalizer.normalize_stream over random chunkings with the batch result
+
+    cd api && python benchmarks/verify_normalizer.py --cases 20000 --seed 1
+"""
+
+import sys
+import os
+import argparse
+import random
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.reference import legacy_prepare_text_for_gemini, legacy_prepare_job_desc_text_gemini
+from helper.helper import prepare_text_for_gemini, prepare_job_desc_text_gemini
+from helper.text_normalizer import TextNormalizer
+
+
+TOKENS = (
+    "skills", "python", "led", "team", "of", "5", "engineers", "é", "naïve", "١٢", "\u212a",
+    " ", " ", " ", "  ", "\t", "\n", "\r\n", "\x0c", "\x00", "\x1f", "\x85", "\xa0", "\u200b", "\u2028", "\u3000",
+    ".", ".", "!", "?", ",", "..", "!!!", "?!", ",,", ". ", "! ", "? ",
+    "Page 1 of 2", "page 12 OF 30", "Page ", "1", " of ", "PAGE 3 of 3",
+    "Confidential", "CONFIDENTIAL", "Confiden", "tial", "Conf", "idential",
+    "about us:", "About  us - ", "who we are", "Who\twe are: ", "our mission-", "Our Mission :",
+    "Equal Opportunity Employer", "equal  opportunity", " employer", "diversity statement", "Diversity\nStatement",
+)
+
+
+def random_text(rng, max_tokens):
+    return "".join(rng.choice(TOKENS) for _ in range(rng.randint(0, max_tokens)))
+
+
+def random_chunks(rng, text):
+    chunks = []
+    position = 0
+    while position < len(text):
+        size = rng.choice((1, 2, 3, 7, 16, 64, 500, 4096))
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+class CountingChunks:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def check(cases, seed):
+    rng = random.Random(seed)
+    pairs = (
+        (legacy_prepare_text_for_gemini, prepare_text_for_gemini, TextNormalizer(min_words=2)),
+        (legacy_prepare_job_desc_text_gemini, prepare_job_desc_text_gemini,
+         TextNormalizer(min_words=3, strip_boilerplate=True)),
+    )
+    failures = 0
+    early_stops = 0
+
+    for case in range(cases):
+        text = random_text(rng, rng.choice((5, 40, 400, 3000)))
+        max_chars = rng.choice((0, 1, 10, 40, 200, 1000, 20000))
+        for legacy, current, normalizer in pairs:
+            expected = legacy(text, max_chars=max_chars)
+            actual = current(text, max_chars=max_chars)
+            normalizer.settle_min = rng.choice((1, 64, 1024))
+            chunks = CountingChunks(random_chunks(rng, text))
+            streamed = normalizer.normalize_stream(chunks, max_chars)
+            if chunks.read < len(chunks.chunks):
+                early_stops += 1
+
+            if actual != expected or streamed != expected:
+                failures += 1
+                if failures <= 5:
+                    print(f"MISMATCH case={case} fn={current.__name__} max_chars={max_chars}")
+                    print(f"  input:    {text!r}")
+                    print(f"  expected: {expected!r}")
+                    print(f"  batch:    {actual!r}")
+                    print(f"  stream:   {streamed!r}")
+
+    print(f"{cases} cases x {len(pairs)} functions, {failures} mismatches, {early_stops} streams stopped early")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the text normalizer against the original functions.")
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    return 1 if check(args.cases, args.seed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
 import sys
 import os
+import hashlib
 import logging
-import google.generativeai as genai
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from google.api_core import exceptions as api_exceptions
 from google.api_core.exceptions import GoogleAPIError
 from datetime import datetime
 
@@ -10,6 +14,21 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Now import from other_folder
 from utils.data import PROMPTS
+from utils.rate_limit import CallMetrics, RateLimitTimeout
+from utils.metrics import metrics as stage_metrics
+from features.llm_providers import GenaiSdkProvider
+
+
+# Errors worth retrying: quota (429), server overload/errors and timeouts
+RETRYABLE_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.InternalServerError,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.GatewayTimeout,
+    TimeoutError,
+    ConnectionError,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -22,26 +41,320 @@ class GeminiTextGenerationError(RuntimeError):
 
 
 class GeminiTextGenerator:
-    def __init__(self, api_key, model="gemini-2.5-flash"):
-        if not api_key:
+    def __init__(
+        self,
+        api_key=None,
+        model="gemini-2.5-flash",
+        provider=None,
+        cache=None,
+        uncached_tasks=(),
+        limiter=None,
+        max_retries=3,
+        backoff_base=0.5,
+        backoff_max=8.0,
+        request_timeout=60.0,
+        hedge=False,
+        hedge_percentile=95,
+        hedge_min_samples=20,
+        sleep=time.sleep,
+        budgeter=None,
+    ):
+        """
+        Args:
+            api_key (str): Gemini API key
+            model (str): Gemini model name
+            provider (optional): Backend from features.llm_providers; defaults to
+                the google.generativeai SDK (which requires api_key)
+            cache (DiskCache, optional): Response cache keyed by model, task and
+                the hash of the fully formatted prompt (which includes the date)
+            uncached_tasks (iterable[str]): Tasks whose responses are never cached
+            limiter (RateLimiter, optional): Client-side request/token quota
+            max_retries (int): Extra attempts for retryable errors (429, 5xx, timeouts)
+            backoff_base (float): First retry delay in seconds, doubled per attempt (full jitter)
+            backoff_max (float): Upper bound for a single retry delay
+            request_timeout (float): Seconds one Gemini request may take; also the
+                longest the limiter may make a call wait
+            hedge (bool): Send a second request when the first one runs longer than
+                the hedge_percentile latency, and keep whichever answers first
+            hedge_percentile (float): Latency percentile that triggers a hedge
+            hedge_min_samples (int): Successful calls needed before hedging starts
+            sleep (callable): Used for retry backoff; injectable for tests
+            budgeter (PromptBudgeter, optional): Trims the main input text to the
+                task's token budget, keeping the lines most relevant to second_text
+        """
+        if provider is None and not api_key:
             raise ValueError("Gemini API key is required.")
 
         self.api_key = api_key
         self.model_name = model
         self.prompts = PROMPTS.copy()
+        self.cache = cache
+        self.uncached_tasks = set(uncached_tasks)
+
+        self.limiter = limiter
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.metrics = CallMetrics()
+        self._sleep = sleep
+        self.budgeter = budgeter
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini") if hedge else None
+
+        self.model = provider or GenaiSdkProvider(self.api_key, self.model_name)
+        logger.info(f"Gemini model '{self.model_name}' initialized ({type(self.model).__name__}).")
+
+    def generate(self, text, task, second_text=None, use_cache=True):
+        """
+        Generate text based on task and input text.
+
+        Args:
+            text (str): Main input (resume text or summary)
+            task (str): Prompt name from PROMPTS
+            second_text (str, optional): Job description
+            use_cache (bool): Set to False to skip the response cache for this call
+        """
+        prompt = self._build_prompt(text, task, second_text)
+
+        cache_key = self._cache_key(task, prompt) if use_cache else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Gemini cache hit for '{task}'.")
+                return cached.decode("utf-8")
+
+        # Cache hits are not timed: the stage measures calls that reach the API
+        with stage_metrics.stage("gemini_generate", bytes_in=len(prompt)) as timer:
+            try:
+                response = self._request(prompt, task)
+            except GeminiTextGenerationError:
+                raise
+            except GoogleAPIError as e:
+                logger.exception(f"Gemini API request failed for '{task}'.")
+                raise GeminiTextGenerationError("Gemini API request failed.") from e
+            except Exception as e:
+                logger.exception(f"Unexpected Gemini error for '{task}'.")
+                raise GeminiTextGenerationError("Unexpected Gemini error.") from e
+
+            result = getattr(response, "text", "").strip()
+            if not result:
+                logger.error(f"Gemini returned empty response for '{task}'.")
+                raise GeminiTextGenerationError("Gemini returned no text.")
+            timer.bytes_out = len(result)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, result.encode("utf-8"))
+
+        return result
+
+    def generate_stream(self, text, task, second_text=None, use_cache=True):
+        """
+        Like generate(), but yields the response text in chunks as Gemini produces it.
+
+        A cached response is yielded as a single chunk. The complete response is
+        cached once the stream finishes.
+        """
+        prompt = self._build_prompt(text, task, second_text)
+
+        cache_key = self._cache_key(task, prompt) if use_cache else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Gemini cache hit for '{task}'.")
+                yield cached.decode("utf-8")
+                return
+
+        parts = []
+        # Includes the time the consumer takes between chunks
+        with stage_metrics.stage("gemini_stream", bytes_in=len(prompt)) as timer:
+            try:
+                estimated = self._estimate_tokens(prompt)
+                chunks = self._open_stream(prompt, task, estimated)
+                chunk = None
+                for chunk in chunks:
+                    try:
+                        piece = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. only safety metadata)
+                        continue
+                    if piece:
+                        parts.append(piece)
+                        yield piece
+                self._settle(estimated, chunk)
+            except GeminiTextGenerationError:
+                raise
+            except GoogleAPIError as e:
+                logger.exception(f"Gemini API request failed for '{task}'.")
+                raise GeminiTextGenerationError("Gemini API request failed.") from e
+            except Exception as e:
+                logger.exception(f"Unexpected Gemini error for '{task}'.")
+                raise GeminiTextGenerationError("Unexpected Gemini error.") from e
+
+            result = "".join(parts).strip()
+            if not result:
+                logger.error(f"Gemini returned empty response for '{task}'.")
+                raise GeminiTextGenerationError("Gemini returned no text.")
+            timer.bytes_out = len(result)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, result.encode("utf-8"))
+
+    def metrics_snapshot(self):
+        """Counters, latency percentiles and recent attempts for Gemini calls."""
+        snapshot = self.metrics.snapshot()
+        snapshot["hedge_threshold"] = self._hedge_threshold()
+        snapshot["prompt_budget"] = self.budgeter.stats() if self.budgeter is not None else None
+        return snapshot
+
+    def _request(self, prompt, task):
+        """One logical generate_content call: rate limited, retried and optionally hedged."""
+        estimated = self._estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            self._throttle(estimated, task)
+            try:
+                response = self._attempt(prompt, task, attempt, estimated)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._back_off(task, attempt, e)
+                continue
+            self._settle(estimated, response)
+            return response
+
+    def _open_stream(self, prompt, task, estimated):
+        """
+        Start a streaming call, retrying until the first chunk arrives.
+
+        Errors after output has started are not retried (the caller has already
+        seen part of the response). Streams are never hedged.
+        """
+        for attempt in range(self.max_retries + 1):
+            self._throttle(estimated, task)
+            started = time.monotonic()
+            try:
+                chunks = iter(
+                    self.model.generate_content(
+                        prompt, stream=True, request_options={"timeout": self.request_timeout}
+                    )
+                )
+                first = next(chunks, None)
+            except Exception as e:
+                self.metrics.record_attempt(task, attempt, type(e).__name__, time.monotonic() - started)
+                if attempt >= self.max_retries or not isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                self._back_off(task, attempt, e)
+                continue
+
+            self.metrics.record_attempt(task, attempt, "ok", time.monotonic() - started)
+            return self._prepend(first, chunks)
+
+    @staticmethod
+    def _prepend(first, chunks):
+        if first is not None:
+            yield first
+        yield from chunks
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(self.model_name)
-        logger.info(f"Gemini model '{self.model_name}' initialized.")
+    def _attempt(self, prompt, task, attempt, estimated):
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return self._call_model(prompt, task, attempt)
 
-    def generate(self, text, task, second_text=None):
-        """Generate text based on task and input text."""
+        primary = self._hedge_pool.submit(self._call_model, prompt, task, attempt)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        # Only hedge when the quota has room right now; otherwise keep waiting
+        if self.limiter is not None and not self.limiter.try_acquire(estimated):
+            return primary.result()
+
+        self.metrics.incr("hedges")
+        backup = self._hedge_pool.submit(self._call_model, prompt, task, attempt, True)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self.metrics.incr("hedge_wins")
+                    # The slower request keeps running; its result is discarded
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    def _call_model(self, prompt, task, attempt, hedged=False):
+        started = time.monotonic()
+        try:
+            response = self.model.generate_content(
+                prompt, request_options={"timeout": self.request_timeout}
+            )
+        except Exception as e:
+            self.metrics.record_attempt(task, attempt, type(e).__name__, time.monotonic() - started, hedged)
+            raise
+        self.metrics.record_attempt(task, attempt, "ok", time.monotonic() - started, hedged)
+        return response
+
+    def _hedge_threshold(self):
+        if not self.hedge:
+            return None
+        return self.metrics.percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def _throttle(self, estimated, task):
+        if self.limiter is None:
+            return
+        try:
+            waited = self.limiter.acquire(estimated, timeout=self.request_timeout)
+        except RateLimitTimeout as e:
+            self.metrics.incr("throttle_rejections")
+            logger.warning(f"Gemini client-side rate limit exceeded for '{task}': {e}")
+            raise GeminiTextGenerationError("Gemini rate limit exceeded. Please retry later.") from e
+        if waited:
+            self.metrics.incr("throttle_waits")
+            self.metrics.incr("throttle_seconds", waited)
+
+    def _back_off(self, task, attempt, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        self.metrics.incr("retries")
+        logger.warning(
+            f"Gemini call for '{task}' failed ({type(error).__name__}); "
+            f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s."
+        )
+        self._sleep(delay)
+
+    def _settle(self, estimated, response):
+        """Replace the token estimate with the real usage reported by Gemini."""
+        if self.limiter is None:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if isinstance(actual, int) and actual > 0:
+            self.limiter.settle(estimated, actual)
+
+    @staticmethod
+    def _estimate_tokens(prompt):
+        # Roughly 4 characters per token for English text
+        return len(prompt) // 4 + 1
+
+    def _build_prompt(self, text, task, second_text=None):
         if not text.strip():
             raise ValueError("Input text cannot be empty.")
         if task not in self.prompts:
             raise ValueError(f"No prompt found for task '{task}'.")
         print("Generating Gemini prompt...")
-        
+
+        if self.budgeter is not None and second_text:
+            text, report = self.budgeter.fit(text, task, query=second_text)
+            if report.tokens_saved:
+                self.metrics.incr("prompt_tokens_saved", report.tokens_saved)
+                logger.info(
+                    f"Prompt budget for '{task}': {report.tokens_before} -> {report.tokens_after} tokens "
+                    f"({report.tokens_saved} saved, {report.lines_before - report.lines_after} lines dropped)."
+                )
+
         payload = {
             "input_text": text.strip(),
             "resume_summary": text.strip(),
@@ -59,22 +372,14 @@ class GeminiTextGenerator:
 
         # prompt = self.prompts[task].format(input_text=text.strip())
         logger.debug(f"Generated prompt for '{task}': {prompt[:150]}...")
+        return prompt
 
-        try:
-            response = self.model.generate_content(prompt)
-        except GoogleAPIError as e:
-            logger.exception(f"Gemini API request failed for '{task}'.")
-            raise GeminiTextGenerationError("Gemini API request failed.") from e
-        except Exception as e:
-            logger.exception(f"Unexpected Gemini error for '{task}'.")
-            raise GeminiTextGenerationError("Unexpected Gemini error.") from e
-
-        result = getattr(response, "text", "").strip()
-        if not result:
-            logger.error(f"Gemini returned empty response for '{task}'.")
-            raise GeminiTextGenerationError("Gemini returned no text.")
-
-        return result
+    def _cache_key(self, task, prompt):
+        """Cache key for a formatted prompt, or None if this task is not cached."""
+        if self.cache is None or task in self.uncached_tasks:
+            return None
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"gemini-v1:{self.model_name}:{task}:{prompt_hash}"
 
     def add_prompt(self, task, template):
         """Add or update a task prompt."""
@@ -106,5 +411,23 @@ gemini.add_prompt(
 bio = gemini.generate("AI engineer with 3 years of ML experience.", "linkedin_bio")
 print(bio)
 
+# Cache responses on disk for a day, never caching summaries
+from utils.cache import DiskCache
+gemini = GeminiTextGenerator(
+    api_key="YOUR_GEMINI_API_KEY",
+    cache=DiskCache("/tmp/gemini-cache", max_bytes=64 * 1024 * 1024, ttl=86400),
+    uncached_tasks={"summary"},
+)
+
+# Stay under 10 requests / 250k tokens per minute, retry 429/5xx, hedge slow calls
+from utils.rate_limit import RateLimiter
+gemini = GeminiTextGenerator(
+    api_key="YOUR_GEMINI_API_KEY",
+    limiter=RateLimiter(rpm=10, tpm=250_000),
+    max_retries=3,
+    hedge=True,
+)
+print(gemini.metrics_snapshot())
+
 
 """
@@ -0,0 +1,427 @@
+"""
+Cover letter / resume generation pipeline shared by the Flask endpoints.
+
+Storage reads are started together on an I/O thread pool so they overlap each
+other and, for cover letters, the Gemini call.
+"""
+
+import logging
+import sys
+import os
+import re
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from helper.helper import prepare_job_desc_text_gemini, parse_gemini_json
+from features.gemini_api import get_today_date
+from features.job_index import context_fingerprint
+from utils.documentUtils import DocumentUtils, PLAN_SUFFIX
+from utils.cache import ByteLRUCache
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Per-document settings; "template_text" marks kinds whose prompt includes the template body
+DOCUMENT_KINDS = {
+    "coverletter": {
+        "task": "cover_letter",
+        "template": "coverletter.docx",
+        "label": "Cover letter",
+        "noun": "cover letter",
+        "filename_prefix": "cover_letter",
+        "template_text": False,
+    },
+    "resume": {
+        "task": "resume",
+        "template": "resume.docx",
+        "label": "Resume",
+        "noun": "resume",
+        "filename_prefix": "resume",
+        "template_text": True,
+    },
+}
+
+
+class GenerationError(RuntimeError):
+    """Raised when a generation step fails; carries the HTTP status to report."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class DownloadStore:
+    """
+    Short-lived in-memory store for generated files, addressed by random tokens.
+
+    Args:
+        ttl (float): Seconds a file stays downloadable
+        max_bytes (int): Total size budget; the oldest files are dropped first
+    """
+
+    def __init__(self, ttl=600.0, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self._files = ByteLRUCache(max_bytes)
+
+    def put(self, data, filename, mimetype=DOCX_MIMETYPE):
+        """Store a file and return its download token."""
+        token = secrets.token_urlsafe(24)
+        self._files.put(token, (time.monotonic() + self.ttl, data, filename, mimetype), len(data))
+        return token
+
+    def get(self, token):
+        """Return (bytes, filename, mimetype) or None if unknown or expired."""
+        entry = self._files.get(token)
+        if entry is None:
+            return None
+        expires_at, data, filename, mimetype = entry
+        if expires_at < time.monotonic():
+            self._files.pop(token)
+            return None
+        return data, filename, mimetype
+
+
+class GenerationInputs:
+    """Prepared job description plus the in-flight storage reads for one generation."""
+
+    def __init__(self, kind, job_text, summary, template):
+        self.kind = kind
+        self.spec = DOCUMENT_KINDS[kind]
+        self.job_text = job_text
+        self.summary = summary    # Future[str]
+        self.template = template  # Future[(bytes, str | None)]: template bytes and body text
+
+
+class DocumentGenerator:
+    """
+    Runs fetch -> Gemini -> placeholder fill for cover letters and resumes.
+
+    Args:
+        storage: storage backend (see features/storage.py)
+        gemini: GeminiTextGenerator
+        executor: concurrent.futures.Executor used for storage I/O
+        similar_jobs (JobSimilarityIndex, optional): Records every Gemini result
+            so near-duplicate job descriptions can reuse it
+    """
+
+    def __init__(self, storage, gemini, executor, similar_jobs=None):
+        self.storage = storage
+        self.gemini = gemini
+        self.executor = executor
+        self.similar_jobs = similar_jobs
+
+    def generate(self, kind, job_description, use_cache=True, reuse_similar=False):
+        """
+        Generate one document.
+
+        Args:
+            reuse_similar (bool): Reuse the Gemini result of a near-duplicate job
+                description generated with the same summary/template, if any
+
+        Returns:
+            tuple[PatchedZip, str]: filled DOCX (iterable of bytes, with .size and
+            .getvalue()) and download name
+        """
+        inputs = self.start(kind, job_description)
+        text = self.prompt_text(inputs)
+        data = self.answer(inputs, text, use_cache=use_cache, reuse_similar=reuse_similar)
+        return self.fill(inputs, data)
+
+    def stream(self, kind, job_description, downloads, use_cache=True, reuse_similar=False):
+        """
+        Generate one document while reporting progress.
+
+        Yields (event, data) tuples: "progress" with the current stage, "delta"
+        with each piece of Gemini output, then either "done" with a download
+        token from ``downloads`` (a DownloadStore) or "error". A reused result
+        is reported as a "reused" progress stage instead of deltas.
+        """
+        try:
+            yield "progress", {"stage": "fetching"}
+            inputs = self.start(kind, job_description)
+            text = self.prompt_text(inputs)
+
+            match = self._best_similar(inputs, text) if reuse_similar else None
+            if match is not None:
+                yield "progress", {"stage": "reused", "similar_to": match["id"], "similarity": match["similarity"]}
+                data = self._reused_result(match)
+            else:
+                yield "progress", {"stage": "generating"}
+                parts = []
+                try:
+                    for piece in self.gemini.generate_stream(
+                        text=text,
+                        second_text=inputs.job_text,
+                        task=inputs.spec["task"],
+                        use_cache=use_cache,
+                    ):
+                        parts.append(piece)
+                        yield "delta", {"text": piece}
+                    output = "".join(parts)
+                    with metrics.stage("parse_gemini_json", bytes_in=len(output)):
+                        data = parse_gemini_json(output)
+                except Exception:
+                    raise GenerationError(f"{inputs.spec['label']} generation failed.")
+                self.remember(inputs, text, data)
+
+            yield "progress", {"stage": "filling"}
+            updated_docx_stream, download_name = self.fill(inputs, data)
+        except GenerationError as e:
+            yield "error", {"error": str(e), "status": e.status}
+            return
+
+        token = downloads.put(updated_docx_stream.getvalue(), download_name)
+        yield "done", {"token": token, "filename": download_name}
+
+    def generate_bulk(self, kind, job_descriptions, concurrency=4, use_cache=True, reuse_similar=False):
+        """
+        Generate one document per job description, sharing the summary and template.
+
+        Job descriptions that are identical after preparation are generated once.
+        The summary/template are loaded before this returns, so their errors are
+        raised here as GenerationError; per-item failures are reported by the
+        returned iterator instead.
+
+        Args:
+            kind (str): "coverletter" or "resume"
+            job_descriptions (list[str]): Raw job descriptions
+            concurrency (int): Maximum Gemini calls in flight
+            use_cache (bool): Use the Gemini response cache
+            reuse_similar (bool): Reuse results of near-duplicate earlier job descriptions
+
+        Returns:
+            iterator of (indices, outcome) pairs in completion order, where indices
+            are the positions of the job descriptions sharing this result and
+            outcome is (PatchedZip, download_name) or a GenerationError
+        """
+        shared = self.start(kind, "")
+        text = self.prompt_text(shared)
+        shared.template.result()
+
+        groups = {}
+        unique = []
+        for index, job_description in enumerate(job_descriptions):
+            inputs = self.start(kind, job_description, shared=shared)
+            if inputs.job_text not in groups:
+                groups[inputs.job_text] = []
+                unique.append(inputs)
+            groups[inputs.job_text].append(index)
+
+        def run():
+            pool = ThreadPoolExecutor(
+                max_workers=max(1, min(concurrency, len(unique))),
+                thread_name_prefix="bulk",
+            )
+            try:
+                futures = {
+                    pool.submit(self._generate_from, inputs, text, use_cache, reuse_similar): inputs
+                    for inputs in unique
+                }
+                for future in as_completed(futures):
+                    inputs = futures[future]
+                    try:
+                        outcome = future.result()
+                    except GenerationError as e:
+                        outcome = e
+                    yield groups[inputs.job_text], outcome
+            finally:
+                # Stop queued items if the client goes away mid-stream
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        return run()
+
+    def start(self, kind, job_description, shared=None):
+        """
+        Prepare the job description and start fetching the summary and template.
+
+        Args:
+            shared (GenerationInputs, optional): Reuse another generation's
+                in-flight summary and template reads instead of starting new ones
+        """
+        spec = DOCUMENT_KINDS[kind]
+        job_text = prepare_job_desc_text_gemini(job_description)
+        if shared is not None:
+            return GenerationInputs(kind, job_text, shared.summary, shared.template)
+
+        summary = self.executor.submit(self._fetch_summary)
+        template = self.executor.submit(self._fetch_template, spec)
+        return GenerationInputs(kind, job_text, summary, template)
+
+    def prompt_text(self, inputs):
+        """Wait for the inputs the Gemini prompt needs and return its main text."""
+        summary = inputs.summary.result()
+        if not inputs.spec["template_text"]:
+            return summary
+
+        _, template_body = inputs.template.result()
+        return f"{summary}\n\n{template_body}".strip()
+
+    def answer(self, inputs, text, use_cache=True, reuse_similar=False):
+        """Placeholder mapping for the document: a reused near-duplicate result, or a new Gemini call."""
+        match = self._best_similar(inputs, text) if reuse_similar else None
+        if match is not None:
+            logger.info(f"Reusing result of similar job description {match['id']} ({match['similarity']:.0%} similar)")
+            return self._reused_result(match)
+
+        data = self.ask_gemini(inputs, text, use_cache=use_cache)
+        self.remember(inputs, text, data)
+        return data
+
+    def find_similar(self, inputs, text, limit=5):
+        """
+        Earlier results for near-duplicates of this job description.
+
+        Only results generated from the same prompt context (summary, and the
+        template body for resumes) are returned, best match first.
+        """
+        if self.similar_jobs is None or not inputs.job_text:
+            return []
+        return self.similar_jobs.find(inputs.kind, inputs.job_text, context_fingerprint(text), limit=limit)
+
+    def remember(self, inputs, text, data):
+        if self.similar_jobs is None or not inputs.job_text:
+            return
+        try:
+            self.similar_jobs.add(
+                inputs.kind,
+                inputs.job_text,
+                context_fingerprint(text),
+                result=data,
+                meta={"company": str(data.get("<%COMPANYNAME%>") or "")},
+            )
+        except Exception as e:
+            logger.warning(f"Could not record result in the job index: {e}")
+
+    def ask_gemini(self, inputs, text, use_cache=True):
+        """Call Gemini for the document's task and parse the placeholder mapping."""
+        try:
+            result = self.gemini.generate(
+                text=text,
+                second_text=inputs.job_text,
+                task=inputs.spec["task"],
+                use_cache=use_cache,
+            )
+            with metrics.stage("parse_gemini_json", bytes_in=len(result)):
+                return parse_gemini_json(result)
+        except Exception:
+            raise GenerationError(f"{inputs.spec['label']} generation failed.")
+
+    def fill(self, inputs, data):
+        """
+        Fill the template with Gemini's values and build the download name.
+
+        Only the template's XML parts holding placeholders are rewritten; images,
+        fonts and other parts are streamed through unchanged.
+        """
+        spec = inputs.spec
+        template_bytes, _ = inputs.template.result()
+
+        # Names only: the values hold the applicant's and company's details
+        logger.debug(f"Filling {spec['noun']} placeholders: {sorted(data)}")
+        try:
+            # The rewritten XML parts are built here; the rest is copied as the stream is read
+            with metrics.stage("docx_fill", bytes_in=len(template_bytes)) as timer:
+                updated_docx_stream = DocumentUtils.stream_docx_placeholders(
+                    template_bytes,
+                    replacements=data,
+                    plan=DocumentUtils.get_placeholder_plan(template_bytes),
+                )
+                timer.bytes_out = updated_docx_stream.size
+        except Exception:
+            raise GenerationError(f"Failed to populate {spec['noun']} template.")
+
+        # Build a safe filename using the company name (no spaces/special chars)
+        company_raw = str(data.get("<%COMPANYNAME%>") or "").strip()
+        safe_company = re.sub(r"[^A-Za-z0-9]+", "_", company_raw).strip("_") or "document"
+        download_name = f"{spec['filename_prefix']}_{safe_company}.docx"
+        return updated_docx_stream, download_name
+
+    def _generate_from(self, inputs, text, use_cache, reuse_similar=False):
+        data = self.answer(inputs, text, use_cache=use_cache, reuse_similar=reuse_similar)
+        return self.fill(inputs, data)
+
+    def _best_similar(self, inputs, text):
+        matches = self.find_similar(inputs, text, limit=1)
+        return matches[0] if matches else None
+
+    @staticmethod
+    def _reused_result(match):
+        data = dict(match["result"])
+        # The letter date must be today's, not the date of the original generation
+        if "<%DATE%>" in data:
+            data["<%DATE%>"] = get_today_date()
+        return data
+
+    def _fetch_summary(self):
+        try:
+            summary_stream = self.storage.fetch_file("summary.txt", folder="user")
+        except Exception:
+            raise GenerationError("Failed to fetch summary from storage.")
+
+        if not summary_stream:
+            raise GenerationError("Summary not found. Please upload your summary first.", 404)
+
+        summary = summary_stream.read().decode("utf-8")
+        if not summary.strip():
+            raise GenerationError("Summary is empty. Please upload a valid summary.", 400)
+        return summary
+
+    def _fetch_template(self, spec):
+        try:
+            template_stream = self.storage.fetch_file(spec["template"], folder="templates")
+        except Exception:
+            raise GenerationError(f"Failed to fetch {spec['noun']} template from storage.")
+
+        if not template_stream:
+            raise GenerationError(
+                f"{spec['label']} template not found. Please upload {spec['template']} to the templates folder.",
+                404,
+            )
+
+        # Read template bytes once; reuse for text extraction and placeholder replacement
+        template_bytes = template_stream.read()
+        self._load_plan(spec, template_bytes)
+        if not spec["template_text"]:
+            return template_bytes, None
+
+        try:
+            raw_template_text = DocumentUtils.extract_text(BytesIO(template_bytes))
+        except Exception:
+            raise GenerationError(f"Failed to read {spec['noun']} template content.")
+
+        template_lines = raw_template_text.splitlines()
+        template_body = "\n".join(template_lines[3:]) if len(template_lines) > 3 else ""
+        return template_bytes, template_body
+
+    def _load_plan(self, spec, template_bytes):
+        """
+        Make the template's placeholder plan available to fill() without a document walk.
+
+        On an in-memory miss the plan stored next to the template is used; when it
+        is missing or was compiled from other bytes, the plan is compiled and
+        stored again.
+        """
+        if DocumentUtils.cached_placeholder_plan(template_bytes) is not None:
+            return
+
+        plan_name = f"{spec['template']}{PLAN_SUFFIX}"
+        try:
+            stored = self.storage.fetch_file(plan_name, folder="templates")
+            if DocumentUtils.load_placeholder_plan(stored.read(), template_bytes) is not None:
+                return
+        except Exception:
+            pass  # not stored yet
+
+        try:
+            plan = DocumentUtils.compile_placeholder_plan(template_bytes)
+            self.storage.upload_file(DocumentUtils.dump_placeholder_plan(plan), plan_name, folder="templates")
+        except Exception as e:
+            # fill() compiles the plan again and reports a broken template
+            logger.warning(f"Could not store the placeholder plan of {spec['template']}: {e}")
@@ -0,0 +1,277 @@
+"""
+Near-duplicate index of job descriptions, used to reuse earlier Gemini results.
+
+Each prepared job description (output of prepare_job_desc_text_gemini) gets a
+64-bit SimHash over its word shingles. Postings copied between job boards
+differ only in formatting or a few words, so their SimHashes differ in a few
+bits. Lookups use LSH banding: the hash is cut into ``max_distance + 1`` bands,
+and by the pigeonhole principle any hash within ``max_distance`` bits shares
+at least one band exactly, so only those candidates are compared.
+
+Entries are appended to a JSONL file and reloaded on start.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+# Share of max_entries dropped at once when the index overflows
+EVICT_FRACTION = 0.1
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+def simhash(text, shingle=2):
+    """64-bit SimHash of the text's lowercased word shingles."""
+    words = _WORDS.findall(text.lower())
+    if len(words) >= shingle:
+        features = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    else:
+        features = words
+    if not features:
+        return 0
+
+    # A bit is set when more than half of the feature hashes have it set;
+    # counting down the columns of their binary strings avoids a loop per bit
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+        for feature in features
+    ]
+    half = len(hashes) / 2
+    result = 0
+    for position, column in enumerate(zip(*hashes)):
+        if column.count("1") > half:
+            result |= 1 << (HASH_BITS - 1 - position)
+    return result
+
+
+def similarity(a, b):
+    """Fraction of equal bits between two SimHashes (1.0 = identical)."""
+    return 1.0 - bin(a ^ b).count("1") / HASH_BITS
+
+
+def context_fingerprint(text):
+    """Fingerprint of the non-job-description prompt input (summary, template body)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class JobSimilarityIndex:
+    """
+    Persistent SimHash index of generated documents keyed by job description.
+
+    Args:
+        path (str, optional): JSONL file for persistence; None keeps the index in memory
+        max_distance (int): Maximum differing bits (of 64) for a near-duplicate;
+            8 bits is 87.5% similarity
+        max_entries (int): Beyond this many entries, the oldest 10% are dropped
+    """
+
+    def __init__(self, path=None, max_distance=8, max_entries=50000):
+        if not 0 <= max_distance < 16:
+            raise ValueError("max_distance must be between 0 and 15.")
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._bands = self._band_layout(max_distance + 1)
+        self._entries = {}   # id -> entry
+        self._values = {}    # id -> SimHash as int
+        self._buckets = {}   # (kind, context, band, value) -> set(ids)
+        self._exact = {}     # (kind, context, hash) -> id
+        self._lock = threading.Lock()
+        self._appended = 0
+        self.lookups = 0
+        self.matches = 0
+
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def add(self, kind, job_text, context, result, meta=None):
+        """
+        Remember the Gemini result for a job description.
+
+        An entry with the same kind, context and SimHash is replaced.
+
+        Returns:
+            str: Entry id
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "context": context,
+            "hash": format(simhash(job_text), "016x"),
+            "result": result,
+            "meta": meta or {},
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._insert(entry)
+            self._append(entry)
+            if len(self._entries) > self.max_entries:
+                self._evict_oldest()
+        return entry["id"]
+
+    def find(self, kind, job_text, context, limit=5):
+        """
+        Near-duplicates of a job description generated with the same context.
+
+        Returns:
+            list[dict]: Matching entries (with a "similarity" field), best first
+        """
+        value = simhash(job_text)
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band, (shift, mask) in enumerate(self._bands):
+                candidates.update(self._buckets.get((kind, context, band, value >> shift & mask), ()))
+
+            matches = []
+            for entry_id in candidates:
+                distance = bin(value ^ self._values[entry_id]).count("1")
+                if distance <= self.max_distance:
+                    entry = self._entries[entry_id]
+                    matches.append((distance, -entry["created_at"], entry))
+            matches.sort(key=lambda match: match[:2])
+            if matches:
+                self.matches += 1
+
+        return [
+            dict(entry, similarity=round(1.0 - distance / HASH_BITS, 4))
+            for distance, _, entry in matches[:limit]
+        ]
+
+    def best_match(self, kind, job_text, context):
+        matches = self.find(kind, job_text, context, limit=1)
+        return matches[0] if matches else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "path": self.path,
+            }
+
+    @staticmethod
+    def _band_layout(count):
+        """(shift, mask) for each band; the 64 bits are split as evenly as possible."""
+        layout = []
+        start = 0
+        for band in range(count):
+            width = HASH_BITS // count + (1 if band < HASH_BITS % count else 0)
+            layout.append((start, (1 << width) - 1))
+            start += width
+        return layout
+
+    def _insert(self, entry):
+        value = int(entry["hash"], 16)
+        exact_key = (entry["kind"], entry["context"], value)
+        previous = self._exact.get(exact_key)
+        if previous is not None:
+            self._remove(previous)
+
+        self._entries[entry["id"]] = entry
+        self._values[entry["id"]] = value
+        self._exact[exact_key] = entry["id"]
+        for band, (shift, mask) in enumerate(self._bands):
+            key = (entry["kind"], entry["context"], band, value >> shift & mask)
+            self._buckets.setdefault(key, set()).add(entry["id"])
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        value = self._values.pop(entry_id)
+        self._exact.pop((entry["kind"], entry["context"], value), None)
+        for band, (shift, mask) in enumerate(self._bands):
+            key = (entry["kind"], entry["context"], band, value >> shift & mask)
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict_oldest(self):
+        # Entries are kept in insertion order, so the first ones are the oldest.
+        # Dropping a batch keeps the next adds from evicting one entry each; the
+        # stale lines left in the file are rewritten by the compaction in _append
+        target = self.max_entries - int(self.max_entries * EVICT_FRACTION)
+        overflow = len(self._entries) - target
+        for entry_id in list(self._entries)[:overflow]:
+            self._remove(entry_id)
+
+    def _append(self, entry):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._appended += 1
+        except OSError as e:
+            logger.warning(f"Could not persist job index entry: {e}")
+            return
+
+        # Replaced entries leave stale lines behind; rewrite once they dominate
+        if self._appended > 2 * max(len(self._entries), 1000):
+            self._compact()
+
+    def _compact(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.path)
+            self._appended = len(self._entries)
+        except OSError as e:
+            logger.warning(f"Could not compact job index: {e}")
+
+    def _load(self):
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+
+        lines = 0
+        with f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    int(entry["hash"], 16)
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn write or corrupt line
+                self._insert(entry)
+
+        self._appended = lines
+        if len(self._entries) > self.max_entries:
+            self._evict_oldest()
+        logger.info(f"Job index loaded {len(self._entries)} entries from {self.path}.")
+
+
+
+
+"""
+index = JobSimilarityIndex(path="/tmp/job-index.jsonl", max_distance=8)
+
+context = context_fingerprint(summary_text)
+index.add("coverletter", prepared_job_text, context, result=gemini_json)
+
+match = index.best_match("coverletter", other_prepared_job_text, context)
+if match:
+    print(match["similarity"], match["result"])
+"""
@@ -0,0 +1,243 @@
+"""
+Local background job queue for slow work (document generation, summaries).
+
+Jobs run on a bounded thread pool; their state and results live in SQLite,
+either in memory (default) or in a local file so they survive restarts and can
+be read by every Gunicorn worker. No external broker is needed.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "failed")
+
+# Instance tokens of the JobQueues alive in this process
+_live_instances = set()
+
+
+def _process_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the queue already holds its maximum number of pending jobs."""
+
+
+class JobQueue:
+    """
+    Bounded worker pool with job state kept in SQLite.
+
+    Args:
+        workers (int): Number of jobs executed concurrently
+        max_pending (int): Maximum queued + running jobs before submit() refuses work
+        ttl (float): Seconds a finished job (and its result) is kept
+        db_path (str, optional): SQLite file; None keeps everything in memory
+        stale_after (float): Seconds after which an unfinished job is dropped, so
+            jobs lost with a crashed process cannot fill the queue for good
+    """
+
+    def __init__(self, workers=2, max_pending=32, ttl=3600.0, db_path=None, stale_after=6 * 3600.0):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.stale_after = stale_after
+        # Tells this queue's rows apart from those of an earlier process that had the same PID
+        self._instance = uuid.uuid4().hex
+        _live_instances.add(self._instance)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    http_status INTEGER,
+                    meta TEXT,
+                    filename TEXT,
+                    mimetype TEXT,
+                    result BLOB,
+                    owner INTEGER,
+                    instance TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL
+                )
+                """
+            )
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "instance" not in columns:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN instance TEXT")
+
+            # Jobs left unfinished by a process that no longer exists will never complete.
+            # A row with this PID but none of this process's queue tokens was left by an
+            # earlier process that had the same PID (e.g. a restarted container)
+            orphaned = [
+                row["id"]
+                for row in self._db.execute(
+                    "SELECT id, owner, instance FROM jobs WHERE status IN ('queued', 'running')"
+                )
+                if not _process_alive(row["owner"])
+                or (row["owner"] == os.getpid() and row["instance"] not in _live_instances)
+            ]
+            now = time.time()
+            self._db.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, http_status = 500, "
+                "updated_at = ?, expires_at = ? WHERE id = ?",
+                [("Job interrupted by a server restart.", now, now + self.ttl, job_id) for job_id in orphaned],
+            )
+
+    def submit(self, kind, fn, *args, meta=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return the new job id.
+
+        fn may return None or a (bytes, filename, mimetype) tuple, which becomes
+        the job result. Exceptions mark the job failed; an ``status`` attribute
+        on the exception (e.g. GenerationError) is kept as the HTTP status.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._db:
+            self._purge_expired(now)
+            (pending,) = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()
+            if pending >= self.max_pending:
+                raise JobQueueFullError("Too many pending jobs. Please retry later.")
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, meta, owner, instance, created_at, updated_at, expires_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(meta or {}), os.getpid(), self._instance, now, now, now + self.stale_after),
+            )
+
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Return the job status as a dict (without the result bytes), or None."""
+        with self._lock, self._db:
+            self._purge_expired(time.time())
+            return self._status(job_id)
+
+    def wait(self, job_id, timeout):
+        """Long-poll: block until the job finishes or timeout elapses, then return get()."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._changed:
+            while True:
+                status = self._status(job_id)
+                if status is None or status["status"] in FINISHED_STATUSES:
+                    return status
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return status
+                # Wake up periodically as well, in case another process updated the file
+                self._changed.wait(min(remaining, 1.0))
+
+    def result(self, job_id):
+        """Return (bytes, filename, mimetype) for a finished job with a result, else None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result, filename, mimetype FROM jobs "
+                "WHERE id = ? AND status = 'done' AND (expires_at IS NULL OR expires_at > ?)",
+                (job_id, time.time()),
+            ).fetchone()
+        if row is None or row["result"] is None:
+            return None
+        return bytes(row["result"]), row["filename"], row["mimetype"]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        _live_instances.discard(self._instance)
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status="running", expires_at=time.time() + self.stale_after)
+        try:
+            outcome = fn(*args, **kwargs)
+        except Exception as e:
+            if hasattr(e, "status"):
+                logger.warning(f"Job {job_id} failed: {e}")
+            else:
+                logger.exception(f"Job {job_id} failed.")
+            self._update(
+                job_id,
+                status="failed",
+                error=str(e) or e.__class__.__name__,
+                http_status=getattr(e, "status", 500),
+                expires_at=time.time() + self.ttl,
+            )
+            return
+
+        fields = {"status": "done", "expires_at": time.time() + self.ttl}
+        if outcome is not None:
+            data, filename, mimetype = outcome
+            fields.update(result=sqlite3.Binary(data), filename=filename, mimetype=mimetype)
+        self._update(job_id, **fields)
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._changed, self._db:
+            self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._changed.notify_all()
+
+    def _status(self, job_id):
+        row = self._db.execute(
+            "SELECT id, kind, status, error, http_status, meta, filename, "
+            "created_at, updated_at, expires_at, result IS NOT NULL AS has_result "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "error": row["error"],
+            "http_status": row["http_status"],
+            "meta": json.loads(row["meta"] or "{}"),
+            "filename": row["filename"],
+            "has_result": bool(row["has_result"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "expires_at": row["expires_at"],
+        }
+
+    def _purge_expired(self, now):
+        self._db.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+
+
+
+"""
+jobs = JobQueue(workers=2, max_pending=32, ttl=3600, db_path="jobs.sqlite3")
+
+job_id = jobs.submit("report", lambda: (b"hello", "hello.txt", "text/plain"))
+status = jobs.wait(job_id, timeout=30)   # {"status": "done", ...}
+data, filename, mimetype = jobs.result(job_id)
+"""
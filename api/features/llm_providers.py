@@ -0,0 +1,340 @@
+"""
+Interchangeable backends for GeminiTextGenerator.
+
+Every provider exposes the same call as ``google.generativeai.GenerativeModel``:
+
+    generate_content(prompt, stream=False, request_options=None)
+
+returning an object with ``.text`` and ``.usage_metadata.total_token_count``
+(or an iterator of such chunks when ``stream=True``). Errors are raised as
+``google.api_core.exceptions`` so retry handling is the same for all providers.
+
+- GenaiSdkProvider: the official SDK (configured through its global state)
+- GeminiRestProvider: the Gemini REST API over a pooled keep-alive connection pool
+- StubProvider: canned, offline responses with configurable latency, for load tests
+"""
+
+import sys
+import os
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.data import PROMPTS
+
+
+DEFAULT_GEMINI_URL = "https://generativelanguage.googleapis.com"
+PROVIDER_NAMES = ("sdk", "rest", "stub")
+
+
+class _Usage:
+    def __init__(self, prompt_tokens=0, output_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class LLMResponse:
+    """Minimal response object mirroring the parts of the SDK response we use."""
+
+    def __init__(self, text, prompt_tokens=0, output_tokens=0):
+        self.text = text
+        self.usage_metadata = _Usage(prompt_tokens, output_tokens)
+
+
+def _timeout(request_options):
+    return (request_options or {}).get("timeout")
+
+
+class GenaiSdkProvider:
+    """
+    Calls Gemini through ``google.generativeai``.
+
+    Args:
+        api_key (str): Gemini API key
+        model (str): Gemini model name
+    """
+
+    def __init__(self, api_key, model):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel(model)
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        return self._model.generate_content(prompt, stream=stream, request_options=request_options)
+
+
+class GeminiRestProvider:
+    """
+    Calls the Gemini REST API directly over a urllib3 connection pool.
+
+    Connections are kept alive and reused across requests and threads, and no
+    global SDK state is involved, so several providers (e.g. one pointed at the
+    local stub server) can coexist in one process.
+
+    Args:
+        api_key (str): Gemini API key (sent as the x-goog-api-key header)
+        model (str): Gemini model name
+        base_url (str): API root; point it at the stub server for offline tests
+        pool_size (int): Keep-alive connections kept per host
+    """
+
+    def __init__(self, api_key, model, base_url=DEFAULT_GEMINI_URL, pool_size=10):
+        import urllib3
+
+        self._urllib3 = urllib3
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.http = urllib3.PoolManager(
+            num_pools=4,
+            maxsize=pool_size,
+            retries=False,  # GeminiTextGenerator owns retries
+            headers={"Content-Type": "application/json", "x-goog-api-key": api_key or ""},
+        )
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode("utf-8")
+        timeout = self._request_timeout(_timeout(request_options))
+        if stream:
+            return self._stream(body, timeout)
+
+        response = self._post(f"models/{self.model}:generateContent", body, timeout, preload=True)
+        return self._parse(json.loads(response.data))
+
+    def _stream(self, body, timeout):
+        response = self._post(f"models/{self.model}:streamGenerateContent?alt=sse", body, timeout, preload=False)
+        try:
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if line.startswith("data:"):
+                    yield self._parse(json.loads(line[5:]))
+        except self._urllib3.exceptions.HTTPError as e:
+            raise self._transport_error(e) from e
+        finally:
+            response.release_conn()
+
+    def _post(self, path, body, timeout, preload):
+        try:
+            response = self.http.request(
+                "POST",
+                f"{self.base_url}/v1beta/{path}",
+                body=body,
+                timeout=timeout,
+                preload_content=preload,
+            )
+        except self._urllib3.exceptions.HTTPError as e:
+            raise self._transport_error(e) from e
+
+        if response.status >= 400:
+            data = response.data if preload else response.read()
+            response.release_conn()
+            try:
+                message = json.loads(data)["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                message = data.decode("utf-8", "replace")[:500]
+            raise api_exceptions.from_http_status(response.status, message)
+        return response
+
+    def _request_timeout(self, seconds):
+        if seconds is None:
+            return self._urllib3.Timeout(connect=10.0, read=None)
+        return self._urllib3.Timeout(connect=min(10.0, seconds), read=seconds)
+
+    def _transport_error(self, error):
+        # NewConnectionError subclasses ConnectTimeoutError in urllib3 2.x
+        if isinstance(error, self._urllib3.exceptions.NewConnectionError):
+            return api_exceptions.ServiceUnavailable(f"Gemini connection failed: {error}")
+        if isinstance(error, self._urllib3.exceptions.TimeoutError):
+            return api_exceptions.DeadlineExceeded(f"Gemini request timed out: {error}")
+        return api_exceptions.ServiceUnavailable(f"Gemini connection failed: {error}")
+
+    @staticmethod
+    def _parse(payload):
+        candidates = payload.get("candidates") or []
+        parts = (candidates[0].get("content") or {}).get("parts", []) if candidates else []
+        usage = payload.get("usageMetadata") or {}
+        return LLMResponse(
+            "".join(part.get("text", "") for part in parts),
+            prompt_tokens=usage.get("promptTokenCount", 0),
+            output_tokens=usage.get("candidatesTokenCount", 0),
+        )
+
+
+class LatencyDistribution:
+    """
+    Random latency in seconds described by a short spec string.
+
+    Supported specs: ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STDDEV``,
+    ``lognormal:MEDIAN,SIGMA`` and ``exp:MEAN``. Samples are never negative.
+    """
+
+    def __init__(self, spec="fixed:0", rng=None):
+        self.spec = spec
+        name, _, args = spec.partition(":")
+        try:
+            params = [float(value) for value in args.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'.")
+
+        samplers = {
+            "fixed": (1, lambda r, s: s),
+            "uniform": (2, lambda r, low, high: r.uniform(low, high)),
+            "normal": (2, lambda r, mean, sd: r.gauss(mean, sd)),
+            "lognormal": (2, lambda r, median, sigma: r.lognormvariate(math.log(median), sigma)),
+            "exp": (1, lambda r, mean: r.expovariate(1.0 / mean) if mean > 0 else 0.0),
+        }
+        if name not in samplers or len(params) != samplers[name][0]:
+            raise ValueError(f"Invalid latency spec '{spec}'.")
+        self._sampler = samplers[name][1]
+        self._params = params
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            return max(0.0, self._sampler(self._rng, *self._params))
+
+
+class StubProvider:
+    """
+    Offline provider returning canned responses for every task in PROMPTS.
+
+    The task is recognised from the prompt text. JSON tasks (cover_letter,
+    resume) get an object with a value for every ``<%PLACEHOLDER%>`` in the
+    prompt; summary gets a bullet list.
+
+    Args:
+        latency (str | dict): Latency spec for all tasks, or a dict of
+            task -> spec with an optional "default" entry (see LatencyDistribution)
+        error_rate (float): Fraction of calls failing with a random 429 or 503
+        seed (int, optional): Seed for reproducible latencies and errors
+        stream_chunks (int): Number of chunks a streamed response is split into
+    """
+
+    def __init__(self, latency="fixed:0", error_rate=0.0, seed=None, stream_chunks=8):
+        rng = random.Random(seed)
+        specs = latency if isinstance(latency, dict) else {"default": latency}
+        self.latencies = {task: LatencyDistribution(spec, rng) for task, spec in specs.items()}
+        self.latencies.setdefault("default", LatencyDistribution("fixed:0", rng))
+        self.error_rate = error_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self._rng = rng
+        self._lock = threading.Lock()
+        self.calls = 0
+
+        # Static text before the first placeholder identifies each prompt
+        self._prefixes = [(re.split(r"\{", template, 1)[0][:200], task) for task, template in PROMPTS.items()]
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        task = self.detect_task(prompt)
+        text = self.canned_response(task, prompt)
+        latency = self.latencies.get(task, self.latencies["default"]).sample()
+        tokens = (len(prompt) // 4 + 1, len(text) // 4 + 1)
+
+        if stream:
+            return self._stream(text, latency, tokens, _timeout(request_options))
+
+        self._wait(latency, _timeout(request_options))
+        return LLMResponse(text, *tokens)
+
+    def detect_task(self, prompt):
+        for prefix, task in self._prefixes:
+            if prefix and prompt.startswith(prefix):
+                return task
+        return "default"
+
+    @staticmethod
+    def canned_response(task, prompt):
+        if task == "summary":
+            return "\n".join(
+                [
+                    "- Key skills: Python, SQL, data analysis, cloud services",
+                    "- Career history: 4 years building backend services and data pipelines",
+                    "- Education: B.S. in Computer Science",
+                    "- Tools: Flask, PostgreSQL, Docker, AWS",
+                    "- Strengths: ownership, clear communication, fast learner",
+                ]
+            )
+
+        names = list(dict.fromkeys(re.findall(r"<%[^%<>]+%>", prompt)))
+        if not names:
+            return json.dumps({"text": f"Stub response for '{task}'."})
+
+        values = {}
+        for name in names:
+            key = name[2:-2].split()[0].upper()
+            if key == "COMPANYNAME":
+                values[name] = "Stub Company"
+            elif key == "DATE":
+                values[name] = time.strftime("%B %d, %Y")
+            else:
+                values[name] = f"Stub text for {key.lower()}."
+        return json.dumps(values, indent=2)
+
+    def _wait(self, latency, timeout):
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate and self._rng.random() < self.error_rate
+            error = self._rng.choice((api_exceptions.TooManyRequests, api_exceptions.ServiceUnavailable))
+
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise api_exceptions.DeadlineExceeded(f"Stub latency {latency:.2f}s exceeded {timeout}s.")
+        time.sleep(latency)
+        if fail:
+            raise error("Stub provider injected failure.")
+
+    def _stream(self, text, latency, tokens, timeout):
+        # Most of the latency is spent before the first chunk, like a real model
+        self._wait(latency * 0.5, timeout)
+        size = -(-len(text) // self.stream_chunks)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(latency * 0.5 / len(pieces))
+            last = index == len(pieces) - 1
+            yield LLMResponse(piece, *(tokens if last else (0, 0)))
+
+
+def build_provider(name, api_key=None, model="gemini-2.5-flash", base_url=None, pool_size=10,
+                   stub_latency="fixed:0", stub_error_rate=0.0, stub_seed=None):
+    """
+    Create a provider by name ("sdk", "rest" or "stub").
+
+    An API key is required for "sdk" and "rest"; "stub" never contacts Gemini.
+    """
+    name = (name or "sdk").lower()
+    if name == "stub":
+        return StubProvider(latency=stub_latency, error_rate=stub_error_rate, seed=stub_seed)
+
+    if not api_key:
+        raise ValueError("Gemini API key is required.")
+    if name == "sdk":
+        return GenaiSdkProvider(api_key, model)
+    if name == "rest":
+        return GeminiRestProvider(api_key, model, base_url=base_url or DEFAULT_GEMINI_URL, pool_size=pool_size)
+    raise ValueError(f"Unknown LLM provider '{name}'. Must be one of {list(PROVIDER_NAMES)}.")
+
+
+
+
+"""
+# Offline: canned JSON, ~0.8s median latency per call, 2% injected 429/503s
+stub = StubProvider(latency={"default": "lognormal:0.8,0.4", "summary": "fixed:0.2"}, error_rate=0.02)
+gemini = GeminiTextGenerator(provider=stub)
+
+# Real API over pooled keep-alive connections
+rest = GeminiRestProvider(api_key="YOUR_GEMINI_API_KEY", model="gemini-2.5-flash", pool_size=16)
+gemini = GeminiTextGenerator(api_key="YOUR_GEMINI_API_KEY", provider=rest)
+
+# REST provider against the local stub server (python -m features.llm_stub_server --port 8089)
+local = GeminiRestProvider(api_key="stub", model="gemini-2.5-flash", base_url="http://127.0.0.1:8089")
+"""
@@ -0,0 +1,130 @@
+"""
+Local HTTP server speaking the subset of the Gemini REST API used by GeminiRestProvider.
+
+Responses come from StubProvider, so the whole service (including the pooled
+HTTP transport) can be load tested without network access or an API key.
+
+    cd api && python -m features.llm_stub_server --port 8089 --latency lognormal:0.8,0.4
+"""
+
+import sys
+import os
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.api_core import exceptions as api_exceptions
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from features.llm_providers import StubProvider
+
+
+ROUTE = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    provider = None  # set by make_server()
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        match = ROUTE.match(path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if not match:
+            return self._send_error(404, "Not found.")
+
+        try:
+            payload = json.loads(body or b"{}")
+            prompt = "".join(
+                part.get("text", "")
+                for content in payload.get("contents", [])
+                for part in content.get("parts", [])
+            )
+        except (ValueError, AttributeError):
+            return self._send_error(400, "Invalid JSON body.")
+
+        try:
+            if match.group("method") == "generateContent":
+                self._send_json(200, self._to_json(self.provider.generate_content(prompt)))
+            else:
+                self._send_stream(self.provider.generate_content(prompt, stream=True), "alt=sse" in query)
+        except api_exceptions.GoogleAPIError as e:
+            self._send_error(e.code or 500, e.message)
+
+    def _send_stream(self, chunks, sse):
+        first = next(chunks)  # surface errors before the 200 status line is sent
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(data):
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        for chunk in [first, *chunks]:
+            write(f"data: {json.dumps(self._to_json(chunk))}\r\n\r\n".encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": {"code": status, "message": message}})
+
+    @staticmethod
+    def _to_json(response):
+        usage = response.usage_metadata
+        return {
+            "candidates": [
+                {"content": {"role": "model", "parts": [{"text": response.text}]}, "finishReason": "STOP"}
+            ],
+            "usageMetadata": {
+                "promptTokenCount": usage.prompt_token_count,
+                "candidatesTokenCount": usage.candidates_token_count,
+                "totalTokenCount": usage.total_token_count,
+            },
+        }
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8089, provider=None):
+    """Create (but do not start) a threaded stub server; port 0 picks a free port."""
+    handler = type("Handler", (StubGeminiHandler,), {"provider": provider or StubProvider()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Gemini API stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="e.g. fixed:0.5, uniform:0.2,1.5, lognormal:0.8,0.4")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    provider = StubProvider(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    server = make_server(args.host, args.port, provider)
+    print(f"Stub Gemini API listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""
+Persistent Chromium pool for HTML -> PDF rendering using Playwright.
+
+A single background thread runs an asyncio event loop that owns the Playwright
+driver and a fixed number of long-lived headless browsers. Flask handlers hand
+render jobs to that loop, so a request only pays for the page render instead of
+a Chromium launch.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderError(RuntimeError):
+    """Raised when an HTML document could not be rendered to PDF."""
+
+
+class _BrowserSlot:
+    """
+    One long-lived browser plus the bookkeeping used to balance and recycle it.
+
+    A browser due for recycling is detached from the slot at once, so new work
+    goes to its replacement; it is closed when the pages still rendering in it
+    finish (``leases`` counts them per browser).
+    """
+
+    def __init__(self, index, max_pages):
+        self.index = index
+        self.marker = f"--pdf-pool-slot={uuid.uuid4().hex}"
+        self.browser = None
+        self.pid = None
+        self.renders = 0
+        self.active = 0
+        self.leases = {}   # browser -> pages rendering in it
+        self.launches = 0
+        self.last_health_check = 0.0
+        self.pages = asyncio.Semaphore(max_pages)
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    """
+    Process-wide pool of headless Chromium browsers.
+
+    Args:
+        size (int): Number of browsers kept alive
+        max_pages (int): Maximum concurrent pages per browser
+        max_renders (int): Recycle a browser after this many renders (0 = never)
+        max_memory_mb (int): Recycle a browser once its process tree exceeds this RSS (0 = never)
+        health_interval (float): Minimum seconds between memory checks of one browser
+        render_timeout (float): Seconds a single render may take before it is abandoned
+    """
+
+    def __init__(
+        self,
+        size=1,
+        max_pages=4,
+        max_renders=200,
+        max_memory_mb=0,
+        health_interval=30.0,
+        render_timeout=60.0,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1.")
+
+        self.size = size
+        self.max_pages = max_pages
+        self.max_renders = max_renders
+        self.max_memory_mb = max_memory_mb
+        self.health_interval = health_interval
+        self.render_timeout = render_timeout
+
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._slots = []
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._recycled = 0
+
+    # ------------------------------------------------------------------ #
+    # Public (thread-safe) API
+    # ------------------------------------------------------------------ #
+    def render(self, html, **pdf_options):
+        """
+        Render one HTML document to PDF bytes.
+
+        Args:
+            html (str): Full HTML content
+            **pdf_options: Extra keyword arguments for ``page.pdf`` (format, margin, ...)
+
+        Returns:
+            bytes: PDF content
+        """
+        return self._submit(self._render(html, pdf_options), self.render_timeout)
+
+    def render_batch(self, html_documents, **pdf_options):
+        """
+        Render several HTML documents concurrently in one browser.
+
+        Pages are opened in parallel up to ``max_pages``. A failing document does
+        not abort the batch; its slot in the result holds the exception instead.
+
+        Args:
+            html_documents (list[str]): HTML content for each document
+            **pdf_options: Extra keyword arguments for ``page.pdf``
+
+        Returns:
+            list[bytes | Exception]: One entry per input document, in input order
+        """
+        html_documents = list(html_documents)
+        if not html_documents:
+            return []
+
+        waves = -(-len(html_documents) // self.max_pages)
+        timeout = self.render_timeout * (waves + 1)
+        return self._submit(self._render_batch(html_documents, pdf_options), timeout)
+
+    def stats(self):
+        """Return a snapshot of the pool state (safe to call from any thread)."""
+        return {
+            "started": self._loop is not None,
+            "size": self.size,
+            "max_pages": self.max_pages,
+            "recycled": self._recycled,
+            "browsers": [
+                {
+                    "index": slot.index,
+                    "connected": bool(slot.browser and slot.browser.is_connected()),
+                    "renders": slot.renders,
+                    "active": slot.active,
+                    "launches": slot.launches,
+                    "draining": sum(1 for browser in slot.leases if browser is not slot.browser),
+                }
+                for slot in self._slots
+            ],
+        }
+
+    def close(self):
+        """Close every browser, stop Playwright and join the event loop thread."""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+            loop, thread = self._loop, self._thread
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception as e:
+            logger.warning(f"PDF pool shutdown did not complete cleanly: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=10)
+
+    # ------------------------------------------------------------------ #
+    # Event loop plumbing
+    # ------------------------------------------------------------------ #
+    def _ensure_started(self):
+        if self._loop is not None:
+            return
+        with self._start_lock:
+            if self._closed:
+                raise PdfRenderError("PDF renderer has been shut down.")
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+                loop.close()
+
+            thread = threading.Thread(target=run, name="pdf-pool", daemon=True)
+            thread.start()
+            ready.wait()
+
+            startup = asyncio.run_coroutine_threadsafe(self._startup(), loop)
+            try:
+                startup.result(timeout=60)
+            except Exception as e:
+                startup.cancel()
+                # A start that timed out may still hold the driver or a browser
+                try:
+                    asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+                except Exception:
+                    pass
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(timeout=10)
+                raise PdfRenderError(f"Failed to start Playwright: {e}") from e
+
+            self._loop = loop
+            self._thread = thread
+            atexit.register(self.close)
+
+    def _submit(self, coro, timeout):
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError as e:
+            future.cancel()
+            raise PdfRenderError(f"PDF rendering timed out after {timeout} seconds.") from e
+
+    async def _startup(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._slots = [_BrowserSlot(i, self.max_pages) for i in range(self.size)]
+        # Launch the first browser eagerly so configuration errors surface on startup;
+        # the rest are launched lazily on first use.
+        try:
+            await self._ensure_browser(self._slots[0])
+        except BaseException:
+            # Do not leave the Playwright driver running behind a failed start
+            await self._shutdown()
+            raise
+
+    async def _shutdown(self):
+        for slot in self._slots:
+            browsers = set(slot.leases)
+            if slot.browser is not None:
+                browsers.add(slot.browser)
+            for browser in browsers:
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+            slot.browser = None
+            slot.leases.clear()
+        playwright, self._playwright = self._playwright, None
+        if playwright is not None:
+            await playwright.stop()
+
+    # ------------------------------------------------------------------ #
+    # Browser lifecycle
+    # ------------------------------------------------------------------ #
+    def _checkout(self, count=1):
+        """Pick the least busy slot; browsers being recycled no longer take work, so any slot will do."""
+        slot = min(self._slots, key=lambda s: s.active)
+        slot.active += count
+        return slot
+
+    async def _lease(self, slot, count=1):
+        """The slot's current browser (launched if needed), counted as used by ``count`` pages."""
+        browser = await self._ensure_browser(slot)
+        slot.leases[browser] = slot.leases.get(browser, 0) + count
+        return browser
+
+    async def _ensure_browser(self, slot):
+        async with slot.lock:
+            if slot.browser is not None and slot.browser.is_connected():
+                return slot.browser
+
+            if slot.browser is not None:
+                logger.warning(f"PDF browser {slot.index} disconnected; relaunching.")
+                try:
+                    await slot.browser.close()
+                except Exception:
+                    pass
+
+            slot.browser = await self._playwright.chromium.launch(headless=True, args=[slot.marker])
+            slot.pid = None
+            slot.renders = 0
+            slot.launches += 1
+            slot.last_health_check = time.monotonic()
+            logger.info(f"PDF browser {slot.index} launched.")
+            return slot.browser
+
+    async def _release(self, slot, browser):
+        """End one page's use of a browser leased with _lease (None if it never got one)."""
+        slot.active -= 1
+        if browser is None:
+            return
+
+        if browser is slot.browser:
+            slot.renders += 1
+            if self._needs_recycle(slot):
+                # Detached now, so the next render launches the replacement instead
+                # of feeding this browser; it is closed once its pages finish
+                slot.browser = None
+                self._recycled += 1
+                logger.info(f"Recycling PDF browser {slot.index} after {slot.renders} renders.")
+
+        slot.leases[browser] -= 1
+        if slot.leases[browser] == 0:
+            del slot.leases[browser]
+            if browser is not slot.browser:
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+
+    def _needs_recycle(self, slot):
+        if self.max_renders and slot.renders >= self.max_renders:
+            return True
+
+        if not self.max_memory_mb:
+            return False
+
+        now = time.monotonic()
+        if now - slot.last_health_check < self.health_interval:
+            return False
+        slot.last_health_check = now
+
+        rss = self._browser_rss_bytes(slot)
+        return rss is not None and rss > self.max_memory_mb * 1024 * 1024
+
+    def _browser_rss_bytes(self, slot):
+        """Resident memory of the browser process and its children, or None if unknown."""
+        try:
+            import psutil
+        except ImportError:
+            return None
+
+        try:
+            if slot.pid is None:
+                for proc in psutil.process_iter(["pid", "cmdline"]):
+                    if slot.marker in (proc.info.get("cmdline") or []):
+                        slot.pid = proc.info["pid"]
+                        break
+                else:
+                    return None
+
+            root = psutil.Process(slot.pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return total
+        except psutil.Error:
+            slot.pid = None
+            return None
+
+    # ------------------------------------------------------------------ #
+    # Rendering
+    # ------------------------------------------------------------------ #
+    async def _render(self, html, pdf_options):
+        slot = self._checkout()
+        browser = None
+        try:
+            browser = await self._lease(slot)
+            async with slot.pages:
+                return await self._render_page(browser, html, pdf_options)
+        finally:
+            await self._release(slot, browser)
+
+    async def _render_batch(self, html_documents, pdf_options):
+        slot = self._checkout(len(html_documents))
+
+        async def render_one(html):
+            try:
+                async with slot.pages:
+                    return await asyncio.wait_for(
+                        self._render_page(browser, html, pdf_options), self.render_timeout
+                    )
+            except asyncio.TimeoutError:
+                return PdfRenderError(f"PDF rendering timed out after {self.render_timeout} seconds.")
+            except Exception as e:
+                return e
+            finally:
+                await self._release(slot, browser)
+
+        try:
+            browser = await self._lease(slot, len(html_documents))
+        except Exception:
+            for _ in html_documents:
+                await self._release(slot, None)
+            raise
+
+        return await asyncio.gather(*(render_one(html) for html in html_documents))
+
+    async def _render_page(self, browser, html, pdf_options):
+        options = {"format": "Letter", "print_background": True}
+        options.update(pdf_options)
+
+        # One stage per document, batched or not; timing starts once a page slot is free
+        with metrics.stage("pdf_render", bytes_in=len(html)) as timer:
+            context = await browser.new_context()
+            try:
+                page = await context.new_page()
+                await page.set_content(html, wait_until="networkidle")
+                pdf = await page.pdf(**options)
+                timer.bytes_out = len(pdf)
+                return pdf
+            finally:
+                await context.close()
+
+
+
+
+"""
+# Create once per process
+pool = BrowserPool(size=2, max_pages=4, max_renders=200, max_memory_mb=512)
+
+# Render from any thread
+pdf_bytes = pool.render("<h1>Hello</h1>")
+with open("hello.pdf", "wb") as f:
+    f.write(pdf_bytes)
+
+# Render a batch in one browser; failures come back as exceptions
+results = pool.render_batch(["<h1>One</h1>", "<h1>Two</h1>"])
+
+# Shut down (also registered with atexit)
+pool.close()
+"""
@@ -0,0 +1,237 @@
+"""
+Offline prompt budgeting: keep the parts of the resume summary / template that matter for a job.
+
+Text is split into lines grouped under their headings, each line is scored
+against the job description with BM25, and the best lines are kept (in their
+original order) until the task's token budget is used. Lines containing
+template placeholders are always kept, since Gemini has to fill every one.
+"""
+
+import math
+import re
+import threading
+from collections import Counter, deque
+
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+_TERMS = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_BULLET = re.compile(r"^\s*(?:[-*•▪◦]|\d+[.)])\s+")
+PLACEHOLDER_MARKER = "<%"
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to "
+    "was we were will with you your they them who what when where which while also into than then "
+    "such can may must should would about over under within across per etc".split()
+)
+
+DEFAULT_BUDGETS = {"cover_letter": 1500, "resume": 3000}
+
+
+def estimate_tokens(text):
+    """
+    Rough token count without a tokenizer: one token per punctuation mark and
+    about one per four characters of each word (close to Gemini's SentencePiece
+    counts for English).
+    """
+    return sum(-(-len(piece) // 4) for piece in _TOKEN_PIECES.findall(text))
+
+
+def _terms(text):
+    return [term for term in _TERMS.findall(text.lower()) if term not in STOPWORDS]
+
+
+class _Unit:
+    __slots__ = ("index", "text", "tokens", "heading", "required", "score")
+
+    def __init__(self, index, text, heading, required):
+        self.index = index
+        self.text = text
+        self.tokens = estimate_tokens(text) + 1  # + newline
+        self.heading = heading
+        self.required = required
+        self.score = 0.0
+
+
+class BudgetReport:
+    """What the budgeter did to one prompt input."""
+
+    def __init__(self, task, tokens_before, tokens_after, lines_before, lines_after, budget):
+        self.task = task
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.lines_before = lines_before
+        self.lines_after = lines_after
+        self.budget = budget
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def as_dict(self):
+        return {
+            "task": self.task,
+            "budget": self.budget,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "lines_before": self.lines_before,
+            "lines_after": self.lines_after,
+        }
+
+
+class PromptBudgeter:
+    """
+    Trim prompt input text to a per-task token budget, keeping the most job-relevant lines.
+
+    Args:
+        budgets (dict): task -> token budget for the main prompt text; tasks
+            without a budget are passed through unchanged
+        k1 (float): BM25 term-frequency saturation
+        b (float): BM25 length normalization
+        history (int): Number of recent reports kept for stats()
+    """
+
+    def __init__(self, budgets=None, k1=1.5, b=0.75, history=50):
+        self.budgets = dict(DEFAULT_BUDGETS if budgets is None else budgets)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=history)
+        self._requests = 0
+        self._trimmed = 0
+        self._tokens_before = 0
+        self._tokens_saved = 0
+
+    def fit(self, text, task, query):
+        """
+        Return (text, BudgetReport) with text reduced to the task's budget.
+
+        Text that already fits, or a task without a budget or query, is returned unchanged.
+        """
+        budget = self.budgets.get(task)
+        tokens_before = estimate_tokens(text)
+        lines = text.splitlines()
+        if not budget or not query or tokens_before <= budget:
+            return text, self._record(BudgetReport(task, tokens_before, tokens_before, len(lines), len(lines), budget))
+
+        units = self._parse(lines)
+        self._score(units, _terms(query))
+        kept = self._select(units, budget)
+
+        result = "\n".join(lines[index] for index in sorted(kept))
+        report = BudgetReport(task, tokens_before, estimate_tokens(result), len(lines), len(kept), budget)
+        return result, self._record(report)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budgets": dict(self.budgets),
+                "requests": self._requests,
+                "trimmed": self._trimmed,
+                "tokens_before": self._tokens_before,
+                "tokens_saved": self._tokens_saved,
+                "recent": list(self._recent),
+            }
+
+    @staticmethod
+    def _parse(lines):
+        """Split lines into scorable units, each linked to the heading it appears under."""
+        units = []
+        heading = None
+        section_has_lines = False
+        for index, line in enumerate(lines):
+            stripped = line.strip()
+            if not stripped:
+                # A blank line ends a section, unless it directly follows the heading
+                if section_has_lines:
+                    heading = None
+                continue
+            required = PLACEHOLDER_MARKER in line
+            if not required and PromptBudgeter._is_heading(stripped):
+                heading = _Unit(index, line, None, False)
+                section_has_lines = False
+                continue
+            units.append(_Unit(index, line, heading, required))
+            section_has_lines = True
+        return units
+
+    @staticmethod
+    def _is_heading(line):
+        if _BULLET.match(line):
+            return False
+        if line.startswith("#") or line.endswith(":") or (line.startswith("**") and line.endswith("**")):
+            return True
+        return line.isupper() and len(line.split()) <= 6
+
+    def _score(self, units, query_terms):
+        """Score every unit against the query with BM25 (units are the documents)."""
+        if not units or not query_terms:
+            return
+        documents = [Counter(_terms(unit.text)) for unit in units]
+        lengths = [sum(document.values()) for document in documents]
+        average = (sum(lengths) / len(lengths)) or 1.0
+        document_frequency = Counter(term for document in documents for term in document)
+        total = len(documents)
+
+        for unit, document, length in zip(units, documents, lengths):
+            score = 0.0
+            for term in set(query_terms):
+                frequency = document.get(term)
+                if not frequency:
+                    continue
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                score += idf * frequency * (self.k1 + 1) / (
+                    frequency + self.k1 * (1 - self.b + self.b * length / average)
+                )
+            unit.score = score
+
+    @staticmethod
+    def _select(units, budget):
+        """Pick line indices: required lines first, then by score, each with its heading."""
+        kept = set()
+        used = 0
+
+        def take(unit, force=False):
+            nonlocal used
+            cost = unit.tokens
+            heading = unit.heading
+            if heading is not None and heading.index not in kept:
+                cost += heading.tokens
+            if not force and used + cost > budget:
+                return
+            kept.add(unit.index)
+            if heading is not None:
+                kept.add(heading.index)
+            used += cost
+
+        for unit in units:
+            if unit.required:
+                take(unit, force=True)
+
+        ranked = sorted((unit for unit in units if not unit.required), key=lambda unit: (-unit.score, unit.index))
+        for unit in ranked:
+            take(unit)
+        return kept
+
+    def _record(self, report):
+        with self._lock:
+            self._requests += 1
+            self._tokens_before += report.tokens_before
+            if report.tokens_saved:
+                self._trimmed += 1
+                self._tokens_saved += report.tokens_saved
+                self._recent.append(report.as_dict())
+        return report
+
+
+
+
+"""
+budgeter = PromptBudgeter(budgets={"cover_letter": 1200, "resume": 2500})
+text, report = budgeter.fit(summary_text, "cover_letter", query=job_description)
+print(report.tokens_saved, report.as_dict())
+
+# Used by GeminiTextGenerator before building the prompt
+gemini = GeminiTextGenerator(api_key="YOUR_GEMINI_API_KEY", budgeter=budgeter)
+"""
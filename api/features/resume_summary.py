@@ -0,0 +1,165 @@
+"""
+Resume summarization in the background, after /api/upload has stored the file.
+
+Text extraction, the Gemini summary call and the summary upload run as a
+JobQueue job, so the upload request only waits for the storage write. The job
+reads the upload from a temporary file it owns and deletes, so pending jobs do
+not hold resumes in memory. When
+several resumes are uploaded in quick succession, only the job of the latest
+upload writes summary/resume_summary.txt; earlier jobs that finish later end
+as superseded instead of overwriting it.
+"""
+
+import sys
+import os
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from helper.helper import prepare_text_for_gemini
+from features.generation import GenerationError
+from utils.documentUtils import DocumentUtils
+from utils.pdf_extract import PdfExtractionError
+
+
+SUMMARY_FILENAME = "resume_summary.txt"
+SUMMARY_FOLDER = "summary"
+JOB_KIND = "summary"
+SUPERSEDED_STATUS = 409
+
+
+class SummarySupersededError(GenerationError):
+    """A newer resume was uploaded while this summary was being generated."""
+
+    def __init__(self):
+        super().__init__("Superseded by a newer resume upload.", SUPERSEDED_STATUS)
+
+
+class ResumeSummarizer:
+    """
+    Queue summary jobs for uploaded resumes.
+
+    The latest-upload check is kept per process, which matches the single
+    process the JobQueue runs its jobs in.
+
+    Args:
+        storage (BaseStorage): Where the summary is written
+        gemini (GeminiTextGenerator): Generates the summary
+        jobs (JobQueue): Runs the summary jobs
+        max_chars (int, optional): Extraction budget passed to DocumentUtils.extract_text
+    """
+
+    def __init__(self, storage, gemini, jobs, max_chars=None):
+        self.storage = storage
+        self.gemini = gemini
+        self.jobs = jobs
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._sequence = 0
+        self._latest_job_id = None
+
+    def submit(self, path, digest=None, use_cache=True):
+        """
+        Queue the summary of a resume that has just been stored.
+
+        Args:
+            path (str): Temporary file holding the uploaded PDF or DOCX (see
+                utils.upload.keep_upload); the job deletes it when it ends
+            digest (str, optional): SHA-256 of the file, reused as the extraction cache key
+            use_cache (bool): Allow cached Gemini responses
+
+        Returns:
+            str: Job id
+
+        Raises:
+            JobQueueFullError: Too many jobs are pending (the file is deleted)
+        """
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            try:
+                job_id = self.jobs.submit(
+                    JOB_KIND,
+                    self._summarize,
+                    sequence,
+                    path,
+                    digest,
+                    use_cache,
+                    meta={"sequence": sequence},
+                )
+            except BaseException:
+                self._discard(path)
+                raise
+            self._latest_job_id = job_id
+        return job_id
+
+    def latest_job_id(self):
+        with self._lock:
+            return self._latest_job_id
+
+    def status(self, job_id):
+        """
+        Summary job status as pending, done, failed or superseded.
+
+        Returns:
+            dict | None: {"job_id", "status", "error"}, or None for unknown or expired jobs
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job["kind"] != JOB_KIND:
+            return None
+
+        status = job["status"]
+        if status in ("queued", "running"):
+            status = "pending"
+        elif status == "failed" and job["http_status"] == SUPERSEDED_STATUS:
+            status = "superseded"
+        return {
+            "job_id": job["job_id"],
+            "status": status,
+            "error": job["error"] if status in ("failed", "superseded") else None,
+        }
+
+    def _summarize(self, sequence, path, digest, use_cache):
+        try:
+            # Opened at position 0 with its digest, the file is parsed in place
+            # and the digest is the extraction cache key
+            with open(path, "rb") as f:
+                extracted_text = DocumentUtils.extract_text(f, max_chars=self.max_chars, digest=digest)
+        except PdfExtractionError as e:
+            raise GenerationError(f"Could not read the PDF: {e}", 422)
+        except ValueError as e:
+            raise GenerationError(str(e), 422)
+        finally:
+            self._discard(path)
+
+        extracted_text = prepare_text_for_gemini(extracted_text)
+        summary_text = self.gemini.generate(extracted_text, "summary", use_cache=use_cache)
+
+        # Holding the write lock across the check and the write keeps a newer job
+        # from writing first and then being overwritten by this one
+        with self._write_lock:
+            with self._lock:
+                superseded = sequence != self._sequence
+            if superseded:
+                raise SummarySupersededError()
+            # A single PUT: readers see either the previous summary or the complete new one
+            self.storage.upload_file(summary_text.encode("utf-8"), SUMMARY_FILENAME, folder=SUMMARY_FOLDER)
+        return None
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+
+
+"""
+summarizer = ResumeSummarizer(storage, gemini, jobs, max_chars=40000)
+
+job_id = summarizer.submit(keep_upload(file.stream), digest=file_digest(file.stream))
+summarizer.status(job_id)   # {"job_id": ..., "status": "pending", "error": None}
+"""
@@ -0,0 +1,302 @@
+"""
+Storage backends for uploaded files, templates and summaries.
+
+Every backend exposes the same methods as SupabaseStorage (upload_file,
+fetch_file, list_files, delete_file, cache_stats), so the app and the
+benchmarks can run against S3, a local directory or process memory. The
+backend is chosen with build_storage(), from the STORAGE_BACKEND setting;
+MeteredStorage adds latency, error and byte metrics around any of them.
+"""
+
+import io
+import os
+from abc import ABC, abstractmethod
+import posixpath
+import shutil
+import tempfile
+import threading
+
+
+STORAGE_BACKENDS = ("s3", "local", "memory")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class BaseStorage(ABC):
+    """
+    Interface shared by the storage backends.
+
+    Keys are "folder/file_name" (or just "file_name"); folders are key prefixes.
+    Failures, including a missing file, raise RuntimeError.
+    """
+
+    bucket = None
+
+    @abstractmethod
+    def upload_file(self, data, file_name, folder=None):
+        """
+        Store a file (bytes or binary file-like object), replacing any previous one.
+
+        Returns:
+            dict: Upload info with bucket and key
+        """
+
+    @abstractmethod
+    def fetch_file(self, file_name, folder=None):
+        """
+        Returns:
+            BytesIO: File content
+        """
+
+    @abstractmethod
+    def list_files(self, folder=None):
+        """
+        Yield the keys in the bucket (or a specific folder), in key order.
+        """
+
+    @abstractmethod
+    def delete_file(self, file_name, folder=None):
+        """Remove a file."""
+
+    def cache_stats(self):
+        """Counters of the fetch_file cache; empty for backends without one."""
+        return {}
+
+    @staticmethod
+    def _key(file_name, folder=None):
+        return f"{folder.strip('/')}/{file_name}" if folder else file_name
+
+    @staticmethod
+    def _prefix(folder=None):
+        return f"{folder.strip('/')}/" if folder else ""
+
+
+class LocalStorage(BaseStorage):
+    """
+    Files in a local directory, one file per key.
+
+    Writes go to a temporary file that is renamed into place, so readers never
+    see a partially written file.
+
+    Args:
+        root (str): Directory holding the files (created if missing)
+        bucket (str): Name reported in upload results
+    """
+
+    TEMP_PREFIX = ".upload-"
+
+    def __init__(self, root, bucket="local"):
+        self.root = os.path.abspath(root)
+        self.bucket = bucket
+        os.makedirs(self.root, exist_ok=True)
+
+    def upload_file(self, data, file_name, folder=None):
+        key = self._key(file_name, folder)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=self.TEMP_PREFIX, dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, (bytes, bytearray)):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f, COPY_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._discard(tmp_path)
+            raise RuntimeError(f"Failed to upload '{key}' to local storage: {e}")
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+
+        return {"bucket": self.bucket, "key": key}
+
+    def fetch_file(self, file_name, folder=None):
+        key = self._key(file_name, folder)
+        try:
+            with open(self._path(key), "rb") as f:
+                return io.BytesIO(f.read())
+        except OSError as e:
+            raise RuntimeError(f"Failed to fetch '{key}' from local storage: {e}")
+
+    def list_files(self, folder=None):
+        prefix = self._prefix(folder)
+        # Only the directory the prefix points into needs to be walked
+        start = self._path(prefix.rstrip("/")) if prefix else self.root
+        keys = []
+        for directory, dirnames, filenames in os.walk(start):
+            dirnames.sort()
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            for name in filenames:
+                if name.startswith(self.TEMP_PREFIX):
+                    continue
+                keys.append(name if relative == "." else f"{relative}/{name}")
+        yield from sorted(keys)
+
+    def delete_file(self, file_name, folder=None):
+        key = self._key(file_name, folder)
+        try:
+            os.remove(self._path(key))
+        except OSError as e:
+            raise RuntimeError(f"Failed to delete '{key}' from local storage: {e}")
+
+    def _path(self, key):
+        normalized = posixpath.normpath(key.lstrip("/"))
+        if normalized.startswith("..") or normalized == ".":
+            raise RuntimeError(f"Invalid storage key '{key}'.")
+        return os.path.join(self.root, *normalized.split("/"))
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MemoryStorage(BaseStorage):
+    """
+    Files kept in a dict, for tests, benchmarks and running without any storage service.
+
+    Args:
+        bucket (str): Name reported in upload results
+    """
+
+    def __init__(self, bucket="memory"):
+        self.bucket = bucket
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def upload_file(self, data, file_name, folder=None):
+        key = self._key(file_name, folder)
+        body = bytes(data) if isinstance(data, (bytes, bytearray)) else data.read()
+        with self._lock:
+            self._files[key] = body
+        return {"bucket": self.bucket, "key": key}
+
+    def fetch_file(self, file_name, folder=None):
+        key = self._key(file_name, folder)
+        with self._lock:
+            body = self._files.get(key)
+        if body is None:
+            raise RuntimeError(f"Failed to fetch '{key}' from memory storage: not found")
+        return io.BytesIO(body)
+
+    def list_files(self, folder=None):
+        prefix = self._prefix(folder)
+        with self._lock:
+            keys = sorted(key for key in self._files if key.startswith(prefix))
+        yield from keys
+
+    def delete_file(self, file_name, folder=None):
+        key = self._key(file_name, folder)
+        with self._lock:
+            if self._files.pop(key, None) is None:
+                raise RuntimeError(f"Failed to delete '{key}' from memory storage: not found")
+
+
+class MeteredStorage(BaseStorage):
+    """
+    Records a metrics stage (storage_fetch, storage_upload, storage_list,
+    storage_delete) around each call to another backend. Other attributes
+    (client, cache settings, ...) are read from the wrapped backend.
+
+    Args:
+        backend (BaseStorage): The storage doing the work
+        metrics (utils.metrics.MetricsRegistry): Where the stages are recorded
+    """
+
+    LIST_PAGE = 1000
+
+    def __init__(self, backend, metrics):
+        self.backend = backend
+        self.metrics = metrics
+        self.bucket = backend.bucket
+
+    def upload_file(self, data, file_name, folder=None):
+        with self.metrics.stage("storage_upload") as timer:
+            start = None if isinstance(data, (bytes, bytearray)) else data.tell()
+            result = self.backend.upload_file(data, file_name, folder)
+            timer.bytes_out = len(data) if start is None else data.tell() - start
+        return result
+
+    def fetch_file(self, file_name, folder=None):
+        with self.metrics.stage("storage_fetch") as timer:
+            body = self.backend.fetch_file(file_name, folder)
+            timer.bytes_in = body.getbuffer().nbytes
+        return body
+
+    def list_files(self, folder=None):
+        # Timed per page of keys, while the caller consumes the listing
+        keys = iter(self.backend.list_files(folder))
+        while True:
+            with self.metrics.stage("storage_list"):
+                page = [key for _, key in zip(range(self.LIST_PAGE), keys)]
+            yield from page
+            if len(page) < self.LIST_PAGE:
+                return
+
+    def delete_file(self, file_name, folder=None):
+        with self.metrics.stage("storage_delete"):
+            self.backend.delete_file(file_name, folder)
+
+    def cache_stats(self):
+        return self.backend.cache_stats()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def build_storage(backend="s3", local_dir=None, metrics=None, **s3_settings):
+    """
+    Create a storage backend by name ("s3", "local" or "memory").
+
+    Args:
+        backend (str): Backend name
+        local_dir (str, optional): Directory of the "local" backend
+        metrics (utils.metrics.MetricsRegistry, optional): Wrap the backend in
+            MeteredStorage recording to this registry
+        **s3_settings: SupabaseStorage arguments (endpoint, bucket, keys, pool
+            size, timeouts, ...); for the other backends only "bucket" is used
+    """
+    backend = (backend or "s3").lower()
+    bucket = s3_settings.get("bucket")
+    if backend == "memory":
+        storage = MemoryStorage(bucket=bucket or "memory")
+    elif backend == "local":
+        if not local_dir:
+            raise ValueError("A directory is required for local storage.")
+        storage = LocalStorage(local_dir, bucket=bucket or "local")
+    elif backend == "s3":
+        # boto3 is only needed for this backend
+        from features.supabase_storage import SupabaseStorage
+
+        storage = SupabaseStorage(**s3_settings)
+    else:
+        raise ValueError(f"Unknown storage backend '{backend}'. Must be one of {list(STORAGE_BACKENDS)}.")
+    return MeteredStorage(storage, metrics) if metrics is not None else storage
+
+
+
+
+"""
+storage = build_storage("local", local_dir="/tmp/job-bot-storage")
+storage.upload_file(b"Experienced engineer...", "summary.txt", folder="user")
+print(storage.fetch_file("summary.txt", folder="user").read())
+
+for key in storage.list_files("templates"):
+    print(key)
+
+# Record latency, errors and bytes of every call in utils.metrics
+storage = build_storage("memory", metrics=metrics)
+
+# Same calls against S3 with a larger connection pool and adaptive retries
+storage = build_storage(
+    "s3",
+    endpoint="https://your-project-id.supabase.co/storage/v1/s3",
+    bucket="my-bucket",
+    access_key="your-access-key",
+    secret_key="your-secret-key",
+    max_pool_connections=32,
+)
+"""
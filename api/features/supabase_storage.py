@@ -2,14 +2,59 @@
 Simple Supabase Storage Helper using boto3
 """
 
+import sys
+import os
+import threading
+import time
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from botocore.exceptions import BotoCoreError, ClientError
 import io
 
-
-class SupabaseStorage:
-    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1"):
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache import ByteLRUCache
+from features.storage import BaseStorage
+
+
+class _CachedObject:
+    """Body and ETag of a fetched object plus when it was last confirmed fresh."""
+
+    __slots__ = ("body", "etag", "validated_at")
+
+    def __init__(self, body, etag, validated_at):
+        self.body = body
+        self.etag = etag
+        self.validated_at = validated_at
+
+
+def _is_not_modified(error):
+    response = getattr(error, "response", None) or {}
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = response.get("Error", {}).get("Code")
+    return status == 304 or code in ("304", "NotModified")
+
+
+class SupabaseStorage(BaseStorage):
+    def __init__(
+        self,
+        endpoint,
+        bucket,
+        access_key,
+        secret_key,
+        region="us-east-1",
+        cache_max_bytes=32 * 1024 * 1024,
+        cache_ttl=30.0,
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=8 * 1024 * 1024,
+        upload_concurrency=4,
+        max_pool_connections=32,
+        connect_timeout=5.0,
+        read_timeout=30.0,
+        max_attempts=5,
+        retry_mode="adaptive",
+    ):
         """
         Initialize Supabase Storage connection.
 
@@ -19,12 +64,41 @@ class SupabaseStorage:
             access_key (str): Supabase service role access key
             secret_key (str): Supabase secret key
             region (str): AWS region (default: us-east-1)
+            cache_max_bytes (int): Size budget of the fetch_file cache (0 disables it)
+            cache_ttl (float): Seconds a cached object is served without revalidation;
+                after that it is revalidated with a conditional GET (If-None-Match)
+            multipart_threshold (int): Uploads at least this large use S3 multipart upload
+            multipart_chunksize (int): Size of each multipart part
+            upload_concurrency (int): Parts uploaded in parallel; memory used by an
+                upload stays around multipart_chunksize * upload_concurrency
+            max_pool_connections (int): HTTP connections kept open by the client, shared
+                by all threads; should cover the I/O workers plus upload_concurrency
+            connect_timeout (float): Seconds to establish a connection
+            read_timeout (float): Seconds to wait for data on an open connection
+            max_attempts (int): Attempts per request, including the first one
+            retry_mode (str): botocore retry mode; "adaptive" also slows the client
+                down when the endpoint throttles
         """
         self.endpoint = endpoint
         self.bucket = bucket
         self.access_key = access_key
         self.secret_key = secret_key
         self.region = region
+        self.cache_ttl = cache_ttl
+
+        self._cache = ByteLRUCache(cache_max_bytes)
+        # Bumped on every write/delete so a fetch that raced with a write never
+        # stores the pre-write body.
+        self._cache_epoch = 0
+        self._cache_lock = threading.Lock()
+        self.revalidations = 0
+
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=upload_concurrency,
+            use_threads=upload_concurrency > 1,
+        )
 
         self.client = boto3.client(
             "s3",
@@ -32,13 +106,23 @@ class SupabaseStorage:
             aws_secret_access_key=self.secret_key,
             endpoint_url=self.endpoint,
             region_name=self.region,
-            config=Config(signature_version="s3v4"),
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=max_pool_connections,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout,
+                retries={"total_max_attempts": max_attempts, "mode": retry_mode},
+                tcp_keepalive=True,
+            ),
         )
 
     def upload_file(self, data, file_name, folder=None):
         """
         Upload a file (bytes or file-like object) to Supabase storage.
 
+        File-like objects are read in parts, so large files are never held in
+        memory; above multipart_threshold the parts are uploaded in parallel.
+
         Args:
             data (bytes | file-like): The file data
             file_name (str): The name of the file to upload (e.g. "image.png")
@@ -47,8 +131,7 @@ class SupabaseStorage:
         Returns:
             dict: Upload info with bucket and key
         """
-        key = f"{folder.strip('/')}/{file_name}" if folder else file_name
-
+        key = self._key(file_name, folder)
 
         if isinstance(data, bytes):
             payload = io.BytesIO(data)
@@ -56,9 +139,11 @@ class SupabaseStorage:
             payload = data  # assume file-like object
 
         try:
-            self.client.upload_fileobj(payload, self.bucket, key)
+            self.client.upload_fileobj(payload, self.bucket, key, Config=self.transfer_config)
         except (BotoCoreError, ClientError) as e:
             raise RuntimeError(f"Failed to upload '{key}' to Supabase: {e}")
+        finally:
+            self._invalidate(key)
 
         return {
             "bucket": self.bucket,
@@ -73,34 +158,63 @@ class SupabaseStorage:
             file_name (str): The file name (e.g. "photo.jpg")
             folder (str, optional): Folder path inside bucket
 
+        Objects are served from an in-memory LRU cache while younger than
+        ``cache_ttl``; older entries are revalidated with If-None-Match so an
+        unchanged object is not downloaded again.
+
         Returns:
-            bytes: File content
+            BytesIO: File content
         """
-        key = f"{folder.strip('/')}/{file_name}" if folder else file_name
+        key = self._key(file_name, folder)
+
+        cached = self._cache.get(key) if self._cache.enabled else None
+        now = time.monotonic()
+        if cached is not None and now - cached.validated_at < self.cache_ttl:
+            return io.BytesIO(cached.body)
+
+        params = {"Bucket": self.bucket, "Key": key}
+        if cached is not None and cached.etag:
+            params["IfNoneMatch"] = cached.etag
+        epoch = self._cache_epoch
 
         try:
-            obj = self.client.get_object(Bucket=self.bucket, Key=key)
-            # return obj["Body"].read()
+            obj = self.client.get_object(**params)
             file_bytes = obj["Body"].read()
-            return io.BytesIO(file_bytes)  
-        except (BotoCoreError, ClientError) as e:
+        except ClientError as e:
+            if cached is not None and _is_not_modified(e):
+                cached.validated_at = time.monotonic()
+                self.revalidations += 1
+                return io.BytesIO(cached.body)
             raise RuntimeError(f"Failed to fetch '{key}' from Supabase: {e}")
+        except BotoCoreError as e:
+            raise RuntimeError(f"Failed to fetch '{key}' from Supabase: {e}")
+
+        if self._cache.enabled:
+            with self._cache_lock:
+                if epoch == self._cache_epoch:
+                    entry = _CachedObject(file_bytes, obj.get("ETag"), time.monotonic())
+                    self._cache.put(key, entry, len(file_bytes))
+
+        return io.BytesIO(file_bytes)
 
     def list_files(self, folder=None):
         """
         List files in the bucket (or a specific folder).
 
+        Pages of up to 1,000 keys are requested as the generator is consumed,
+        so listing errors are raised during iteration.
+
         Args:
             folder (str, optional): Folder name
 
-        Returns:
-            list[str]: List of file keys
+        Yields:
+            str: File keys
         """
-        prefix = f"{folder.strip('/')}/" if folder else ""
+        paginator = self.client.get_paginator("list_objects_v2")
         try:
-            response = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
-            contents = response.get("Contents", [])
-            return [obj["Key"] for obj in contents]
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self._prefix(folder)):
+                for obj in page.get("Contents", []):
+                    yield obj["Key"]
         except (BotoCoreError, ClientError) as e:
             raise RuntimeError(f"Failed to list files in '{self.bucket}': {e}")
 
@@ -112,12 +226,25 @@ class SupabaseStorage:
             file_name (str): The file name
             folder (str, optional): Folder path
         """
-        key = f"{folder.strip('/')}/{file_name}" if folder else file_name
+        key = self._key(file_name, folder)
 
         try:
             self.client.delete_object(Bucket=self.bucket, Key=key)
         except (BotoCoreError, ClientError) as e:
             raise RuntimeError(f"Failed to delete '{key}' from Supabase: {e}")
+        finally:
+            self._invalidate(key)
+
+    def cache_stats(self):
+        """Hit/miss counters and size of the fetch_file cache."""
+        stats = self._cache.stats()
+        stats["revalidations"] = self.revalidations
+        return stats
+
+    def _invalidate(self, key):
+        with self._cache_lock:
+            self._cache_epoch += 1
+            self._cache.pop(key)
 
 
 
@@ -136,13 +263,13 @@ with open("photo.png", "rb") as f:
     result = storage.upload_file(f, "photo.png", folder="images")
     print(result)
 
-# Fetch a file
+# Fetch a file (repeat fetches are served from the cache / revalidated by ETag)
 data = storage.fetch_file("photo.png", folder="images")
 with open("downloaded_photo.png", "wb") as f:
-    f.write(data)
+    f.write(data.read())
 
-# List files
-print(storage.list_files("images"))
+# List files (a generator over all pages)
+print(list(storage.list_files("images")))
 
 # Delete a file
 storage.delete_file("photo.png", folder="images")
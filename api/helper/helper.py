@@ -1,29 +1,23 @@
+import sys
+import os
 import re
 import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from helper.text_normalizer import RESUME_NORMALIZER, JOB_DESCRIPTION_NORMALIZER
+
 MAX_CHARS = 20000  # adjust for Gemini context
 
 def prepare_text_for_gemini(text, max_chars=MAX_CHARS):
-    
-    text = ''.join(c for c in text if c.isprintable())  # remove weird chars
-    text = re.sub(r'\s+', ' ', text)                    # normalize whitespace
-    text = re.sub(r'([!?.,])\1+', r'\1', text)         # repeated punctuation
-    text = re.sub(r'Page \d+ of \d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Confidential', '', text, flags=re.IGNORECASE)
-    
-    # Step 3: Split into pseudo-sentences (at punctuation or line breaks)
-    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
-    
-    # Step 4: Filter out very short sentences
-    filtered_sentences = [s.strip() for s in sentences if len(s.split()) >= 2]
-    
-    # Step 5: Truncate intelligently
-    truncated_text = ""
-    for sentence in filtered_sentences:
-        if len(truncated_text) + len(sentence) + 1 > max_chars:
-            break
-        truncated_text += sentence + " "
-    
-    return truncated_text.strip()
+    """
+    Clean and truncate resume text for Gemini.
+
+    Removes non-printable characters, collapses whitespace and repeated
+    punctuation, drops page numbers / "Confidential" and one-word fragments,
+    and keeps whole sentences up to max_chars.
+    """
+    return RESUME_NORMALIZER.normalize(text, max_chars)
 
 
 def prepare_job_desc_text_gemini(job_text, max_chars=MAX_CHARS):
@@ -37,31 +31,7 @@ def prepare_job_desc_text_gemini(job_text, max_chars=MAX_CHARS):
     Returns:
         str: cleaned, truncated, Gemini-ready job description
     """
-    # Step 1: Basic cleaning
-    text = ''.join(c for c in job_text if c.isprintable())  # remove non-printables
-    text = re.sub(r'\s+', ' ', text)                        # normalize whitespace
-    text = re.sub(r'([!?.,])\1+', r'\1', text)              # repeated punctuation
-    text = re.sub(r'Page \d+ of \d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Confidential', '', text, flags=re.IGNORECASE)
-
-    # Step 2: Optional — remove repetitive boilerplate phrases (optional)
-    text = re.sub(r'(?i)(about\s+us|who\s+we\s+are|our\s+mission)[:\- ]+', '', text)
-    text = re.sub(r'(?i)(equal\s+opportunity\s+employer|diversity\s+statement).*', '', text)
-
-    # Step 3: Split into pseudo-sentences (no NLTK)
-    sentences = re.split(r'(?<=[.!?])\s+|\n+', text)
-
-    # Step 4: Filter out short/unhelpful lines
-    filtered_sentences = [s.strip() for s in sentences if len(s.split()) >= 3]
-
-    # Step 5: Truncate intelligently
-    truncated_text = ""
-    for sentence in filtered_sentences:
-        if len(truncated_text) + len(sentence) + 1 > max_chars:
-            break
-        truncated_text += sentence + " "
-
-    return truncated_text.strip()
+    return JOB_DESCRIPTION_NORMALIZER.normalize(job_text, max_chars)
 
 
 
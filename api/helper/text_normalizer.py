@@ -0,0 +1,183 @@
+"""
+Shared text normalization engine behind prepare_text_for_gemini and prepare_job_desc_text_gemini.
+
+Produces exactly the same output as the original step-by-step implementation,
+with fewer passes over the text:
+
+- non-printable characters are only filtered when present, and only the
+  characters outside printable ASCII are inspected
+- after that filter the only whitespace left is the ASCII space, so whitespace
+  collapsing and repeated-punctuation collapsing are fused into one regex pass
+  (their matches can never overlap or create new matches for each other)
+- the "Page N of M" / "Confidential" / boilerplate removals stay separate,
+  ordered passes because each can create new matches for the next one
+- sentences are split lazily and truncation is linear
+- a streaming mode reads text in chunks and stops once max_chars is reached
+"""
+
+import re
+
+
+_NON_PRINTABLE_CANDIDATES = re.compile(r"[^\x20-\x7e]+")
+_SPACES_AND_PUNCTUATION = re.compile(r"( ) +|([!?.,])\2+")
+_PAGE_NUMBERS = re.compile(r"Page \d+ of \d+", flags=re.IGNORECASE)
+_CONFIDENTIAL = re.compile(r"Confidential", flags=re.IGNORECASE)
+_INTRO_BOILERPLATE = re.compile(r"(?i)(about\s+us|who\s+we\s+are|our\s+mission)[:\- ]+")
+_TRAILING_BOILERPLATE = re.compile(r"(?i)(equal\s+opportunity\s+employer|diversity\s+statement).*")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _printable(text):
+    if text.isprintable():
+        return text
+    return _NON_PRINTABLE_CANDIDATES.sub(lambda m: "".join(filter(str.isprintable, m.group())), text)
+
+
+def _collapse(match):
+    return match.group(1) or match.group(2)
+
+
+class TextNormalizer:
+    """
+    Clean, split into sentences and truncate text for a Gemini prompt.
+
+    Args:
+        min_words (int): Sentences with fewer words are dropped
+        strip_boilerplate (bool): Also remove job-posting boilerplate ("About us:",
+            and everything from "Equal Opportunity Employer"/"Diversity statement" on)
+    """
+
+    def __init__(self, min_words=2, strip_boilerplate=False):
+        self.min_words = min_words
+        self.strip_boilerplate = strip_boilerplate
+        # Streaming: buffered characters needed before the first re-clean
+        self.settle_min = 1024
+
+    def normalize(self, text, max_chars):
+        """Return the cleaned text, cut at the last whole sentence that fits in max_chars."""
+        cleaned, _ = self.clean(text)
+        return " ".join(self._truncate(self._sentences(cleaned), max_chars))
+
+    def normalize_stream(self, chunks, max_chars):
+        """Like normalize() for text given as an iterable of chunks."""
+        return " ".join(self.iter_sentences(chunks, max_chars))
+
+    def iter_sentences(self, chunks, max_chars):
+        """
+        Yield the kept sentences of chunked text, in order.
+
+        Input is read only until max_chars is filled (or the trailing
+        boilerplate marker is found); the rest of ``chunks`` is never consumed.
+        The buffered text is re-cleaned when it has doubled in size, and every
+        sentence except the last one is final at that point: no cleaning rule
+        can match across a sentence break.
+        """
+        buffer = []
+        buffered = 0
+        processed = 0
+        emitted = 0
+        budget = _Budget(max_chars)
+
+        def settle(final):
+            nonlocal emitted
+            cleaned, cut = self.clean("".join(buffer))
+            pieces = _SENTENCE_BREAK.split(cleaned)
+            stable = len(pieces) if (final or cut) else len(pieces) - 1
+            for piece in pieces[emitted:stable]:
+                sentence = self._keep(piece)
+                if sentence is None:
+                    continue
+                if not budget.take(sentence):
+                    return False
+                yield sentence
+            emitted = stable
+            return not cut
+
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered < 2 * processed or buffered < self.settle_min:
+                continue
+            processed = buffered
+            more = yield from settle(final=False)
+            if not more:
+                return
+
+        yield from settle(final=True)
+
+    def clean(self, text):
+        """
+        Apply the cleaning rules.
+
+        Returns:
+            tuple[str, bool]: Cleaned text, and whether trailing boilerplate cut it short
+        """
+        text = _printable(text)
+        text = _SPACES_AND_PUNCTUATION.sub(_collapse, text)
+        text = _PAGE_NUMBERS.sub("", text)
+        text = _CONFIDENTIAL.sub("", text)
+        if not self.strip_boilerplate:
+            return text, False
+
+        text = _INTRO_BOILERPLATE.sub("", text)
+        tail = _TRAILING_BOILERPLATE.search(text)
+        if tail is None:
+            return text, False
+        return text[:tail.start()], True
+
+    def _sentences(self, text):
+        start = 0
+        for match in _SENTENCE_BREAK.finditer(text):
+            sentence = self._keep(text[start:match.start()])
+            if sentence is not None:
+                yield sentence
+            start = match.end()
+        sentence = self._keep(text[start:])
+        if sentence is not None:
+            yield sentence
+
+    def _keep(self, piece):
+        if len(piece.split(None, self.min_words - 1)) < self.min_words:
+            return None
+        return piece.strip()
+
+    @staticmethod
+    def _truncate(sentences, max_chars):
+        budget = _Budget(max_chars)
+        kept = []
+        for sentence in sentences:
+            if not budget.take(sentence):
+                break
+            kept.append(sentence)
+        return kept
+
+
+class _Budget:
+    """Character budget matching the original "sentence plus trailing space" accounting."""
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.used = 0
+
+    def take(self, sentence):
+        if self.used + len(sentence) + 1 > self.max_chars:
+            return False
+        self.used += len(sentence) + 1
+        return True
+
+
+RESUME_NORMALIZER = TextNormalizer(min_words=2)
+JOB_DESCRIPTION_NORMALIZER = TextNormalizer(min_words=3, strip_boilerplate=True)
+
+
+
+
+"""
+from helper.text_normalizer import JOB_DESCRIPTION_NORMALIZER
+
+text = JOB_DESCRIPTION_NORMALIZER.normalize(raw_job_text, max_chars=20000)
+
+# Read a large file lazily; stops reading once 20k characters are kept
+with open("job.txt", encoding="utf-8") as f:
+    text = JOB_DESCRIPTION_NORMALIZER.normalize_stream(iter(lambda: f.read(8192), ""), max_chars=20000)
+"""
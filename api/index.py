@@ -1,22 +1,43 @@
 import os
+import hmac
+import json
+import tempfile
+import time
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from features.supabase_storage import SupabaseStorage  # the helper class from earlier
+from features.storage import build_storage
 from utils.data import FILETYPE, FOLDERS
 from features.gemini_api import GeminiTextGenerator
-from utils.documentUtils import DocumentUtils
-
-from helper.helper import prepare_text_for_gemini, prepare_job_desc_text_gemini, parse_gemini_json
-import re
+from features.llm_providers import build_provider
+from features.prompt_budget import PromptBudgeter, DEFAULT_BUDGETS
+from features.pdf_renderer import BrowserPool
+from features.generation import DocumentGenerator, DownloadStore, GenerationError, DOCUMENT_KINDS, DOCX_MIMETYPE
+from features.jobs import JobQueue, JobQueueFullError
+from features.job_index import JobSimilarityIndex
+from features.resume_summary import ResumeSummarizer
+from utils.documentUtils import DocumentUtils, PLAN_SUFFIX
+from utils.pdf_extract import spawn_without_main
+from utils.upload import UploadRequest, file_digest, keep_upload
+from utils.archive import iter_zip
+from utils.cache import DiskCache
+from utils.rate_limit import RateLimiter
+from utils.metrics import metrics, cache_samples
+from utils.profiling import RequestProfile, ProfileStore
+
+from helper.helper import MAX_CHARS
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
+# Uploaded files are spooled (to disk past UPLOAD_SPOOL_BYTES) and hashed while they are received
+app.request_class = UploadRequest
 CORS(
     app,
     resources={r"/api/*": {"origins": "*"}},
-    allow_headers=["Content-Type", "x-api-key"],
-    expose_headers=["Content-Type", "Content-Disposition"],
+    allow_headers=["Content-Type", "x-api-key", "x-cache-bypass", "Prefer", "X-Profile", "X-Profile-Secret"],
+    expose_headers=["Content-Type", "Content-Disposition", "X-Batch-Failed", "X-Profile-Id", "X-Profile-Status"],
 )
 load_dotenv()
 # Load Supabase credentials from environment
@@ -25,26 +46,240 @@ SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET")
 SUPABASE_ACCESS_KEY = os.getenv("SUPABASE_ACCESS_KEY")
 SUPABASE_SECRET_KEY = os.getenv("SUPABASE_SECRET_KEY")
 
-# Initialize Supabase Storage
-storage = SupabaseStorage(
+# Storage backend: "s3" (Supabase), "local" (files under STORAGE_LOCAL_DIR) or
+# "memory" (lost on restart); the last two need no network access
+storage = build_storage(
+    os.getenv("STORAGE_BACKEND", "s3"),
+    local_dir=os.getenv("STORAGE_LOCAL_DIR", os.path.join(tempfile.gettempdir(), "job-bot-storage")),
+    metrics=metrics,
     endpoint=SUPABASE_ENDPOINT,
     bucket=SUPABASE_BUCKET,
     access_key=SUPABASE_ACCESS_KEY,
     secret_key=SUPABASE_SECRET_KEY,
+    cache_max_bytes=int(os.getenv("STORAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    cache_ttl=float(os.getenv("STORAGE_CACHE_TTL", "30")),
+    multipart_threshold=int(os.getenv("STORAGE_MULTIPART_THRESHOLD", str(8 * 1024 * 1024))),
+    multipart_chunksize=int(os.getenv("STORAGE_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024))),
+    upload_concurrency=int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4")),
+    # One client (and connection pool) is shared by all request, I/O and job threads
+    max_pool_connections=int(os.getenv("STORAGE_MAX_CONNECTIONS", "32")),
+    connect_timeout=float(os.getenv("STORAGE_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("STORAGE_READ_TIMEOUT", "30")),
+    max_attempts=int(os.getenv("STORAGE_MAX_ATTEMPTS", "5")),
+    retry_mode=os.getenv("STORAGE_RETRY_MODE", "adaptive"),
+)
+
+# Request size limit (larger requests get 413) and in-memory part of each upload
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+app.config["UPLOAD_SPOOL_BYTES"] = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+app.config["UPLOAD_SPOOL_DIR"] = os.getenv("UPLOAD_SPOOL_DIR") or None
+
+# Cache extracted document text by content hash (memory + local disk)
+DocumentUtils.configure_extract_cache(
+    memory_bytes=int(os.getenv("EXTRACT_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024))),
+    disk_dir=os.getenv("EXTRACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "extract-cache")),
+    disk_bytes=int(os.getenv("EXTRACT_CACHE_DISK_BYTES", str(256 * 1024 * 1024))),
+)
+
+# Parse PDFs in worker processes with a per-document timeout and memory limit (0 workers = in-process)
+DocumentUtils.configure_pdf_extraction(
+    workers=int(os.getenv("PDF_EXTRACT_WORKERS", "1")),
+    timeout=float(os.getenv("PDF_EXTRACT_TIMEOUT", "30")),
+    memory_mb=int(os.getenv("PDF_EXTRACT_MEMORY_MB", "512")),
 )
+# PDF pages stop being read past this many characters; cleaning only shrinks text,
+# so twice the prompt limit leaves room for what prepare_text_for_gemini drops
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", str(2 * MAX_CHARS)))
 
 # Initialize gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini = GeminiTextGenerator(api_key=GEMINI_API_KEY)
+# Responses are cached on local disk unless GEMINI_CACHE_DIR is set to an empty string
+GEMINI_CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gemini-cache"))
+gemini_cache = None
+if GEMINI_CACHE_DIR:
+    gemini_cache = DiskCache(
+        GEMINI_CACHE_DIR,
+        max_bytes=int(os.getenv("GEMINI_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl=float(os.getenv("GEMINI_CACHE_TTL", "86400")),
+    )
+# LLM backend: "sdk" (google.generativeai), "rest" (pooled HTTP, LLM_BASE_URL may point
+# at features/llm_stub_server.py) or "stub" (canned offline responses, no API key needed)
+llm_provider = build_provider(
+    os.getenv("LLM_PROVIDER", "sdk"),
+    api_key=GEMINI_API_KEY,
+    model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+    base_url=os.getenv("LLM_BASE_URL") or None,
+    pool_size=int(os.getenv("LLM_POOL_SIZE", "10")),
+    stub_latency=os.getenv("STUB_LATENCY", "fixed:0"),
+    stub_error_rate=float(os.getenv("STUB_ERROR_RATE", "0")),
+)
+# Per-task token budgets for the summary/template text sent with a job description,
+# e.g. "cover_letter=1500,resume=3000"; set PROMPT_TOKEN_BUDGETS to an empty string to disable
+PROMPT_TOKEN_BUDGETS = os.getenv(
+    "PROMPT_TOKEN_BUDGETS", ",".join(f"{task}={budget}" for task, budget in DEFAULT_BUDGETS.items())
+)
+prompt_budgeter = None
+if PROMPT_TOKEN_BUDGETS.strip():
+    prompt_budgeter = PromptBudgeter(
+        budgets={
+            task.strip(): int(budget)
+            for task, _, budget in (item.partition("=") for item in PROMPT_TOKEN_BUDGETS.split(","))
+            if task.strip() and budget.strip()
+        }
+    )
+
+# Client-side quota (0 disables a limit), retries for 429/5xx/timeouts and optional hedging
+gemini = GeminiTextGenerator(
+    api_key=GEMINI_API_KEY,
+    model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+    provider=llm_provider,
+    cache=gemini_cache,
+    uncached_tasks=[t.strip() for t in os.getenv("GEMINI_CACHE_SKIP_TASKS", "").split(",") if t.strip()],
+    limiter=RateLimiter(
+        rpm=int(os.getenv("GEMINI_RPM", "0")),
+        tpm=int(os.getenv("GEMINI_TPM", "0")),
+    ),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "3")),
+    request_timeout=float(os.getenv("GEMINI_TIMEOUT", "60")),
+    hedge=os.getenv("GEMINI_HEDGE", "").lower() in ("1", "true", "yes"),
+    budgeter=prompt_budgeter,
+)
+
+# Storage reads of the generation pipeline run concurrently on this pool
+io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IO_WORKERS", "8")),
+    thread_name_prefix="io",
+)
+# Near-duplicate job description index (JSONL file; set JOB_INDEX_PATH to "" to keep it in memory)
+similar_jobs = JobSimilarityIndex(
+    path=os.getenv("JOB_INDEX_PATH", os.path.join(tempfile.gettempdir(), "job-index.jsonl")) or None,
+    max_distance=int(os.getenv("JOB_INDEX_MAX_DISTANCE", "8")),
+    max_entries=int(os.getenv("JOB_INDEX_MAX_ENTRIES", "50000")),
+)
+generator = DocumentGenerator(storage, gemini, io_executor, similar_jobs=similar_jobs)
+
+# Files produced by the streaming endpoints, fetched later via /api/download/<token>
+downloads = DownloadStore(ttl=float(os.getenv("DOWNLOAD_TTL", "600")))
+
+# Background generation jobs (state in memory, or in JOBS_DB_PATH if set)
+jobs = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "32")),
+    ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+    db_path=os.getenv("JOBS_DB_PATH") or None,
+    # Unfinished jobs older than this are dropped (e.g. lost with a crashed process)
+    stale_after=float(os.getenv("JOB_STALE_AFTER", str(6 * 3600))),
+)
+JOB_MAX_WAIT = 60
+
+# Resume summaries are generated on the job queue after /api/upload has stored the file
+summarizer = ResumeSummarizer(storage, gemini, jobs, max_chars=EXTRACT_MAX_CHARS)
+
+# Limits for /api/generate_bulk
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "25"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "4"))
+
+# Long-lived headless Chromium pool used for HTML -> PDF rendering.
+# Browsers are launched on the first render, not at import time.
+pdf_pool = BrowserPool(
+    size=int(os.getenv("PDF_POOL_SIZE", "1")),
+    max_pages=int(os.getenv("PDF_MAX_PAGES", "4")),
+    max_renders=int(os.getenv("PDF_MAX_RENDERS", "200")),
+    max_memory_mb=int(os.getenv("PDF_MAX_BROWSER_MEMORY_MB", "0")),
+    render_timeout=float(os.getenv("PDF_RENDER_TIMEOUT", "60")),
+)
+PDF_BATCH_MAX = int(os.getenv("PDF_BATCH_MAX", "20"))
 
 # Simple API key auth (set API_KEY env var in backend and frontend)
 API_KEY = os.getenv("API_KEY", "e")
 
+# Per-request profiling: a request with "X-Profile: 1" (or "cpu" to skip allocation
+# tracing) and "X-Profile-Secret: <PROFILE_SECRET>" is profiled; unset disables it
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+profiles = ProfileStore(ttl=float(os.getenv("PROFILE_TTL", "900")))
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": f"Request exceeds the maximum size of {app.config['MAX_CONTENT_LENGTH']} bytes."}), 413
+
+
+metrics.describe(
+    "http_request_duration_seconds",
+    "histogram",
+    "Time until the response is returned to the server (for streamed responses, until the first byte).",
+)
+metrics.describe("http_responses_total", "counter", "Responses by endpoint and status code.")
+metrics.describe("http_bytes_total", "counter", "Request (in) and response (out) body bytes, where the length is known.")
+
+
+# Registered before require_api_key so rejected requests are timed as well
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    # The endpoint name, not the path, keeps the number of series bounded
+    endpoint = request.endpoint or "unmatched"
+    metrics.observe("http_request_duration_seconds", time.perf_counter() - started, (("endpoint", endpoint),))
+    metrics.inc("http_responses_total", 1, (("endpoint", endpoint), ("status", str(response.status_code))))
+    if request.content_length:
+        metrics.inc("http_bytes_total", request.content_length, (("direction", "in"),))
+    if response.content_length:
+        metrics.inc("http_bytes_total", response.content_length, (("direction", "out"),))
+    return response
+
+
+def collect_component_metrics():
+    """Cache, Gemini and worker pool counters, read when /api/metrics is scraped."""
+    yield from cache_samples("gemini_responses", gemini_cache.stats() if gemini_cache is not None else None)
+    yield from cache_samples("storage_objects", storage.cache_stats())
+    extract_stats = DocumentUtils.extract_cache_stats()
+    yield from cache_samples("extract_text_memory", extract_stats["memory"])
+    yield from cache_samples("extract_text_disk", extract_stats["disk"])
+    yield from cache_samples("placeholder_plans", DocumentUtils.placeholder_plan_cache_stats())
+    index_stats = similar_jobs.stats()
+    yield from cache_samples(
+        "similar_jobs",
+        {"hits": index_stats["matches"], "misses": index_stats["lookups"] - index_stats["matches"]},
+    )
+
+    # CallMetrics also accumulates amounts that are not events; they get families of their own
+    counters = dict(gemini.metrics.snapshot()["counters"])
+    yield ("gemini_throttle_seconds_total", "counter", "Seconds Gemini calls waited for the rate limiter.",
+           (), counters.pop("throttle_seconds", 0.0))
+    yield ("gemini_prompt_tokens_saved_total", "counter", "Prompt tokens removed by the per-task input budgets.",
+           (), counters.pop("prompt_tokens_saved", 0))
+    for event, count in counters.items():
+        yield ("gemini_events_total", "counter", "Gemini attempts by outcome, retries, hedges and throttling.",
+               {"event": event}, count)
+
+    pdf_stats = DocumentUtils.pdf_extraction_stats()
+    for event in ("completed", "timeouts", "failures", "restarts"):
+        yield ("pdf_extraction_events_total", "counter", "Documents handled by the PDF extraction workers.",
+               {"event": event}, pdf_stats.get(event))
+
+    browser_stats = pdf_pool.stats()
+    browsers = browser_stats["browsers"]
+    yield "browser_pool_active_pages", "gauge", "Pages being rendered.", (), sum(b["active"] for b in browsers)
+    yield ("browser_pool_launches_total", "counter", "Chromium launches, including restarts.",
+           (), sum(b["launches"] for b in browsers))
+    yield "browser_pool_recycled_total", "counter", "Browsers retired and replaced.", (), browser_stats["recycled"]
+
+
+metrics.register_collector(collect_component_metrics)
+
 
 @app.before_request
 def require_api_key():
     # Allow health/public endpoints without API key
-    if request.path in ["/api/hello", "/api/python"]:
+    if request.path in ["/api/hello", "/api/python", "/api/metrics"]:
         return None
 
     # Allow CORS preflight to proceed
@@ -58,6 +293,129 @@ def require_api_key():
     return None
 
 
+def profile_secret_ok():
+    provided = request.headers.get("X-Profile-Secret", "")
+    return bool(PROFILE_SECRET) and hmac.compare_digest(provided.encode("utf-8"), PROFILE_SECRET.encode("utf-8"))
+
+
+# Registered after require_api_key, so only authenticated requests can be profiled
+@app.before_request
+def start_profile():
+    mode = request.headers.get("X-Profile", "").strip().lower()
+    if not PROFILE_SECRET or mode not in ("1", "true", "yes", "cpu"):
+        return None
+    if not profile_secret_ok():
+        return jsonify({"error": "Invalid profiling secret."}), 403
+
+    profile = RequestProfile(interval=PROFILE_INTERVAL, trace_memory=mode != "cpu")
+    if profile.start():
+        g.profile = profile
+    else:
+        g.profile_busy = True
+    return None
+
+
+@app.after_request
+def finish_profile(response):
+    if g.pop("profile_busy", False):
+        response.headers["X-Profile-Status"] = "busy"
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+
+    details = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+    }
+
+    if response.is_streamed:
+        # The work of a streamed response happens while its body is sent, so the
+        # profile is finished (and becomes downloadable) when the response closes
+        profile_id = profiles.new_id()
+
+        def finish():
+            profile.stop()
+            profiles.put(profile, profile_id=profile_id, **details)
+
+        response.call_on_close(finish)
+        response.headers["X-Profile-Status"] = "pending"
+    else:
+        profile.stop()
+        profile_id = profiles.put(profile, **details)
+        response.headers["X-Profile-Status"] = "done"
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+@app.teardown_request
+def abandon_profile(error=None):
+    # after_request does not run if a response could not be built at all
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.stop()
+
+
+def wants_async():
+    """True when the client asked for a job id instead of the document (Prefer: respond-async)."""
+    return "respond-async" in request.headers.get("Prefer", "").lower()
+
+
+def docx_response(document, download_name):
+    """Stream a filled DOCX (see DocumentUtils.stream_docx_placeholders) as an attachment."""
+    return Response(
+        document,
+        mimetype=DOCX_MIMETYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename={download_name}",
+            "Content-Length": str(document.size),
+        },
+    )
+
+
+def run_generation_job(kind, job_description, use_cache, reuse_similar=False):
+    updated_docx_stream, download_name = generator.generate(
+        kind, job_description, use_cache=use_cache, reuse_similar=reuse_similar
+    )
+    return updated_docx_stream.getvalue(), download_name, DOCX_MIMETYPE
+
+
+def submit_generation_job(kind, job_description, reuse_similar=False):
+    """Queue a generation job and return the 202 response describing it."""
+    try:
+        job_id = jobs.submit(
+            kind,
+            run_generation_job,
+            kind,
+            job_description,
+            not cache_bypassed(),
+            reuse_similar,
+        )
+    except JobQueueFullError as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result",
+    }), 202
+
+
+def reuse_similar_requested(data):
+    """True when the JSON body opts in to reusing a near-duplicate job's result ("reuse_similar": true)."""
+    value = data.get("reuse_similar", False)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def cache_bypassed():
+    """True when the client asked to skip cached Gemini responses (x-cache-bypass: 1)."""
+    return request.headers.get("x-cache-bypass", "").strip().lower() in ("1", "true", "yes")
+
+
 # Will  not require as I made the template and the summary upload endpoints
 @app.route("/api/upload", methods=["POST"])
 def upload_file():
@@ -67,6 +425,8 @@ def upload_file():
     - file (required)
     - foldername (optional)
     - filetype: "coverletter" or "resume"
+    Resumes are summarized in the background; the response carries the summary
+    job id, whose progress is reported by /api/upload/summary/<job_id>.
     """
     if "file" not in request.files:
         return jsonify({"error": "No file part"}), 400
@@ -104,173 +464,372 @@ def upload_file():
     upload_name = f"{filetype}{ext}"
 
     try:
-        # Wrap bytes in BytesIO so it behaves like a file
-        from io import BytesIO
-        file_bytes = file.read()
-        file_stream = BytesIO(file_bytes)
+        # The upload is already spooled and hashed; storage reads the spool in place
+        # instead of copying it into memory
+        file_stream = file.stream
+        digest = file_digest(file_stream)
+        file_stream.seek(0)
         # uploading the resume or cover letter
         result = storage.upload_file(file_stream, upload_name, folder=folder)
 
-        if filetype == "resume":   
-            file_stream = BytesIO(file_bytes)
-            extracted_text = DocumentUtils.extract_text(file_stream)
-
-            # 2️⃣ Prepare text for Gemini
-            extracted_text = prepare_text_for_gemini(extracted_text)
-
-            # 3️⃣ Generate summary using Gemini
-            summary_text = gemini.generate(extracted_text, "summary")
-
-            # Prepare a summary filename
-            summary_filename = "resume_summary.txt"
-            summary_bytes = summary_text.encode("utf-8")
-            
-            # Upload summary to Supabase under 'summary' folder
-            storage.upload_file(summary_bytes, summary_filename, folder="summary")
-
-        return jsonify({
+        response = {
             "message": "File uploaded successfully",
             "bucket": result["bucket"],
             "key": result["key"],
-        }), 200
+        }
+        if filetype == "resume":
+            # The spool is closed with the request, so the job gets its own file
+            # (a hard link when the spool is on disk) instead of an in-memory copy
+            kept_path = keep_upload(file_stream, app.config["UPLOAD_SPOOL_DIR"])
+            try:
+                job_id = summarizer.submit(kept_path, digest=digest, use_cache=not cache_bypassed())
+            except JobQueueFullError as e:
+                return jsonify(dict(response, error=f"File stored, but the summary was not started: {e}")), 503
+            response["summary"] = {
+                "job_id": job_id,
+                "status": "pending",
+                "status_url": f"/api/upload/summary/{job_id}",
+            }
+
+        return jsonify(response), 200
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/upload/summary/<job_id>", methods=["GET"])
+def upload_summary_status(job_id):
+    """
+    Report the background summary of an uploaded resume: pending, done, failed,
+    or superseded when a newer resume was uploaded before it finished.
+    Use "latest" as the job id for the most recent upload.
+    """
+    if job_id == "latest":
+        job_id = summarizer.latest_job_id()
+    status = summarizer.status(job_id) if job_id else None
+    if status is None:
+        return jsonify({"error": "Summary job not found or expired."}), 404
+    return jsonify(status), 200
+
+
 @app.route("/api/generate_coverletter", methods=["POST"])
 def generate_coverletter():
-    """Generate a cover letter using saved summary and template assets."""
+    """
+    Generate a cover letter using saved summary and template assets.
+    With the header "Prefer: respond-async" a job is queued instead (see /api/jobs).
+    Set "reuse_similar": true to reuse the result of a near-duplicate earlier job description.
+    """
     data = request.json or {}
     job_description = data.get("job_description", "").strip()
 
     if not job_description:
         return jsonify({"error": "job_description is required."}), 400
 
-    prepared_text = prepare_job_desc_text_gemini(job_description)
+    if wants_async():
+        return submit_generation_job("coverletter", job_description, reuse_similar_requested(data))
 
     try:
-        summary_stream = storage.fetch_file("summary.txt", folder="user")
-    except Exception:
-        return jsonify({"error": "Failed to fetch summary from storage."}), 500
+        updated_docx_stream, download_name = generator.generate(
+            "coverletter",
+            job_description,
+            use_cache=not cache_bypassed(),
+            reuse_similar=reuse_similar_requested(data),
+        )
+    except GenerationError as e:
+        return jsonify({"error": str(e)}), e.status
 
-    if not summary_stream:
-        return jsonify({"error": "Summary not found. Please upload your summary first."}), 404
+    return docx_response(updated_docx_stream, download_name)
 
-    summary = summary_stream.read().decode("utf-8")
-    if not summary.strip():
-        return jsonify({"error": "Summary is empty. Please upload a valid summary."}), 400
 
-    try:
-        result = gemini.generate(text=summary, second_text=prepared_text, task="cover_letter")
-        coverletter_data = parse_gemini_json(result)
-    except Exception:
-        return jsonify({"error": "Cover letter generation failed."}), 500
+@app.route("/api/generate_resume", methods=["POST"])
+def generate_resume():
+    """
+    Generate a resume by merging summary, template, and job description context.
+    With the header "Prefer: respond-async" a job is queued instead (see /api/jobs).
+    Set "reuse_similar": true to reuse the result of a near-duplicate earlier job description.
+    """
+    data = request.json or {}
+    job_description = data.get("job_description", "").strip()
 
-    try:
-        template_stream = storage.fetch_file("coverletter.docx", folder="templates")
-    except Exception:
-        return jsonify({"error": "Failed to fetch cover letter template from storage."}), 500
+    if not job_description:
+        return jsonify({"error": "job_description is required."}), 400
 
-    if not template_stream:
-        return jsonify({"error": "Cover letter template not found. Please upload coverletter.docx to the templates folder."}), 404
+    if wants_async():
+        return submit_generation_job("resume", job_description, reuse_similar_requested(data))
 
-    print(coverletter_data)
     try:
-        updated_docx_stream = DocumentUtils.update_docx_placeholders(
-            doc_source=template_stream,
-            replacements=coverletter_data,
+        updated_docx_stream, download_name = generator.generate(
+            "resume",
+            job_description,
+            use_cache=not cache_bypassed(),
+            reuse_similar=reuse_similar_requested(data),
         )
-    except Exception:
-        return jsonify({"error": "Failed to populate cover letter template."}), 500
+    except GenerationError as e:
+        return jsonify({"error": str(e)}), e.status
 
-    from flask import send_file
+    return docx_response(updated_docx_stream, download_name)
 
-    # Build a safe filename using the company name (no spaces/special chars)
-    company_raw = coverletter_data.get("<%COMPANYNAME%>", "").strip()
-    safe_company = re.sub(r"[^A-Za-z0-9]+", "_", company_raw).strip("_") or "document"
-    download_name = f"cover_letter_{safe_company}.docx"
 
-    return send_file(
-        updated_docx_stream,
-        as_attachment=True,
-        download_name=download_name,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+def sse_response(events):
+    """Wrap (event, data) tuples as a Server-Sent Events response."""
+
+    def encode():
+        for event, payload in events:
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(
+        stream_with_context(encode()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@app.route("/api/generate_resume", methods=["POST"])
-def generate_resume():
-    """Generate a resume by merging summary, template, and job description context."""
-    from io import BytesIO
+@app.route("/api/generate_coverletter/stream", methods=["POST"])
+def generate_coverletter_stream():
+    """
+    Streaming variant of /api/generate_coverletter (Server-Sent Events).
+    Emits progress and delta events while Gemini writes, then a done event with
+    a token for /api/download/<token> (or an error event).
+    """
+    data = request.json or {}
+    job_description = data.get("job_description", "").strip()
+
+    if not job_description:
+        return jsonify({"error": "job_description is required."}), 400
 
+    return sse_response(
+        generator.stream(
+            "coverletter",
+            job_description,
+            downloads,
+            use_cache=not cache_bypassed(),
+            reuse_similar=reuse_similar_requested(data),
+        )
+    )
+
+
+@app.route("/api/generate_resume/stream", methods=["POST"])
+def generate_resume_stream():
+    """Streaming variant of /api/generate_resume (Server-Sent Events)."""
     data = request.json or {}
     job_description = data.get("job_description", "").strip()
 
     if not job_description:
         return jsonify({"error": "job_description is required."}), 400
 
-    prepared_text = prepare_job_desc_text_gemini(job_description)
+    return sse_response(
+        generator.stream(
+            "resume",
+            job_description,
+            downloads,
+            use_cache=not cache_bypassed(),
+            reuse_similar=reuse_similar_requested(data),
+        )
+    )
 
-    try:
-        summary_stream = storage.fetch_file("summary.txt", folder="user")
-    except Exception:
-        return jsonify({"error": "Failed to fetch summary from storage."}), 500
 
-    if not summary_stream:
-        return jsonify({"error": "Summary not found. Please upload your summary first."}), 404
+@app.route("/api/download/<token>", methods=["GET"])
+def download_file(token):
+    """Download a file produced by a streaming endpoint."""
+    entry = downloads.get(token)
+    if entry is None:
+        return jsonify({"error": "Download not found or expired."}), 404
 
-    summary = summary_stream.read().decode("utf-8")
-    if not summary.strip():
-        return jsonify({"error": "Summary is empty. Please upload a valid summary."}), 400
+    file_bytes, filename, mimetype = entry
 
-    try:
-        template_stream = storage.fetch_file("resume.docx", folder="templates")
-    except Exception:
-        return jsonify({"error": "Failed to fetch resume template from storage."}), 500
+    from io import BytesIO
+    from flask import send_file
 
-    if not template_stream:
-        return jsonify({"error": "Resume template not found. Please upload resume.docx to the templates folder."}), 404
+    return send_file(
+        BytesIO(file_bytes),
+        as_attachment=True,
+        download_name=filename,
+        mimetype=mimetype,
+    )
 
-    # Read template bytes once; reuse for text extraction and placeholder replacement
-    template_bytes = template_stream.read()
 
-    try:
-        raw_template_text = DocumentUtils.extract_text(BytesIO(template_bytes))
-    except Exception:
-        return jsonify({"error": "Failed to read resume template content."}), 500
+@app.route("/api/generate_bulk", methods=["POST"])
+def generate_bulk():
+    """
+    Generate a cover letter or resume for each of several job descriptions.
+    Expects JSON with:
+    - kind (required): "coverletter" or "resume"
+    - job_descriptions (required): list of job description strings
+    - concurrency (optional): parallel Gemini calls, capped by BULK_MAX_CONCURRENCY
+    - reuse_similar (optional): reuse results of near-duplicate earlier job descriptions
+    Streams back a ZIP with one DOCX per job description plus manifest.json.
+    Duplicate job descriptions are generated once and share the result.
+    """
+    data = request.json or {}
+    kind = str(data.get("kind", "")).lower().strip()
+    job_descriptions = data.get("job_descriptions")
+
+    if kind not in DOCUMENT_KINDS:
+        return jsonify({"error": f"Invalid kind. Must be one of {list(DOCUMENT_KINDS.keys())}."}), 400
+    if not isinstance(job_descriptions, list) or not job_descriptions:
+        return jsonify({"error": "job_descriptions must be a non-empty list"}), 400
+    if len(job_descriptions) > BULK_MAX_ITEMS:
+        return jsonify({"error": f"At most {BULK_MAX_ITEMS} job descriptions per request."}), 400
 
-    template_lines = raw_template_text.splitlines()
-    template_body = "\n".join(template_lines[3:]) if len(template_lines) > 3 else ""
+    try:
+        concurrency = int(data.get("concurrency", BULK_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BULK_MAX_CONCURRENCY))
+
+    manifest = [{"index": index, "ok": False} for index in range(len(job_descriptions))]
+    valid = []
+    for index, job_description in enumerate(job_descriptions):
+        if isinstance(job_description, str) and job_description.strip():
+            valid.append(index)
+        else:
+            manifest[index]["error"] = "job_description is required."
 
-    combined_text = f"{summary}\n\n{template_body}".strip()
     try:
-        result = gemini.generate(text=combined_text, second_text=prepared_text, task="resume")
+        results = generator.generate_bulk(
+            kind,
+            [job_descriptions[index].strip() for index in valid],
+            concurrency=concurrency,
+            use_cache=not cache_bypassed(),
+            reuse_similar=reuse_similar_requested(data),
+        ) if valid else iter(())
+    except GenerationError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    def archive_entries():
+        for positions, outcome in results:
+            indices = [valid[position] for position in positions]
+            if isinstance(outcome, GenerationError):
+                for index in indices:
+                    manifest[index]["error"] = str(outcome)
+                continue
+
+            file_bytes = outcome[0].getvalue()
+            for index in indices:
+                filename = f"{index + 1:02d}_{outcome[1]}"
+                manifest[index].update(ok=True, filename=filename)
+                if index != indices[0]:
+                    manifest[index]["duplicate_of"] = indices[0]
+                yield filename, file_bytes
+
+        yield "manifest.json", json.dumps(manifest, indent=2)
+
+    return Response(
+        stream_with_context(iter_zip(archive_entries())),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={kind}_bulk.zip"},
+    )
+
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    """
+    Queue a document generation job and return its id immediately.
+    Expects JSON with:
+    - kind (required): "coverletter" or "resume"
+    - job_description (required)
+    - reuse_similar (optional): reuse the result of a near-duplicate earlier job description
+    """
+    data = request.json or {}
+    kind = str(data.get("kind", "")).lower().strip()
+    job_description = str(data.get("job_description", "")).strip()
+
+    if kind not in DOCUMENT_KINDS:
+        return jsonify({"error": f"Invalid kind. Must be one of {list(DOCUMENT_KINDS.keys())}."}), 400
+    if not job_description:
+        return jsonify({"error": "job_description is required."}), 400
+
+    return submit_generation_job(kind, job_description, reuse_similar_requested(data))
 
-        resume_data = parse_gemini_json(result)
-    except Exception:
-        return jsonify({"error": "Resume generation failed."}), 500
 
-    print(resume_data)
+@app.route("/api/similar_jobs", methods=["POST"])
+def find_similar_jobs():
+    """
+    List earlier generations for near-duplicates of a job description.
+    Expects JSON with:
+    - kind (required): "coverletter" or "resume"
+    - job_description (required)
+    Only results made with the current summary (and resume template) are returned;
+    any of them can be reused by generating with "reuse_similar": true.
+    """
+    data = request.json or {}
+    kind = str(data.get("kind", "")).lower().strip()
+    job_description = str(data.get("job_description", "")).strip()
+
+    if kind not in DOCUMENT_KINDS:
+        return jsonify({"error": f"Invalid kind. Must be one of {list(DOCUMENT_KINDS.keys())}."}), 400
+    if not job_description:
+        return jsonify({"error": "job_description is required."}), 400
+
     try:
-        updated_docx_stream = DocumentUtils.update_docx_placeholders(
-            doc_source=BytesIO(template_bytes),
-            replacements=resume_data,
-        )
-    except Exception:
-        return jsonify({"error": "Failed to populate resume template."}), 500
+        inputs = generator.start(kind, job_description)
+        matches = generator.find_similar(inputs, generator.prompt_text(inputs))
+    except GenerationError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    return jsonify({
+        "matches": [
+            {
+                "id": match["id"],
+                "similarity": match["similarity"],
+                "company": match["meta"].get("company"),
+                "created_at": match["created_at"],
+            }
+            for match in matches
+        ],
+        "index": similar_jobs.stats(),
+    })
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Report a job's status (queued, running, done, failed).
+    Pass ?wait=<seconds> (max 60) to long-poll until the job finishes.
+    """
+    try:
+        wait = min(float(request.args.get("wait", 0)), JOB_MAX_WAIT)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+
+    status = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found or expired."}), 404
+
+    return jsonify({
+        "job_id": status["job_id"],
+        "kind": status["kind"],
+        "status": status["status"],
+        "error": status["error"],
+        "result_url": f"/api/jobs/{job_id}/result" if status["has_result"] else None,
+    }), 200
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Download the document produced by a finished job."""
+    status = jobs.get(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found or expired."}), 404
+    if status["status"] == "failed":
+        return jsonify({"error": status["error"]}), status["http_status"] or 500
+    if status["status"] != "done":
+        return jsonify({"error": "Job is not finished yet.", "status": status["status"]}), 409
+
+    entry = jobs.result(job_id)
+    if entry is None:
+        return jsonify({"error": "Job has no result."}), 404
+
+    file_bytes, filename, mimetype = entry
 
+    from io import BytesIO
     from flask import send_file
 
-    company_raw = resume_data.get("<%COMPANYNAME%>", "").strip()
-    safe_company = re.sub(r"[^A-Za-z0-9]+", "_", company_raw).strip("_") or "document"
-    download_name = f"resume_{safe_company}.docx"
-
     return send_file(
-        updated_docx_stream,
+        BytesIO(file_bytes),
         as_attachment=True,
-        download_name=download_name,
-        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        download_name=filename,
+        mimetype=mimetype,
     )
 
 
@@ -320,15 +879,9 @@ def html_to_pdf():
         return jsonify({"error": "html content is required"}), 400
 
     try:
-        from playwright.sync_api import sync_playwright
         from io import BytesIO
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.set_content(html_content, wait_until="networkidle")
-            pdf_bytes = page.pdf(format="Letter", print_background=True)
-            browser.close()
+        pdf_bytes = pdf_pool.render(html_content)
 
         pdf_stream = BytesIO(pdf_bytes)
         pdf_stream.seek(0)
@@ -345,6 +898,72 @@ def html_to_pdf():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/html_to_pdf_batch", methods=["POST"])
+def html_to_pdf_batch():
+    """
+    Convert several HTML documents to PDF in one browser and return them as a ZIP.
+    Expects JSON with:
+    - documents (required): list of {"html": "...", "filename": "optional.pdf"} or HTML strings.
+    The archive contains one PDF per successful document plus manifest.json,
+    which reports the outcome (and error, if any) for every item.
+    """
+    data = request.json or {}
+    documents = data.get("documents")
+
+    if not isinstance(documents, list) or not documents:
+        return jsonify({"error": "documents must be a non-empty list"}), 400
+    if len(documents) > PDF_BATCH_MAX:
+        return jsonify({"error": f"A batch can contain at most {PDF_BATCH_MAX} documents."}), 400
+
+    manifest = []
+    to_render = []
+    for index, item in enumerate(documents):
+        if isinstance(item, str):
+            item = {"html": item}
+        if not isinstance(item, dict):
+            item = {}
+
+        stem = os.path.splitext(secure_filename(str(item.get("filename") or "")))[0]
+        filename = f"{index + 1:02d}_{stem or 'document'}.pdf"
+        entry = {"index": index, "filename": filename, "ok": False}
+        manifest.append(entry)
+
+        html_content = item.get("html")
+        if not isinstance(html_content, str) or not html_content:
+            entry["error"] = "html content is required"
+            continue
+        to_render.append((entry, html_content))
+
+    try:
+        results = pdf_pool.render_batch([html for _, html in to_render])
+    except Exception as e:
+        print(f"Playwright error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    rendered = []
+    for (entry, _), result in zip(to_render, results):
+        if isinstance(result, Exception):
+            print(f"Playwright error in batch item {entry['index']}: {result}")
+            entry["error"] = str(result)
+        else:
+            entry["ok"] = True
+            rendered.append((entry["filename"], result))
+
+    def archive_entries():
+        yield from rendered
+        yield "manifest.json", json.dumps(manifest, indent=2)
+
+    failed = sum(1 for entry in manifest if not entry["ok"])
+    return Response(
+        iter_zip(archive_entries()),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": "attachment; filename=documents.zip",
+            "X-Batch-Failed": str(failed),
+        },
+    )
+
+
 # Uploading The Resume Summary by the user
 @app.route("/api/upload-summary", methods=["POST"])
 def upload_summary():
@@ -379,7 +998,9 @@ def upload_template():
     Upload a template DOCX file. Only two filenames are allowed:
     - coverletter.docx
     - resume.docx
-    Files are stored in the 'templates' folder in Supabase.
+    Files are stored in the 'templates' folder in Supabase. The template's
+    placeholder plan is compiled here and stored next to it (<name>.plan.json)
+    so generation can skip the document walk.
     """
     if "file" not in request.files:
         return jsonify({"error": "No file part"}), 400
@@ -398,20 +1019,70 @@ def upload_template():
     if not filename.lower().endswith(".docx"):
         return jsonify({"error": "Only .docx files are allowed"}), 400
 
+    file_bytes = file.read()
     try:
-        result = storage.upload_file(file, filename, folder="templates")
-        return jsonify({
-            "message": "Template uploaded successfully",
-            "bucket": result["bucket"],
-            "key": result["key"],
-        }), 200
+        plan = DocumentUtils.compile_placeholder_plan(file_bytes)
+    except Exception as e:
+        print(e)
+        return jsonify({"error": "Template is not a valid .docx file"}), 400
+
+    try:
+        result = storage.upload_file(file_bytes, filename, folder="templates")
     except Exception as e:
         print(e)
         return jsonify({"error": str(e)}), 500
 
+    try:
+        # Stored next to the template, so the plan outlives restarts and cache evictions
+        storage.upload_file(DocumentUtils.dump_placeholder_plan(plan), f"{filename}{PLAN_SUFFIX}", folder="templates")
+    except Exception as e:
+        # Generation compiles and stores the plan itself when it is missing
+        print(f"Could not store the placeholder plan of {filename}: {e}")
+
+    return jsonify({
+        "message": "Template uploaded successfully",
+        "bucket": result["bucket"],
+        "key": result["key"],
+        "placeholders": DocumentUtils.placeholder_names(plan),
+    }), 200
+
 
 # Testing here endpoints
 
+@app.route("/api/gemini/metrics", methods=["GET"])
+def gemini_metrics():
+    """Per-attempt Gemini call metrics: outcomes, retries, hedges, throttling and latency."""
+    return jsonify(gemini.metrics_snapshot())
+
+
+@app.route("/api/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Per-stage latency histograms, error and byte counters, HTTP timings and
+    cache hit rates in the Prometheus text format. No API key is needed.
+    """
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/api/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """
+    Download a request profile (needs the X-Profile-Secret header as well).
+    Default: collapsed stacks for flamegraph.pl / speedscope.
+    ?format=json: the same plus timing, sample count and the allocation report.
+    """
+    if not profile_secret_ok():
+        return jsonify({"error": "Invalid profiling secret."}), 403
+
+    profile = profiles.get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found, expired or not finished."}), 404
+
+    if request.args.get("format") == "json":
+        return jsonify(profile)
+    return Response(profile["collapsed"], mimetype="text/plain")
+
+
 @app.route("/api/python")
 def hello_world():
     return f"<p>Hello, World!</p>"
@@ -423,5 +1094,7 @@ def hello():
 
 
 if __name__ == "__main__":
+    # PDF extraction workers are spawned processes; keep them from re-running this module's setup
+    spawn_without_main()
     app.run(debug=True, host="0.0.0.0", port=5000)
 
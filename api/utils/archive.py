@@ -0,0 +1,156 @@
+"""
+Helpers for building ZIP archives that can be streamed straight into a response.
+"""
+
+import io
+import struct
+import zipfile
+import zlib
+
+
+# ZIP record layouts (PKWARE APPNOTE 4.3.7, 4.3.12, 4.3.16)
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4s4H2LH")
+_ZIP32_LIMIT = 0xFFFFFFFF
+_FLAG_ENCRYPTED = 0x1
+_FLAG_COMPRESSION_OPTIONS = 0x6
+_FLAG_DATA_DESCRIPTOR = 0x8
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """
+    Build a ZIP archive incrementally.
+
+    Args:
+        entries: iterable of (name, bytes | str) pairs; consumed lazily, so items
+            can be produced while earlier ones are already being sent
+        compression: zipfile compression constant
+
+    Yields:
+        bytes: consecutive chunks of the archive
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
+
+
+class PatchedZip:
+    """
+    A copy of a ZIP archive with some members replaced, produced as a stream.
+
+    Members that are not replaced are copied as their raw compressed bytes,
+    without decompressing or recompressing them; replaced members are deflated
+    once up front. The total size is therefore known before anything is sent.
+
+    Args:
+        source (bytes): The original archive
+        replaced (dict): member name -> new uncompressed content
+        compresslevel (int): zlib level for the replaced members
+        chunk_size (int): Size of the pieces copied members are sent in
+
+    Raises:
+        ValueError: Encrypted members, or an archive that would need ZIP64
+    """
+
+    def __init__(self, source, replaced, compresslevel=6, chunk_size=64 * 1024):
+        self._source = memoryview(source)
+        self.chunk_size = chunk_size
+        self._members = []   # (local header, payload)
+        central = []
+        offset = 0
+
+        with zipfile.ZipFile(io.BytesIO(source)) as archive:
+            infos = archive.infolist()
+
+        for info in infos:
+            if info.flag_bits & _FLAG_ENCRYPTED:
+                raise ValueError(f"Encrypted ZIP member {info.filename} is not supported.")
+
+            # Sizes and CRC always go in the local header, so no data descriptor follows
+            flags = info.flag_bits & ~_FLAG_DATA_DESCRIPTOR
+            if info.filename in replaced:
+                data = replaced[info.filename]
+                compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+                payload = compressor.compress(data) + compressor.flush()
+                method, crc, size = zipfile.ZIP_DEFLATED, zlib.crc32(data), len(data)
+                flags &= ~_FLAG_COMPRESSION_OPTIONS
+            else:
+                start = self._data_offset(info)
+                payload = self._source[start:start + info.compress_size]
+                method, crc, size = info.compress_type, info.CRC, info.file_size
+
+            if max(offset, len(payload), size) > _ZIP32_LIMIT:
+                raise ValueError("Archives needing ZIP64 are not supported.")
+
+            name = info.filename.encode("utf-8" if flags & 0x800 else "cp437")
+            dos_time, dos_date = self._dos_datetime(info.date_time)
+            version = max(info.extract_version, 20)
+            local = _LOCAL_HEADER.pack(
+                b"PK\x03\x04", version, flags, method, dos_time, dos_date,
+                crc, len(payload), size, len(name), 0,
+            ) + name
+            central.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", info.create_system << 8 | max(info.create_version, 20), version, flags, method,
+                dos_time, dos_date, crc, len(payload), size, len(name), 0, 0, 0, 0, info.external_attr, offset,
+            ) + name)
+            self._members.append((local, payload))
+            offset += len(local) + len(payload)
+
+        directory = b"".join(central)
+        if len(central) > 0xFFFF or offset > _ZIP32_LIMIT:
+            raise ValueError("Archives needing ZIP64 are not supported.")
+        self._directory = directory + _END_OF_CENTRAL_DIRECTORY.pack(
+            b"PK\x05\x06", 0, 0, len(central), len(central), len(directory), offset, 0,
+        )
+        self.size = offset + len(self._directory)
+
+    def __iter__(self):
+        for local, payload in self._members:
+            yield local
+            for start in range(0, len(payload), self.chunk_size):
+                yield bytes(payload[start:start + self.chunk_size])
+        yield self._directory
+
+    def getvalue(self):
+        return b"".join(self)
+
+    def _data_offset(self, info):
+        """Start of a member's compressed data, after its local header."""
+        header = self._source[info.header_offset:info.header_offset + _LOCAL_HEADER.size]
+        if len(header) < _LOCAL_HEADER.size or bytes(header[:4]) != b"PK\x03\x04":
+            raise ValueError(f"Bad local header for ZIP member {info.filename}.")
+        fields = _LOCAL_HEADER.unpack(header)
+        return info.header_offset + _LOCAL_HEADER.size + fields[9] + fields[10]
+
+    @staticmethod
+    def _dos_datetime(date_time):
+        year, month, day, hour, minute, second = date_time
+        return hour << 11 | minute << 5 | second // 2, max(year - 1980, 0) << 9 | month << 5 | day
@@ -0,0 +1,309 @@
+"""
+Small caching primitives (in-memory and on-disk) shared by the storage, document and Gemini helpers.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class ByteLRUCache:
+    """
+    Thread-safe LRU cache bounded by the total size of its values.
+
+    Args:
+        max_bytes (int): Total size budget; 0 disables the cache
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, key):
+        """Return the cached value (marking it most recently used) or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        """
+        Store a value, evicting least recently used entries to stay within budget.
+
+        Returns:
+            bool: False if the value is larger than the whole cache and was not stored
+        """
+        if size > self.max_bytes:
+            self.pop(key)
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def pop(self, key):
+        """Remove a key if present and return its value."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class DiskCache:
+    """
+    Byte-valued cache stored as one file per key in a local directory.
+
+    Files survive restarts and can be shared by several worker processes.
+    Reads refresh a file's mtime so eviction (oldest mtime first) is LRU.
+    Going over budget evicts down to 90% of it, so the directory scan this
+    needs happens once per batch of writes rather than on every write.
+
+    Args:
+        directory (str): Cache directory (created if missing)
+        max_bytes (int): Total size budget for the directory
+        ttl (float, optional): Seconds an entry stays valid; None keeps entries until evicted
+    """
+
+    _HEADER = struct.Struct("<d")  # absolute expiry timestamp, 0 = never
+    # Share of max_bytes freed at once when the budget is exceeded
+    EVICT_FRACTION = 0.1
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._scan())
+
+    def get(self, key):
+        """Return the stored bytes or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            self._count(hit=False)
+            return None
+
+        if len(raw) < self._HEADER.size:
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        (expires_at,) = self._HEADER.unpack_from(raw)
+        if expires_at and expires_at < time.time():
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return raw[self._HEADER.size:]
+
+    def put(self, key, data, ttl=None):
+        """Store bytes atomically, then evict the least recently used files if over budget."""
+        record_size = self._HEADER.size + len(data)
+        if record_size > self.max_bytes:
+            return False
+
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else 0.0
+        path = self._path(key)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._HEADER.pack(expires_at))
+                f.write(data)
+            previous = self._size(path)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return False
+
+        with self._lock:
+            self._bytes += record_size - previous
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+        return True
+
+    def pop(self, key):
+        path = self._path(key)
+        size = self._size(path)
+        if self._remove(path):
+            with self._lock:
+                self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        low_water = self.max_bytes - int(self.max_bytes * self.EVICT_FRACTION)
+        with self._lock:
+            entries = sorted(self._scan(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                # Another process already evicted, or _bytes had drifted from the directory
+                self._bytes = total
+                return
+            for path, size, _ in entries:
+                if total <= low_water:
+                    break
+                if self._remove(path):
+                    total -= size
+                    self.evictions += 1
+            self._bytes = total
+
+    def _scan(self):
+        """(path, size, mtime) for every cache file currently on disk."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".bin"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, st.st_size, st.st_mtime))
+        except OSError:
+            pass
+        return entries
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class TieredCache:
+    """
+    Memory tier in front of an optional disk tier, both holding bytes.
+
+    Args:
+        memory (ByteLRUCache): First tier
+        disk (DiskCache, optional): Second tier; hits are promoted to memory
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        data = self.memory.get(key) if self.memory.enabled else None
+        if data is not None:
+            return data
+        if self.disk is None:
+            return None
+        data = self.disk.get(key)
+        if data is not None and self.memory.enabled:
+            self.memory.put(key, data, len(data))
+        return data
+
+    def put(self, key, data):
+        if self.memory.enabled:
+            self.memory.put(key, data, len(data))
+        if self.disk is not None:
+            self.disk.put(key, data)
+
+    def pop(self, key):
+        self.memory.pop(key)
+        if self.disk is not None:
+            self.disk.pop(key)
+
+    def stats(self):
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
@@ -1,23 +1,78 @@
 import io
+import re
+import json
+import hashlib
+from bisect import bisect_right
+from functools import lru_cache
 from pathlib import Path
 import tempfile
+import zipfile
 from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.oxml import serialize_part_xml
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+from docx.table import Table
 from docx.text.paragraph import Paragraph
-import PyPDF2
 import subprocess
 import tempfile
 import os
+
+from utils.cache import ByteLRUCache, DiskCache, TieredCache
+from utils.pdf_extract import PdfExtractionError, PdfExtractionPool, extract_pdf_text
+from utils.docx_text import (
+    FOOTER_REL,
+    HEADER_REL,
+    UnsupportedDocx,
+    extract_docx_text,
+    looks_like_zip,
+    main_document_part,
+    related_parts,
+)
+from utils.archive import PatchedZip
+from utils.metrics import metrics
+
+# Template placeholders look like <%NAME%> or <%SUMMARY CH200 LN3%>
+PLACEHOLDER_PATTERN = re.compile(r"<%.*?%>")
+
+W_P = qn("w:p")
+W_TBL = qn("w:tbl")
+W_T = qn("w:t")
+
+# Compiled placeholder plans, keyed by the SHA-256 of the template bytes
+_plan_cache = ByteLRUCache(4 * 1024 * 1024)
+
+# A template's plan is stored next to it as "<template>.plan.json"
+PLAN_SUFFIX = ".plan.json"
+
+# extract_text results keyed by file hash; replaced by configure_extract_cache()
+_extract_cache = TieredCache(ByteLRUCache(16 * 1024 * 1024))
+
+# Worker pool for PDF extraction; None parses in-process (see configure_pdf_extraction())
+_pdf_pool = None
+
+
+@lru_cache(maxsize=64)
+def _placeholder_matcher(keys):
+    """One alternation over all keys, longest first so overlapping keys match greedily."""
+    ordered = sorted(keys, key=len, reverse=True)
+    return re.compile("|".join(re.escape(key) for key in ordered))
+
+
 class DocumentUtils:
     """Utility class for working with DOCX and PDF files."""
 
     @staticmethod
-    def update_docx_placeholders(doc_source, replacements):
+    def update_docx_placeholders(doc_source, replacements, plan=None):
         """
         Replace placeholders in a DOCX document without changing formatting.
 
         Args:
             doc_source: path to DOCX file, bytes, or file-like object
             replacements: dict of placeholders -> replacement text
+            plan: optional placeholder plan from compile_placeholder_plan() for
+                this exact template; when given only the recorded paragraphs
+                are touched instead of walking the whole document
 
         Returns:
             BytesIO with updated document
@@ -30,16 +85,14 @@ class DocumentUtils:
             doc_stream = io.BytesIO(doc_source)
 
         doc = Document(doc_stream)
-        DocumentUtils._replace_in_paragraphs(doc.paragraphs, replacements)
 
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    DocumentUtils._replace_in_paragraphs(cell.paragraphs, replacements)
+        if plan is not None and DocumentUtils._fill_from_plan(doc, plan, replacements):
+            output = io.BytesIO()
+            doc.save(output)
+            output.seek(0)
+            return output
 
-        for section in doc.sections:
-            DocumentUtils._replace_in_paragraphs(section.header.paragraphs, replacements)
-            DocumentUtils._replace_in_paragraphs(section.footer.paragraphs, replacements)
+        DocumentUtils._replace_in_paragraphs(DocumentUtils._iter_paragraphs(doc), replacements)
 
         output = io.BytesIO()
         doc.save(output)
@@ -47,96 +100,351 @@ class DocumentUtils:
         return output
 
     @staticmethod
-    def _replace_in_paragraphs(paragraphs, replacements):
-        for paragraph in paragraphs:
-            for old, new in replacements.items():
-                if not old:
+    def stream_docx_placeholders(template_bytes, replacements, plan=None):
+        """
+        Replace placeholders like update_docx_placeholders(), producing a streamable archive.
+
+        Only the story parts (document body, headers, footers) that contain
+        placeholders are parsed and rewritten; every other member of the
+        package, such as images and embedded fonts, is copied through as its
+        original compressed bytes. Packages this cannot handle go through
+        update_docx_placeholders() instead.
+
+        Args:
+            template_bytes (bytes): DOCX template
+            replacements: dict of placeholders -> replacement text
+            plan: optional placeholder plan from compile_placeholder_plan() for
+                this exact template
+
+        Returns:
+            PatchedZip: iterable of bytes chunks, with .size and .getvalue()
+        """
+        try:
+            return PatchedZip(template_bytes, DocumentUtils._rewritten_story_parts(template_bytes, replacements, plan))
+        except (UnsupportedDocx, ValueError, KeyError, zipfile.BadZipFile):
+            filled = DocumentUtils.update_docx_placeholders(template_bytes, replacements, plan=plan)
+            return PatchedZip(filled.getvalue(), {})
+
+    @staticmethod
+    def _rewritten_story_parts(template_bytes, replacements, plan):
+        """Serialized XML of each story part that has placeholders to replace, by member name."""
+        values = DocumentUtils._replacement_values(replacements)
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as package:
+            main_part = main_document_part(package)
+            story_parts = [main_part, *related_parts(package, main_part, (HEADER_REL, FOOTER_REL))]
+
+            plan_parts = None
+            if plan is not None and all(PLACEHOLDER_PATTERN.fullmatch(key) for key in values):
+                plan_parts = {name.lstrip("/"): entries for name, entries in plan["parts"].items()}
+                if not set(plan_parts) <= set(story_parts):
+                    plan_parts = None
+
+            rewritten = {}
+            for name in story_parts:
+                if plan_parts is not None and name not in plan_parts:
+                    continue  # the plan found no placeholders here
+                root = parse_xml(package.read(name))
+                work = None
+                if plan_parts is not None:
+                    work = DocumentUtils._plan_work(root, plan_parts[name], values)
+                if work is not None:
+                    for paragraph, spans in work:
+                        DocumentUtils._replace_spans(paragraph, spans)
+                    changed = bool(work)
+                else:
+                    paragraphs = (Paragraph(p, None) for p in root.iter(W_P))
+                    changed = DocumentUtils._replace_in_paragraphs(paragraphs, replacements)
+                if changed:
+                    rewritten[name] = serialize_part_xml(root)
+        return rewritten
+
+    @staticmethod
+    def compile_placeholder_plan(doc_source):
+        """
+        Record where every <%...%> placeholder sits in a DOCX template.
+
+        The plan maps each story part (document body, headers, footers) to the
+        paragraphs holding placeholders, addressed by their element path, with
+        the character span of each placeholder in the paragraph's run text (so
+        placeholders split across runs are covered). Plans are cached by the
+        SHA-256 of the template bytes.
+
+        Args:
+            doc_source: path to DOCX file, bytes, or file-like object
+
+        Returns:
+            dict: JSON-serialisable plan
+        """
+        data = DocumentUtils._read_bytes(doc_source)
+        digest = hashlib.sha256(data).hexdigest()
+
+        doc = Document(io.BytesIO(data))
+        parts = {}
+        for part in DocumentUtils._iter_story_parts(doc):
+            root = part.element
+            entries = []
+            for p in root.iter(W_P):
+                text = "".join(run.text for run in Paragraph(p, None).runs)
+                if "<%" not in text:
                     continue
-                DocumentUtils._replace_text(paragraph, old, new)
+                spans = [[m.group(0), m.start(), m.end()] for m in PLACEHOLDER_PATTERN.finditer(text)]
+                if spans:
+                    entries.append({"path": DocumentUtils._element_path(root, p), "spans": spans})
+            if entries:
+                parts[str(part.partname)] = entries
+
+        plan = {"hash": digest, "parts": parts}
+        _plan_cache.put(digest, plan, len(json.dumps(plan)))
+        return plan
+
+    @staticmethod
+    def get_placeholder_plan(template_bytes):
+        """Return the cached plan for these template bytes, compiling it on a miss."""
+        plan = DocumentUtils.cached_placeholder_plan(template_bytes)
+        if plan is None:
+            plan = DocumentUtils.compile_placeholder_plan(template_bytes)
+        return plan
 
-    # @staticmethod
-    # def _replace_text(paragraph, old, new):
-    #     """Replace text inside paragraph runs without changing formatting."""
-    #     replaced = False
-    #     for run in paragraph.runs:
-    #         if old in run.text:
-    #             run.text = run.text.replace(old, new)
-    #             replaced = True
-    #     if replaced:
-    #         return
-
-    #     # Handle placeholders spanning multiple runs
-    #     while True:
-    #         text_combined = "".join(run.text for run in paragraph.runs)
-    #         start = text_combined.find(old)
-    #         if start == -1:
-    #             break
-    #         end = start + len(old)
-    #         DocumentUtils._replace_across_runs(paragraph, start, end, new)
-    
     @staticmethod
-    def _replace_text(paragraph, old, new):
-        """Replace text inside paragraph runs without changing formatting.
-        If new is empty, remove the placeholder. If the paragraph becomes empty, remove it completely.
+    def cached_placeholder_plan(template_bytes):
+        """The plan for these template bytes if it is in the in-memory cache, else None."""
+        return _plan_cache.get(hashlib.sha256(template_bytes).hexdigest())
+
+    @staticmethod
+    def load_placeholder_plan(plan_json, template_bytes):
+        """
+        Put a stored plan (see PLAN_SUFFIX) into the cache if it was compiled from these template bytes.
+
+        Args:
+            plan_json (bytes | str): Plan as saved by dump_placeholder_plan()
+            template_bytes (bytes): The template the plan should belong to
+
+        Returns:
+            dict | None: The plan, or None if it is unreadable or for another template
         """
-        if old not in paragraph.text:
-            return
-
-        # If replacement is empty, remove the placeholder
-        if new == "":
-            for run in paragraph.runs:
-                run.text = run.text.replace(old, "")
-            # If paragraph becomes empty, clear all runs
-            if paragraph.text.strip() == "":
-                for run in paragraph.runs:
-                    run.text = ""
-            return
-
-        # Normal replacement
-        for run in paragraph.runs:
-            if old in run.text:
-                run.text = run.text.replace(old, new)
-
-        # Handle placeholders spanning multiple runs
-        while True:
-            combined = "".join(run.text for run in paragraph.runs)
-            start = combined.find(old)
-            if start == -1:
-                break
-            end = start + len(old)
-            DocumentUtils._replace_across_runs(paragraph, start, end, new)
+        try:
+            plan = json.loads(plan_json)
+            digest, parts = plan["hash"], plan["parts"]
+        except (ValueError, TypeError, KeyError):
+            return None
+        if digest != hashlib.sha256(template_bytes).hexdigest() or not isinstance(parts, dict):
+            return None
+        _plan_cache.put(digest, plan, len(plan_json))
+        return plan
 
+    @staticmethod
+    def dump_placeholder_plan(plan):
+        """Plan as JSON bytes, for storing next to its template."""
+        return json.dumps(plan, separators=(",", ":")).encode("utf-8")
 
     @staticmethod
-    def _replace_across_runs(paragraph, start, end, replacement):
-        run_positions = []
+    def placeholder_plan_cache_stats():
+        return _plan_cache.stats()
+
+    @staticmethod
+    def placeholder_names(plan):
+        """Distinct placeholders recorded in a plan, in document order."""
+        names = {}
+        for entries in plan["parts"].values():
+            for entry in entries:
+                for name, _, _ in entry["spans"]:
+                    names.setdefault(name, None)
+        return list(names)
+
+    @staticmethod
+    def _fill_from_plan(doc, plan, replacements):
+        """
+        Apply replacements at the locations recorded in a plan.
+
+        Returns False (leaving the document untouched) when the plan cannot be
+        used: replacement keys that are not <%...%> placeholders, or a plan that
+        does not match this document.
+        """
+        values = DocumentUtils._replacement_values(replacements)
+        if not all(PLACEHOLDER_PATTERN.fullmatch(key) for key in values):
+            return False
+
+        parts = {str(part.partname): part for part in DocumentUtils._iter_story_parts(doc)}
+        work = []
+        for partname, entries in plan["parts"].items():
+            part = parts.get(partname)
+            if part is None:
+                return False
+            part_work = DocumentUtils._plan_work(part.element, entries, values)
+            if part_work is None:
+                return False
+            work.extend(part_work)
+
+        for paragraph, spans in work:
+            DocumentUtils._replace_spans(paragraph, spans)
+        return True
+
+    @staticmethod
+    def _plan_work(root, entries, values):
+        """
+        (paragraph, spans) to rewrite in one story part, or None if the plan's
+        entries do not match the part's XML.
+        """
+        work = []
+        for entry in entries:
+            p = DocumentUtils._resolve_path(root, entry["path"])
+            if p is None or p.tag != W_P:
+                return None
+            paragraph = Paragraph(p, None)
+            text = "".join(run.text for run in paragraph.runs)
+            spans = []
+            for name, start, end in entry["spans"]:
+                if text[start:end] != name:
+                    return None
+                if name in values:
+                    spans.append((start, end, values[name]))
+            if spans:
+                work.append((paragraph, spans))
+        return work
+
+    @staticmethod
+    def _replace_spans(paragraph, spans):
+        """
+        Rewrite a paragraph's runs in one pass.
+
+        Args:
+            paragraph: python-docx Paragraph
+            spans: sorted, non-overlapping (start, end, replacement) tuples over
+                the concatenated run text
+
+        A placeholder inside one run is replaced in place; one spanning several
+        runs is written into its first run, the runs in between are emptied and
+        the last run keeps only the text after the placeholder, so each run keeps
+        its own formatting. If an empty replacement leaves the paragraph blank,
+        all of its runs are cleared.
+        """
+        runs = paragraph.runs
+        original = [run.text for run in runs]
+        texts = list(original)
+
+        starts, ends = [], []
         pos = 0
-        for run in paragraph.runs:
-            run_positions.append((run, pos, pos + len(run.text)))
-            pos += len(run.text)
+        for text in original:
+            starts.append(pos)
+            pos += len(text)
+            ends.append(pos)
+
+        removed = False
+        for start, end, replacement in reversed(spans):
+            first = bisect_right(ends, start)
+            last = bisect_right(ends, end - 1)
+            head = texts[first][: start - starts[first]]
+            tail = texts[last][end - starts[last]:]
+            if first == last:
+                texts[first] = head + replacement + tail
+            else:
+                texts[first] = head + replacement
+                for i in range(first + 1, last):
+                    texts[i] = ""
+                texts[last] = tail
+            removed = removed or replacement == ""
+
+        if removed and "".join(texts).strip() == "":
+            texts = [""] * len(texts)
+
+        for run, old_text, new_text in zip(runs, original, texts):
+            if new_text != old_text:
+                run.text = new_text
+
+    @staticmethod
+    def _iter_story_parts(doc):
+        """Main document part followed by every header and footer part."""
+        yield doc.part
+        seen = set()
+        for rel in doc.part.rels.values():
+            if rel.is_external or rel.reltype not in (RT.HEADER, RT.FOOTER):
+                continue
+            part = rel.target_part
+            if part.partname not in seen:
+                seen.add(part.partname)
+                yield part
+
+    @staticmethod
+    def _element_path(root, element):
+        """Child indices leading from root down to element."""
+        path = []
+        while element is not root:
+            parent = element.getparent()
+            path.append(parent.index(element))
+            element = parent
+        path.reverse()
+        return path
+
+    @staticmethod
+    def _resolve_path(root, path):
+        element = root
+        try:
+            for index in path:
+                element = element[index]
+        except IndexError:
+            return None
+        return element
+
+    @staticmethod
+    def _read_bytes(source):
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                return f.read()
+        if hasattr(source, "read"):
+            start_pos = source.tell()
+            data = source.read()
+            source.seek(start_pos)
+            return data
+        return bytes(source)
+
+    @staticmethod
+    def _replace_in_paragraphs(paragraphs, replacements):
+        """
+        Replace every placeholder of every paragraph with a single scan per paragraph.
+
+        Returns:
+            bool: Whether any paragraph was changed
+        """
+        values = DocumentUtils._replacement_values(replacements)
+        if not values:
+            return False
 
-        start_idx = end_idx = None
-        for i, (run, s, e) in enumerate(run_positions):
-            if s <= start < e:
-                start_idx = i
-            if s <= end - 1 < e:
-                end_idx = i
-        if start_idx is None or end_idx is None:
-            return
+        matcher = _placeholder_matcher(tuple(sorted(values)))
+        # Paragraphs without "<%" in their text nodes cannot hold a template
+        # placeholder, so they are skipped without building run objects.
+        prefilter = all(key.startswith("<%") for key in values)
+        changed = False
 
-        start_run, s_start, s_end = run_positions[start_idx]
-        end_run, e_start, e_end = run_positions[end_idx]
+        for paragraph in paragraphs:
+            if prefilter and "<%" not in "".join(paragraph._p.itertext(W_T)):
+                continue
+            text = "".join(run.text for run in paragraph.runs)
+            spans = [(m.start(), m.end(), values[m.group(0)]) for m in matcher.finditer(text)]
+            if spans:
+                DocumentUtils._replace_spans(paragraph, spans)
+                changed = True
+        return changed
 
-        start_offset = start - s_start
-        end_offset = end - e_start
+    @staticmethod
+    def _iter_paragraphs(doc):
+        """
+        Every paragraph of the body, headers and footers exactly once.
 
-        prefix = start_run.text[:start_offset]
-        suffix = end_run.text[end_offset:]
+        Walking the XML instead of doc.tables/row.cells reaches nested tables and
+        text boxes and does not revisit merged cells, which python-docx returns
+        once per spanned grid column.
+        """
+        for part in DocumentUtils._iter_story_parts(doc):
+            for p in part.element.iter(W_P):
+                yield Paragraph(p, None)
 
-        start_run.text = prefix + replacement
-        for i in range(start_idx + 1, end_idx):
-            paragraph.runs[i].text = ""
-        end_run.text = suffix
+    @staticmethod
+    def _replacement_values(replacements):
+        return {
+            key: "" if value is None else str(value)
+            for key, value in replacements.items()
+            if key
+        }
 
     # @staticmethod
     # def convert_docx_to_pdf(docx_source):
@@ -204,12 +512,29 @@ class DocumentUtils:
 
 
     @staticmethod
-    def extract_text(file_source):
+    def extract_text(file_source, use_cache=True, max_chars=None, include_headers=False, digest=None):
         """
         Extract plain text from DOCX or PDF.
 
+        Results are cached by a hash of the file bytes (see
+        configure_extract_cache), so identical documents are parsed once.
+        PDF pages are read lazily and, if configure_pdf_extraction() set up a
+        worker pool, in a separate process with a timeout and memory limit.
+        For bytes and file-like objects the format is detected from the first
+        bytes (ZIP container or "%PDF" header).
+
+        When the caller already knows the SHA-256 of a seekable file (see
+        utils.upload.UploadSpool), the file is parsed in place instead of being
+        read into memory, and a cache hit does not read it at all.
+
         Args:
-            file_source: path to file (str/Path) or file-like object
+            file_source: path to file (str/Path), bytes, or file-like object
+            use_cache (bool): look up / store the result in the extraction cache
+            max_chars (int, optional): Stop reading PDF pages once this many
+                characters have been extracted (whole pages are kept)
+            include_headers (bool): For DOCX, append header and footer text
+            digest (str, optional): Hex SHA-256 of the bytes or of a file-like source
+                at position 0; used as the cache key instead of hashing again
 
         Returns:
             string with extracted text
@@ -221,54 +546,187 @@ class DocumentUtils:
                 raise FileNotFoundError(f"File not found: {file_source}")
 
             suffix = path.suffix.lower()
-            if suffix == ".docx":
-                doc = Document(path)
-                text_parts = [p.text for p in doc.paragraphs]
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            text_parts.append(cell.text)
-                return "\n".join(text_parts)
-            elif suffix == ".pdf":
-                text = []
-                with open(path, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        text.append(page.extract_text() or "")
-                return "\n".join(text)
-            else:
+            if suffix not in (".docx", ".pdf"):
                 raise ValueError("Unsupported file type. Only DOCX and PDF allowed.")
+            content = path.read_bytes()
+            kind = suffix[1:]
+            digest = None
+
+        # A seekable file whose hash is known is parsed without reading it into memory
+        elif hasattr(file_source, "read") and digest is not None and file_source.tell() == 0:
+            content = file_source
+            kind = "auto"
 
         # If file_source is bytes or file-like object
         elif hasattr(file_source, "read"):
             start_pos = file_source.tell()
             content = file_source.read()
             file_source.seek(start_pos)
+            kind = "auto"
+            digest = None
 
-            # Try DOCX first
-            try:
-                doc = Document(io.BytesIO(content))
-                text_parts = [p.text for p in doc.paragraphs]
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            text_parts.append(cell.text)
-                return "\n".join(text_parts)
-            except Exception:
-                # Try PDF
+        elif isinstance(file_source, (bytes, bytearray)):
+            content = bytes(file_source)
+            kind = "auto"
+
+        else:
+            raise TypeError("file_source must be a path, bytes, or file-like object")
+
+        cache_key = None
+        if use_cache:
+            budget = "" if max_chars is None else f"{max_chars}:"
+            headers = "hf:" if include_headers else ""
+            digest = digest or hashlib.sha256(content).hexdigest()
+            cache_key = f"extract-v1:{kind}:{budget}{headers}{digest}"
+            cached = _extract_cache.get(cache_key)
+            if cached is not None:
+                return cached.decode("utf-8")
+
+        # Only parses are timed; cache hits show up in the extract cache counters
+        size = len(content) if isinstance(content, (bytes, bytearray)) else DocumentUtils._stream_size(content)
+        with metrics.stage("extract_text", bytes_in=size) as timer:
+            if kind == "docx":
+                text = DocumentUtils._docx_text(content, include_headers)
+            elif kind == "pdf":
+                text = DocumentUtils._pdf_text(content, max_chars)
+            else:
+                detected = DocumentUtils._sniff_format(content)
                 try:
-                    pdf_stream = io.BytesIO(content)
-                    reader = PyPDF2.PdfReader(pdf_stream)
-                    text = []
-                    for page in reader.pages:
-                        text.append(page.extract_text() or "")
-                    return "\n".join(text)
+                    if detected == "docx":
+                        text = DocumentUtils._docx_text(content, include_headers)
+                    elif detected == "pdf":
+                        text = DocumentUtils._pdf_text(content, max_chars)
+                    else:
+                        # Unrecognised header: try DOCX first, then PDF
+                        try:
+                            text = DocumentUtils._docx_text(content, include_headers)
+                        except Exception:
+                            text = DocumentUtils._pdf_text(content, max_chars)
+                except PdfExtractionError:
+                    raise
                 except Exception:
                     raise ValueError("Unsupported file format or failed to read the file.")
+                finally:
+                    if not isinstance(content, (bytes, bytearray)):
+                        content.seek(0)
+            timer.bytes_out = len(text)
+
+        if cache_key is not None:
+            _extract_cache.put(cache_key, text.encode("utf-8"))
+        return text
+
+    @staticmethod
+    def configure_extract_cache(memory_bytes=16 * 1024 * 1024, disk_dir=None, disk_bytes=256 * 1024 * 1024):
+        """
+        Set up the extract_text cache.
+
+        Args:
+            memory_bytes (int): Size of the in-memory tier (0 disables it)
+            disk_dir (str, optional): Directory for the on-disk tier; None keeps memory only
+            disk_bytes (int): Size budget of the on-disk tier
+        """
+        global _extract_cache
+        disk = DiskCache(disk_dir, disk_bytes) if disk_dir and disk_bytes else None
+        _extract_cache = TieredCache(ByteLRUCache(memory_bytes), disk)
+
+    @staticmethod
+    def extract_cache_stats():
+        return _extract_cache.stats()
+
+    @staticmethod
+    def configure_pdf_extraction(workers=0, timeout=30.0, memory_mb=512):
+        """
+        Choose where PDF text is extracted.
 
+        Args:
+            workers (int): Worker processes for PDF parsing; 0 parses in the calling thread
+            timeout (float): Seconds allowed per document in a worker
+            memory_mb (int): Address-space limit per worker (0 = unlimited)
+        """
+        global _pdf_pool
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown()
+        _pdf_pool = PdfExtractionPool(workers, timeout, memory_mb) if workers > 0 else None
+
+    @staticmethod
+    def pdf_extraction_stats():
+        return _pdf_pool.stats() if _pdf_pool is not None else {"workers": 0}
+
+    @staticmethod
+    def _stream_size(stream):
+        """Size of a spool or an open file, 0 when unknown."""
+        size = getattr(stream, "size", None)
+        if size is not None:
+            return size
+        try:
+            return os.fstat(stream.fileno()).st_size
+        except (AttributeError, OSError):
+            return 0
+
+    @staticmethod
+    def _sniff_format(content):
+        """"docx" or "pdf" from the leading bytes, None if neither header is there."""
+        if not isinstance(content, (bytes, bytearray)):
+            content.seek(0)
+            head = content.read(1024)
+            content.seek(0)
+            content = head
+        if looks_like_zip(content):
+            return "docx"
+        # PDF readers accept up to 1 KB of junk before the header
+        if b"%PDF-" in content[:1024]:
+            return "pdf"
+        return None
+
+    @staticmethod
+    def _docx_text(content, include_headers=False):
+        """DOCX text from bytes or a seekable binary file."""
+        if not isinstance(content, (bytes, bytearray)):
+            content.seek(0)
+        try:
+            return extract_docx_text(content, include_headers)
+        except UnsupportedDocx:
+            pass
+
+        # Full object model for what the XML reader does not cover
+        if isinstance(content, (bytes, bytearray)):
+            doc = Document(io.BytesIO(content))
         else:
-            raise TypeError("file_source must be a path, bytes, or file-like object")
+            content.seek(0)
+            doc = Document(content)
+        text_parts = [p.text for p in doc.paragraphs]
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    text_parts.append(cell.text)
+
+        if include_headers:
+            for part in list(DocumentUtils._iter_story_parts(doc))[1:]:
+                paragraphs = [Paragraph(p, None).text for p in part.element.iterchildren(W_P)]
+                cells = [
+                    cell.text
+                    for tbl in part.element.iterchildren(W_TBL)
+                    for row in Table(tbl, None).rows
+                    for cell in row.cells
+                ]
+                text_parts.extend(paragraphs + cells)
+        return "\n".join(text_parts)
 
+    @staticmethod
+    def _pdf_text(content, max_chars=None):
+        """PDF text from bytes or a seekable binary file."""
+        if not isinstance(content, (bytes, bytearray)):
+            content.seek(0)
+            if _pdf_pool is not None:
+                # Workers open a spooled or regular file themselves; anything else is sent as bytes
+                path = getattr(content, "path", None) or getattr(content, "name", None)
+                if isinstance(path, str) and os.path.isfile(path):
+                    content.flush()
+                    return _pdf_pool.extract(path, max_chars)
+                return _pdf_pool.extract(content.read(), max_chars)
+        elif _pdf_pool is not None:
+            return _pdf_pool.extract(content, max_chars)
+        return extract_pdf_text(content, max_chars)
 
 
 
@@ -0,0 +1,225 @@
+"""
+Fast DOCX text extraction straight from the package XML.
+
+python-docx builds an object for every element of the document just so
+extract_text can read paragraph text. Here the main document part is parsed
+incrementally: each top-level paragraph or table is turned into text as soon
+as its end tag is read and then discarded. The output is identical to the
+python-docx based extraction (body paragraphs, then every cell of every
+top-level table); documents using features whose text python-docx derives
+from elsewhere in the document (vertically merged cells) raise
+UnsupportedDocx so the caller can fall back.
+"""
+
+import io
+import posixpath
+import zipfile
+
+from lxml import etree
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+DOCUMENT_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+HEADER_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/header"
+FOOTER_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer"
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY, W_HDR, W_FTR = _w("body"), _w("hdr"), _w("ftr")
+W_P, W_TBL, W_TR, W_TC = _w("p"), _w("tbl"), _w("tr"), _w("tc")
+W_R, W_HYPERLINK, W_T = _w("r"), _w("hyperlink"), _w("t")
+W_TCPR, W_GRIDSPAN, W_VMERGE = _w("tcPr"), _w("gridSpan"), _w("vMerge")
+W_VAL, W_TYPE = _w("val"), _w("type")
+STORY_ROOTS = (W_BODY, W_HDR, W_FTR)
+
+# Text equivalents of run content, as python-docx defines them
+_RUN_CHARS = {_w("tab"): "\t", _w("ptab"): "\t", _w("cr"): "\n", _w("noBreakHyphen"): "-"}
+W_BR = _w("br")
+
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+
+class UnsupportedDocx(ValueError):
+    """The document needs the full python-docx model to produce the same text."""
+
+
+def looks_like_zip(content):
+    return content[:4] == b"PK\x03\x04"
+
+
+def extract_docx_text(content, include_headers=False):
+    """
+    Text of a DOCX given as bytes.
+
+    Args:
+        content (bytes | file): DOCX package, or a seekable binary file holding it
+        include_headers (bool): Append the text of headers and footers after the body
+
+    Returns:
+        str: Body paragraphs, then table cells, joined by newlines
+
+    Raises:
+        UnsupportedDocx: Not a Word document, or uses vertically merged cells
+        zipfile.BadZipFile / lxml.etree.XMLSyntaxError: Corrupt package
+    """
+    source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    with zipfile.ZipFile(source) as package:
+        main_part = main_document_part(package)
+        with package.open(main_part) as xml:
+            paragraphs, tables = _story_text(xml)
+        parts = paragraphs + tables
+
+        if include_headers:
+            for part in related_parts(package, main_part, (HEADER_REL, FOOTER_REL)):
+                with package.open(part) as xml:
+                    paragraphs, tables = _story_text(xml)
+                parts.extend(paragraphs + tables)
+
+    return "\n".join(parts)
+
+
+def _story_text(xml):
+    """
+    Read one story part (document body, header or footer) incrementally.
+
+    Returns:
+        tuple[list[str], list[str]]: Text of the top-level paragraphs, and of
+        every cell of the top-level tables
+    """
+    paragraphs = []
+    tables = []
+    depth = 0
+    story_depth = None
+    parser = etree.iterparse(xml, events=("start", "end"), resolve_entities=False, no_network=True, huge_tree=True)
+    for event, element in parser:
+        if event == "start":
+            depth += 1
+            if story_depth is None and element.tag in STORY_ROOTS:
+                story_depth = depth
+            continue
+
+        if story_depth is not None and depth == story_depth + 1:
+            # A complete top-level block of the story
+            if element.tag == W_P:
+                paragraphs.append(_paragraph_text(element))
+            elif element.tag == W_TBL:
+                tables.extend(_table_cells(element))
+            element.clear()
+            # Drop the already processed siblings as well
+            parent = element.getparent()
+            while parent is not None and element.getprevious() is not None:
+                del parent[0]
+        depth -= 1
+
+    if story_depth is None:
+        raise UnsupportedDocx("No document body found.")
+    return paragraphs, tables
+
+
+def _paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            _run_text(child, parts)
+        elif child.tag == W_HYPERLINK:
+            for run in child:
+                if run.tag == W_R:
+                    _run_text(run, parts)
+    return "".join(parts)
+
+
+def _run_text(run, parts):
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            if child.text:
+                parts.append(child.text)
+        elif tag == W_BR:
+            # Column and page breaks have no text equivalent
+            if child.get(W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            char = _RUN_CHARS.get(tag)
+            if char:
+                parts.append(char)
+
+
+def _table_cells(tbl):
+    """Cell texts row by row; a cell spanning several grid columns repeats, as in python-docx."""
+    cells = []
+    for tr in tbl:
+        if tr.tag != W_TR:
+            continue
+        for tc in tr:
+            if tc.tag != W_TC:
+                continue
+            span = 1
+            tcPr = tc.find(W_TCPR)
+            if tcPr is not None:
+                vmerge = tcPr.find(W_VMERGE)
+                if vmerge is not None and vmerge.get(W_VAL, "continue") == "continue":
+                    # python-docx reports the text of the cell above
+                    raise UnsupportedDocx("Vertically merged table cells.")
+                grid_span = tcPr.find(W_GRIDSPAN)
+                if grid_span is not None:
+                    span = int(grid_span.get(W_VAL, "1"))
+            text = "\n".join(_paragraph_text(p) for p in tc if p.tag == W_P)
+            cells.extend([text] * span)
+    return cells
+
+
+def main_document_part(package):
+    """Name of the main document part, checked the same way python-docx checks it."""
+    target = None
+    for rel in _relationships(package, "_rels/.rels"):
+        if rel.get("Type") == OFFICE_DOCUMENT_REL:
+            target = rel.get("Target").lstrip("/")
+            break
+    if target is None:
+        raise UnsupportedDocx("Package has no main document part.")
+
+    content_types = etree.fromstring(package.read("[Content_Types].xml"), _PARSER)
+    for override in content_types.iter(f"{{{CT_NS}}}Override"):
+        if override.get("PartName", "").lstrip("/") == target:
+            if override.get("ContentType") != DOCUMENT_CONTENT_TYPE:
+                raise UnsupportedDocx(f"Not a Word document: {override.get('ContentType')}")
+            return target
+    raise UnsupportedDocx("Main document part has no content type.")
+
+
+def related_parts(package, source, types):
+    directory, name = posixpath.split(source)
+    rels_name = posixpath.join(directory, "_rels", f"{name}.rels")
+    seen = set()
+    for rel in _relationships(package, rels_name):
+        if rel.get("Type") not in types or rel.get("TargetMode") == "External":
+            continue
+        part = posixpath.normpath(posixpath.join(directory, rel.get("Target"))).lstrip("/")
+        if part not in seen:
+            seen.add(part)
+            yield part
+
+
+def _relationships(package, name):
+    try:
+        data = package.read(name)
+    except KeyError:
+        return []
+    return etree.fromstring(data, _PARSER).iter(f"{{{R_NS}}}Relationship")
+
+
+
+
+
+"""
+from utils.docx_text import extract_docx_text
+
+with open("resume.docx", "rb") as f:
+    text = extract_docx_text(f.read(), include_headers=True)
+"""
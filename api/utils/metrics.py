@@ -0,0 +1,242 @@
+"""
+In-process metrics, exposed in the Prometheus text format.
+
+Each stage of a request (storage reads, Gemini calls, JSON parsing, template
+filling, PDF rendering, ...) is timed with ``metrics.stage(name)``, which
+records a latency histogram, an error counter and optional byte counters.
+Recording costs a bisect and a few additions under a lock, so it can wrap hot
+code. Numbers owned by other components (cache hits, pool restarts) are not
+copied on every event; registered collectors read them when /api/metrics is
+scraped.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the upper bounds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = "stage_duration_seconds"
+STAGE_ERRORS = "stage_errors_total"
+STAGE_BYTES = "stage_bytes_total"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)   # last slot: above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+
+class _StageTimer:
+    """Context manager returned by MetricsRegistry.stage(); set ``bytes_out`` before it exits."""
+
+    __slots__ = ("registry", "stage", "bytes_in", "bytes_out", "started")
+
+    def __init__(self, registry, stage, bytes_in):
+        self.registry = registry
+        self.stage = stage
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record_stage(
+            self.stage,
+            time.perf_counter() - self.started,
+            # A generator closed early by its consumer did not fail
+            error=exc_type is not None and not issubclass(exc_type, GeneratorExit),
+            bytes_in=self.bytes_in,
+            bytes_out=self.bytes_out,
+        )
+        return False
+
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms, rendered in the Prometheus text format.
+
+    Series are identified by a metric name and a tuple of (label, value) pairs.
+
+    Args:
+        namespace (str): Prefix of every metric name
+        buckets (tuple[float]): Upper bounds of the histogram buckets, in seconds
+    """
+
+    def __init__(self, namespace="jobbot", buckets=LATENCY_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms = {}   # (name, labels) -> _Histogram
+        self._counters = {}     # (name, labels) -> number
+        self._help = {
+            STAGE_SECONDS: ("histogram", "Latency of each processing stage."),
+            STAGE_ERRORS: ("counter", "Stage executions that raised an exception."),
+            STAGE_BYTES: ("counter", "Bytes read (in) and produced (out) by each stage."),
+        }
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        """Set the TYPE ("counter", "gauge" or "histogram") and HELP lines of a metric."""
+        self._help[name] = (kind, help_text)
+
+    def observe(self, name, value, labels=()):
+        """Add a value (seconds) to a histogram."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = _Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def inc(self, name, amount=1, labels=()):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def stage(self, stage, bytes_in=0):
+        """
+        Time a block as one execution of a stage.
+
+        Example:
+            with metrics.stage("storage_fetch") as timer:
+                body = fetch()
+                timer.bytes_in = len(body)
+        """
+        return _StageTimer(self, stage, bytes_in)
+
+    def record_stage(self, stage, seconds, error=False, bytes_in=0, bytes_out=0):
+        labels = (("stage", stage),)
+        self.observe(STAGE_SECONDS, seconds, labels)
+        if error:
+            self.inc(STAGE_ERRORS, 1, labels)
+        if bytes_in:
+            self.inc(STAGE_BYTES, bytes_in, (("stage", stage), ("direction", "in")))
+        if bytes_out:
+            self.inc(STAGE_BYTES, bytes_out, (("stage", stage), ("direction", "out")))
+
+    def register_collector(self, collect):
+        """
+        Add a function called on every render.
+
+        It yields (name, kind, help, labels, value) tuples; labels is a dict or
+        a tuple of pairs, and samples with a None value are skipped.
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        families = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                families.setdefault(name, []).append((labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                families.setdefault(name, []).append(
+                    (labels, (list(histogram.counts), histogram.sum, histogram.count))
+                )
+        described = dict(self._help)
+
+        for collect in list(self._collectors):
+            try:
+                for name, kind, help_text, labels, value in collect():
+                    if value is None:
+                        continue
+                    if isinstance(labels, dict):
+                        labels = tuple(labels.items())
+                    described.setdefault(name, (kind, help_text))
+                    families.setdefault(name, []).append((labels, value))
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+
+        lines = []
+        for name in sorted(families):
+            full_name = f"{self.namespace}_{name}"
+            kind, help_text = described.get(name, ("untyped", ""))
+            if help_text:
+                lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in sorted(families[name], key=lambda series: series[0]):
+                if kind == "histogram":
+                    lines.extend(self._histogram_lines(full_name, labels, *value))
+                else:
+                    lines.append(f"{full_name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _histogram_lines(self, full_name, labels, counts, total, count):
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            yield f"{full_name}_bucket{_labels(labels + (('le', _number(bound)),))} {cumulative}"
+        yield f"{full_name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}"
+        yield f"{full_name}_sum{_labels(labels)} {_number(total)}"
+        yield f"{full_name}_count{_labels(labels)} {count}"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{{{pairs}}}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def cache_samples(cache, stats):
+    """
+    Collector samples for a cache's stats() dict (hits, misses, bytes, ...).
+
+    Args:
+        cache (str): Value of the "cache" label
+        stats (dict | None): The cache's counters; None yields nothing
+    """
+    if not stats:
+        return
+    labels = (("cache", cache),)
+    hits, misses = stats.get("hits"), stats.get("misses")
+    yield "cache_hits_total", "counter", "Cache lookups that found an entry.", labels, hits
+    yield "cache_misses_total", "counter", "Cache lookups that found nothing.", labels, misses
+    yield "cache_evictions_total", "counter", "Entries dropped to stay within the size budget.", labels, stats.get("evictions")
+    yield "cache_bytes", "gauge", "Bytes held by the cache.", labels, stats.get("bytes")
+    if hits is not None and misses is not None:
+        ratio = hits / (hits + misses) if hits + misses else None
+        yield "cache_hit_ratio", "gauge", "Share of lookups answered by the cache since start.", labels, ratio
+
+
+# Process-wide registry used by the app and the modules it calls
+metrics = MetricsRegistry()
+
+
+
+
+"""
+from utils.metrics import metrics
+
+with metrics.stage("docx_fill") as timer:
+    document = fill_template()
+    timer.bytes_out = document.size
+
+metrics.register_collector(lambda: [("cache_hits_total", "counter", "Cache hits.", {"cache": "plan"}, 42)])
+print(metrics.render())
+"""
@@ -0,0 +1,232 @@
+"""
+Page-by-page PDF text extraction, optionally isolated in worker processes.
+
+Pages are parsed lazily, so a character budget stops the work as soon as
+enough text has been read. Malformed PDFs can make PyPDF2 loop or allocate
+without bound; PdfExtractionPool runs extraction in spawned worker processes
+with an address-space limit and a per-document timeout, and replaces a worker
+that hangs or dies instead of tying up the request thread.
+"""
+
+import importlib.util
+import io
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class PdfExtractionError(RuntimeError):
+    """The PDF could not be read (corrupt file, worker crash or memory limit)."""
+
+
+class PdfExtractionTimeout(PdfExtractionError):
+    """Extraction took longer than the per-document timeout."""
+
+
+def iter_pdf_pages(stream, max_chars=None):
+    """
+    Yield the text of each page in order, parsing pages only as they are needed.
+
+    Args:
+        stream: binary file-like object holding the PDF
+        max_chars (int, optional): Stop after the page that brings the total
+            past this many characters; None reads every page
+
+    Yields:
+        str: Text of one page ("" for pages without a text layer)
+    """
+    reader = PyPDF2.PdfReader(stream)
+    total = 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        yield text
+        total += len(text)
+        if max_chars is not None and total >= max_chars:
+            return
+
+
+def extract_pdf_text(source, max_chars=None):
+    """Text of a PDF given as bytes, a file path or a binary file, pages joined by newlines."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return "\n".join(iter_pdf_pages(f, max_chars))
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return "\n".join(iter_pdf_pages(source, max_chars))
+
+
+def _limit_memory(memory_bytes):
+    """Worker initializer: cap the address space so a runaway parse raises MemoryError."""
+    if resource is None or not memory_bytes:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_bytes = min(memory_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+
+def spawn_without_main():
+    """
+    Keep spawned worker processes from re-running the main script.
+
+    A spawned process imports the parent's __main__ module (as __mp_main__)
+    before it runs anything. Under "python index.py" that repeats the whole app
+    setup (storage, LLM client, browser pool, job queue) in every PDF worker.
+    Pointing multiprocessing at this module instead limits a worker's start to
+    the imports it needs. Call it from the script's ``__main__`` block.
+    """
+    sys.modules["__main__"].__spec__ = importlib.util.find_spec(__name__)
+
+
+class PdfExtractionPool:
+    """
+    Extract PDF text in spawned worker processes.
+
+    Workers are started on first use. A document is handed to the pool only
+    when a worker is free, so the timeout measures its parse rather than the
+    time it waited behind other documents. A document that exceeds the timeout
+    has its worker killed and the pool is replaced; other documents in flight
+    at that moment are retried once on the new pool.
+
+    Args:
+        workers (int): Number of worker processes
+        timeout (float): Seconds allowed per document
+        memory_mb (int): Address-space limit per worker (0 = unlimited)
+        max_tasks_per_worker (int): Documents handled by a worker before it is
+            replaced, to release memory fragmented by large files
+    """
+
+    def __init__(self, workers=2, timeout=30.0, memory_mb=512, max_tasks_per_worker=50):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._pool = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Documents wait here, in the caller's thread, until a worker is free
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+        self.completed = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.restarts = 0
+
+    def extract(self, content, max_chars=None):
+        """
+        Text of a PDF given as bytes or a file path (opened by the worker).
+
+        Raises:
+            PdfExtractionTimeout: The document took longer than the timeout
+            PdfExtractionError: The worker crashed or ran out of memory
+            Exception: Parse errors raised by PyPDF2 in the worker
+        """
+        with self._slots:
+            for attempt in range(2):
+                pool, generation = self._current_pool()
+                future = pool.submit(extract_pdf_text, content, max_chars)
+                try:
+                    text = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    with self._lock:
+                        self.timeouts += 1
+                    self._restart(generation)
+                    raise PdfExtractionTimeout(f"PDF text extraction timed out after {self.timeout:g}s.")
+                except BrokenProcessPool:
+                    # Another document's timeout replaced the pool under us: retry once
+                    if attempt == 0 and self._restart(generation) is False:
+                        continue
+                    with self._lock:
+                        self.failures += 1
+                    raise PdfExtractionError("PDF text extraction worker crashed.")
+                except MemoryError:
+                    with self._lock:
+                        self.failures += 1
+                    raise PdfExtractionError("PDF text extraction exceeded the memory limit.")
+
+                with self._lock:
+                    self.completed += 1
+                return text
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "timeout": self.timeout,
+                "memory_mb": self.memory_mb,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "restarts": self.restarts,
+            }
+
+    def _current_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # spawn: forking a threaded Flask/Gunicorn worker can deadlock the child
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_memory,
+                    initargs=(self.memory_mb * 1024 * 1024,),
+                    max_tasks_per_child=self.max_tasks_per_worker or None,
+                )
+            return self._pool, self._generation
+
+    def _restart(self, generation):
+        """
+        Kill the workers of the given pool generation and start over on next use.
+
+        Returns:
+            bool: False if that pool had already been replaced by another caller
+        """
+        with self._lock:
+            if generation != self._generation:
+                return False
+            pool, self._pool = self._pool, None
+            self._generation += 1
+            self.restarts += 1
+
+        if pool is not None:
+            # A hung worker never finishes its task, so shutdown() alone would leave it running
+            for process in list((pool._processes or {}).values()):
+                process.kill()
+            pool.shutdown(wait=False, cancel_futures=True)
+        logger.warning("PDF extraction pool restarted.")
+        return True
+
+
+
+
+"""
+from utils.pdf_extract import PdfExtractionPool, iter_pdf_pages
+
+# Lazily read pages until about 40k characters are collected
+with open("resume.pdf", "rb") as f:
+    for page_text in iter_pdf_pages(f, max_chars=40000):
+        print(len(page_text))
+
+# Isolated extraction with a 10 second / 256 MB limit per document
+pool = PdfExtractionPool(workers=2, timeout=10, memory_mb=256)
+spawn_without_main()   # in a script's __main__ block: workers skip re-running it
+text = pool.extract(open("resume.pdf", "rb").read(), max_chars=40000)
+"""
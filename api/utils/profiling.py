@@ -0,0 +1,204 @@
+"""
+Opt-in profiling of a single request.
+
+A RequestProfile samples the stack of the thread handling the request every
+few milliseconds (sys._current_frames) and, optionally, traces allocations
+with tracemalloc. The result is a collapsed-stack profile ("frame;frame;frame
+count" per line), the input format of flamegraph.pl and speedscope, plus the
+allocation peak and the lines that allocated the most.
+
+Sampling only costs a stack walk per tick in a separate thread; tracemalloc
+slows the profiled code down noticeably and is process-wide, so one profile
+runs at a time.
+"""
+
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from utils.cache import ByteLRUCache
+
+
+# Only one request is profiled at a time: tracemalloc sees every thread
+_active = threading.Lock()
+
+
+def _frame_label(code):
+    # ";" separates frames and the last space separates the count
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class RequestProfile:
+    """
+    Sampling (and optionally allocation) profile of one thread.
+
+    Args:
+        interval (float): Seconds between stack samples
+        trace_memory (bool): Also trace allocations with tracemalloc
+        memory_frames (int): Stack depth stored by tracemalloc per allocation
+        max_depth (int): Frames kept per sample, innermost first
+    """
+
+    def __init__(self, interval=0.005, trace_memory=True, memory_frames=1, max_depth=128):
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.memory_frames = memory_frames
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.wall_seconds = 0.0
+        self._thread_id = None
+        self._sampler = None
+        self._stop = threading.Event()
+        self._started = None
+        self._started_tracemalloc = False
+        self._snapshot = None
+        self.memory = None
+
+    def start(self):
+        """
+        Begin profiling the calling thread.
+
+        Returns:
+            bool: False if another profile is already running (nothing is started)
+        """
+        if not _active.acquire(blocking=False):
+            return False
+
+        self._thread_id = threading.get_ident()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.memory_frames)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._sampler.start()
+        return True
+
+    def stop(self, top=20):
+        """
+        Stop sampling and collect the allocation statistics.
+
+        Args:
+            top (int): Number of allocating lines reported
+        """
+        self.wall_seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+        try:
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                growth = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")
+                self.memory = {
+                    "peak_bytes": peak,
+                    "traced_bytes": current,
+                    "top": [
+                        {
+                            "where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                            "size_bytes": stat.size_diff,
+                            "count": stat.count_diff,
+                        }
+                        for stat in growth[:top]
+                        if stat.size_diff > 0
+                    ],
+                }
+                self._snapshot = None
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+        finally:
+            _active.release()
+
+    def collapsed(self):
+        """Collapsed stacks, root frame first, one "stack count" line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+class ProfileStore:
+    """
+    Recent profiles, addressed by random ids, for later download.
+
+    Args:
+        ttl (float): Seconds a profile is kept
+        max_bytes (int): Total size budget; the oldest profiles are dropped first
+    """
+
+    def __init__(self, ttl=900.0, max_bytes=16 * 1024 * 1024):
+        self.ttl = ttl
+        self._profiles = ByteLRUCache(max_bytes)
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(12)
+
+    def put(self, profile, profile_id=None, **details):
+        """
+        Keep a finished RequestProfile together with request details (path, status, ...).
+
+        Args:
+            profile_id (str, optional): Id handed out earlier with new_id()
+
+        Returns:
+            str: Profile id
+        """
+        profile_id = profile_id or self.new_id()
+        entry = dict(
+            details,
+            id=profile_id,
+            created_at=time.time(),
+            wall_seconds=round(profile.wall_seconds, 6),
+            interval=profile.interval,
+            samples=profile.samples,
+            memory=profile.memory,
+            collapsed=profile.collapsed(),
+        )
+        size = len(entry["collapsed"]) + len(json.dumps(entry["memory"]))
+        self._profiles.put(profile_id, (time.monotonic() + self.ttl, entry), size)
+        return profile_id
+
+    def get(self, profile_id):
+        """Return the profile dict or None if unknown or expired."""
+        item = self._profiles.get(profile_id)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if time.monotonic() > expires_at:
+            self._profiles.pop(profile_id)
+            return None
+        return entry
+
+
+
+
+"""
+profile = RequestProfile(interval=0.002)
+if profile.start():
+    try:
+        slow_function()
+    finally:
+        profile.stop()
+    print(profile.collapsed())            # feed to flamegraph.pl or speedscope
+    print(profile.memory["peak_bytes"])
+
+store = ProfileStore()
+profile_id = store.put(profile, path="/api/generate_resume")
+"""
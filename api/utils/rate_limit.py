@@ -0,0 +1,218 @@
+"""
+Client-side rate limiting and call metrics for outbound API requests.
+
+Clock and sleep functions are injectable so the limiter can be driven by a fake
+clock instead of real time.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a rate limiter could not grant capacity within the allowed wait."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Args:
+        per_minute (float): Tokens added per minute
+        capacity (float, optional): Maximum burst; defaults to one minute's worth
+        clock (callable): Monotonic time source
+        sleep (callable): Function used to wait for tokens
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive.")
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1, timeout=None):
+        """
+        Take ``amount`` tokens, waiting for the bucket to refill if needed.
+
+        Requests larger than the capacity are granted once the bucket is full
+        (leaving it in debt) so they can never block forever.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the tokens would not be available within timeout
+        """
+        needed = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+
+            if timeout is not None and waited + delay > timeout:
+                raise RateLimitTimeout(f"Rate limit wait of {waited + delay:.1f}s exceeds {timeout}s.")
+            self._sleep(delay)
+            waited += delay
+
+    def try_acquire(self, amount=1):
+        """Take ``amount`` tokens only if they are available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= min(amount, self.capacity):
+                self._tokens -= amount
+                return True
+            return False
+
+    def adjust(self, amount):
+        """Take (positive) or give back (negative) tokens without waiting."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits applied together.
+
+    Args:
+        rpm (int): Requests per minute; 0 disables the request limit
+        tpm (int): Tokens per minute; 0 disables the token limit
+        clock (callable): Monotonic time source
+        sleep (callable): Function used to wait for capacity
+    """
+
+    def __init__(self, rpm=0, tpm=0, clock=time.monotonic, sleep=time.sleep):
+        self.requests = TokenBucket(rpm, clock=clock, sleep=sleep) if rpm else None
+        self.tokens = TokenBucket(tpm, clock=clock, sleep=sleep) if tpm else None
+
+    def acquire(self, tokens, timeout=None):
+        """
+        Wait for one request slot and ``tokens`` tokens.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If capacity would not be available within timeout
+        """
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1, timeout=timeout)
+        if self.tokens is not None:
+            try:
+                remaining = None if timeout is None else max(0.0, timeout - waited)
+                waited += self.tokens.acquire(tokens, timeout=remaining)
+            except RateLimitTimeout:
+                if self.requests is not None:
+                    self.requests.adjust(-1)
+                raise
+        return waited
+
+    def try_acquire(self, tokens):
+        """Take a request slot and ``tokens`` tokens only if both are available now."""
+        if self.requests is not None and not self.requests.try_acquire(1):
+            return False
+        if self.tokens is not None and not self.tokens.try_acquire(tokens):
+            if self.requests is not None:
+                self.requests.adjust(-1)
+            return False
+        return True
+
+    def settle(self, estimated, actual):
+        """Correct the token bucket once the real token usage of a request is known."""
+        if self.tokens is not None and actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+
+class CallMetrics:
+    """
+    Counters, latency percentiles and a log of recent attempts for one client.
+
+    Args:
+        window (int): Number of recent latencies used for percentiles
+        recent (int): Number of recent attempts kept for inspection
+    """
+
+    def __init__(self, window=200, recent=50):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._latencies = deque(maxlen=window)
+        self._recent = deque(maxlen=recent)
+
+    def record_attempt(self, task, attempt, outcome, latency, hedged=False):
+        """Record one attempt; ``outcome`` is "ok" or the exception class name."""
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._counters[f"outcome:{outcome}"] += 1
+            if outcome == "ok":
+                self._latencies.append(latency)
+            self._recent.append(
+                {
+                    "task": task,
+                    "attempt": attempt,
+                    "hedged": hedged,
+                    "outcome": outcome,
+                    "latency": round(latency, 4),
+                    "at": time.time(),
+                }
+            )
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def percentile(self, q, min_samples=1):
+        """Latency percentile (0-100) of recent successful attempts, or None if too few."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            recent = list(self._recent)
+        return {
+            "counters": counters,
+            "latency": {
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "p99": self.percentile(99),
+            },
+            "recent_attempts": recent,
+        }
+
+
+
+
+"""
+limiter = RateLimiter(rpm=10, tpm=250_000)
+limiter.acquire(tokens=1200, timeout=30)   # blocks until a slot and tokens are free
+limiter.settle(estimated=1200, actual=1850)
+
+metrics = CallMetrics()
+metrics.record_attempt("summary", attempt=0, outcome="ok", latency=1.3)
+print(metrics.snapshot())
+"""
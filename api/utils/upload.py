@@ -0,0 +1,163 @@
+"""
+Receiving uploads without holding them in memory.
+
+Werkzeug writes each multipart file part into the stream returned by
+Request._get_file_stream(). UploadSpool is such a stream: it keeps small files
+in memory, moves larger ones to a named temporary file, and hashes the bytes
+as they arrive, so the content hash needs no second read. UploadRequest plugs
+it into Flask.
+"""
+
+import hashlib
+import io
+import os
+import secrets
+import shutil
+import tempfile
+
+from flask import Request
+
+
+class UploadSpool:
+    """
+    Writable, readable and seekable buffer that spills to disk past max_memory bytes.
+
+    Args:
+        max_memory (int): Bytes kept in memory before moving to a temporary file
+        directory (str, optional): Where the temporary file is created
+    """
+
+    def __init__(self, max_memory=1024 * 1024, directory=None):
+        self.max_memory = max_memory
+        self.directory = directory
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = io.BytesIO()
+        self._on_disk = False
+
+    @property
+    def on_disk(self):
+        return self._on_disk
+
+    @property
+    def path(self):
+        """Filesystem path of the spooled bytes, or None while they are in memory."""
+        return self._file.name if self._on_disk else None
+
+    def hexdigest(self):
+        """SHA-256 of everything written so far."""
+        return self._sha256.hexdigest()
+
+    def write(self, data):
+        self._sha256.update(data)
+        self.size += len(data)
+        written = self._file.write(data)
+        if not self._on_disk and self._file.tell() > self.max_memory:
+            self._rollover()
+        return written
+
+    def _rollover(self):
+        position = self._file.tell()
+        spilled = tempfile.NamedTemporaryFile(mode="w+b", prefix="upload-", dir=self.directory)
+        spilled.write(self._file.getbuffer())
+        spilled.seek(position)
+        self._file = spilled
+        self._on_disk = True
+
+    def __getattr__(self, name):
+        # read, readinto, readline, seek, tell, flush, close, closed, ...
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+
+class UploadRequest(Request):
+    """
+    Flask request whose uploaded files go into an UploadSpool.
+
+    The spool size is read from the app config key UPLOAD_SPOOL_BYTES (default 1 MB).
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from flask import current_app
+
+        return UploadSpool(
+            max_memory=current_app.config.get("UPLOAD_SPOOL_BYTES", 1024 * 1024),
+            directory=current_app.config.get("UPLOAD_SPOOL_DIR") or None,
+        )
+
+
+def file_digest(stream):
+    """SHA-256 of an uploaded file's stream when it was received through an UploadSpool, else None."""
+    return stream.hexdigest() if isinstance(stream, UploadSpool) else None
+
+
+def keep_upload(stream, directory=None):
+    """
+    Give an uploaded file a temporary file of its own that outlives the request.
+
+    A spool already on disk is hard-linked next to itself, so nothing is copied;
+    otherwise the stream is copied to a new file in chunks. The caller deletes
+    the file.
+
+    Args:
+        stream: The uploaded file's stream (an UploadSpool or any binary file)
+        directory (str, optional): Where a copied file is created
+
+    Returns:
+        str: Path of the new file
+    """
+    if isinstance(stream, UploadSpool) and stream.on_disk:
+        stream.flush()
+        path = f"{stream.path}-{secrets.token_hex(8)}"
+        try:
+            os.link(stream.path, path)
+            return path
+        except OSError:
+            pass  # no hard links on this filesystem: copy instead
+
+    fd, path = tempfile.mkstemp(prefix="upload-", dir=directory)
+    position = stream.tell()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            stream.seek(0)
+            shutil.copyfileobj(stream, f, 1024 * 1024)
+    except BaseException:
+        os.remove(path)
+        raise
+    finally:
+        stream.seek(position)
+    return path
+
+
+
+
+"""
+app = Flask(__name__)
+app.request_class = UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
+app.config["UPLOAD_SPOOL_BYTES"] = 1024 * 1024
+
+file = request.files["file"]
+digest = file_digest(file.stream)   # computed while the upload was received
+file.stream.seek(0)
+storage.upload_file(file.stream, "resume.pdf", folder="resume")
+
+path = keep_upload(file.stream)     # still readable after the request, delete when done
+"""